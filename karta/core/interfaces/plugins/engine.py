@@ -1,5 +1,5 @@
 import abc
-from typing import Optional, Union
+from typing import Optional, Union, Callable
 
 from karta.core.interfaces.plugins import Plugin
 from karta.core.models.test_catalog import Step, Feature, Scenario
@@ -20,6 +20,9 @@ class FeatureParser(Plugin):
 
 
 class StepRunner(Plugin):
+    # Step runners which can run consecutive steps in one call, like remote step runners, set this to True
+    supports_batching: bool = False
+
     @abc.abstractmethod
     def get_steps(self) -> list[str]:
         raise NotImplementedError
@@ -32,6 +35,33 @@ class StepRunner(Plugin):
     def run_step(self, step: Step, context: dict) -> Union[tuple[dict, bool, str], bool]:
         raise NotImplementedError
 
+    def run_steps(self, steps: list[Step], step_data: list[Optional[dict]], context: dict) -> list[
+        Union[tuple[dict, bool, str], bool]]:
+        """
+        Run consecutive plain steps in one call, only called on step runners supporting batching
+        :param steps: The steps to run
+        :param step_data: The generated data of each step
+        :param context: The scenario context
+        :return: The return of each step run, stopping at the first failed step. A tuple return can hold the
+                 measurement distributions of the step after the error.
+        """
+        raise NotImplementedError
+
+    def get_step_implementation(self, name: str) -> Optional[Callable]:
+        """
+        Get the function implementing a step, step runners not backed by python functions return None
+        :param name: The step text
+        :return: The step definition function
+        """
+        return None
+
+    def get_step_implementations(self) -> list[Callable]:
+        """
+        Get all the functions implementing the steps of the step runner
+        :return: The step definition functions
+        """
+        return []
+
 
 class TestCatalogManager(Plugin):
     @abc.abstractmethod
@@ -62,3 +92,12 @@ class TestCatalogManager(Plugin):
         :return: The feature for the scenario
         """
         raise NotImplementedError
+
+    def get_scenario_by_location(self, source: str, line_number: int) -> Optional[Scenario]:
+        """
+        Get the scenario defined at a line of a feature source, catalogs not indexing locations return None
+        :param source: The feature source file of the scenario
+        :param line_number: The line number of the scenario in the source
+        :return: The scenario at the location
+        """
+        return None
@@ -5,6 +5,8 @@ from typing import Optional
 
 from pydantic import BaseModel
 
+from karta.core.utils.templating import render_template
+
 
 class VarClass(dict):
     def __init__(self, *args, **kwargs):
@@ -28,12 +30,8 @@ class VarClass(dict):
         self.load_from_json(json_file.read_text())
 
     def replace_variables_in_string(self, string_to_process: str, variable_prefix='${', variable_suffix='}'):
-        replaced_string = string_to_process
-
-        for variable, value in self.items():
-            replaced_string = replaced_string.replace(variable_prefix + variable + variable_suffix, str(value))
-
-        return replaced_string
+        return render_template(string_to_process, self, variable_prefix=variable_prefix,
+                               variable_suffix=variable_suffix)
 
     def create_copy(self):
         copied_object = VarClass()
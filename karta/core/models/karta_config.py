@@ -15,6 +15,28 @@ class KartaConfig(BaseModel):
     test_catalog_manager: Optional[str] = None
     test_lifecycle_hooks: Optional[list[str]] = []
     test_event_listeners: Optional[list[str]] = []
+    # Number of iterations of step data pregenerated at once for a step, 1 generates the data one step at a time
+    # The data of a scenario step in an iteration is then the value at the iteration index of a stream seeded per
+    # scenario and step, set by the run seed alone
+    data_batch_size: Optional[int] = 1
+    # Root seed of the run from which all the random streams are derived, a new seed is generated for every run if None
+    random_seed: Optional[int] = None
+    # Directory to which the result of every run is saved as <run id>.json, results are not saved if None
+    results_directory: Optional[str] = None
+    # Keep the step results of passed scenarios in the run result, passed scenarios are otherwise kept without them
+    # Failed scenarios are always kept in full to be rerun
+    keep_passed_step_results: Optional[bool] = False
+    # Order of running the selected scenarios, one of location, recently_failed, fastest, longest or random
+    # Scenarios are grouped by feature so that every feature runs once, features are ordered by their first scenario
+    # in this order and the scenarios of a feature keep it
+    scenario_ordering: Optional[str] = 'location'
+    # Run the scenarios in the scenario ordering across features instead of grouping them by feature, a feature is then
+    # started again with its hooks and fixtures whenever its scenarios are not consecutive
+    interleave_features: Optional[bool] = False
+    # Value weights of scenario and feature tags and of recent failures when selecting scenarios within a time budget
+    # Every scenario is worth 1 for its coverage plus these weights
+    scenario_tag_weights: Optional[dict[str, float]] = {}
+    recent_failure_weight: Optional[float] = 1.0
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -69,4 +91,5 @@ default_karta_config = KartaConfig(
     test_catalog_manager='KartaTestCatalogManager',
     test_lifecycle_hooks=['Kriya', 'LoggingTestLifecycleHook', ],
     test_event_listeners=['JSONEventDumper', ],
+    results_directory='results',
 )
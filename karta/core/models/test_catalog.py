@@ -1,12 +1,12 @@
 import itertools
 from enum import Enum
 from random import Random
-from typing import Optional
+from typing import Optional, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 from karta.core.models.testdata import GeneratedObjectValue
-from karta.core.utils import randomization_utils
+from karta.core.utils.randomization_utils import MutexCompositionSampler, CompositionSampler
 
 
 class TestNode(BaseModel):
@@ -96,10 +96,30 @@ class Feature(TestNode):
     rules: Optional[set[Rule]] = set()
     iterations: Optional[int] = 1
     iteration_policy: Optional[IterationPolicy] = IterationPolicy.ALL_PER_ITERATION
+    _ordered_scenarios: tuple[Scenario, ...] = PrivateAttr(default=())
+    _iteration_sampler: Optional[Union[MutexCompositionSampler, CompositionSampler]] = PrivateAttr(default=None)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+    def model_post_init(self, context: object, /) -> None:
+        self.build_iteration_sampler()
+
+    def build_iteration_sampler(self):
+        """
+        Validate the scenario probabilities for the iteration policy and precompute the sampling structure used to pick
+        the scenarios of every iteration. Needs to be called again if scenarios or iteration policy are changed.
+        Scenarios are kept in the order of their definition so that a seeded random picks the same scenarios every run.
+        """
+        self._ordered_scenarios = tuple(sorted(self.scenarios or (), key=lambda scenario: (
+            scenario.line_number or 0, scenario.name or '')))
+        if self.iteration_policy == IterationPolicy.ONE_PER_ITERATION:
+            self._iteration_sampler = MutexCompositionSampler.from_objects(self._ordered_scenarios)
+        elif self.iteration_policy == IterationPolicy.SOME_PER_ITERATION:
+            self._iteration_sampler = CompositionSampler.from_objects(self._ordered_scenarios)
+        else:
+            self._iteration_sampler = None
+
     def set_source(self, source: str):
         self.source = source
         for scenario in self.scenarios:
@@ -108,6 +128,10 @@ class Feature(TestNode):
     def get_scenario_by_name(self, name: str) -> Optional[Scenario]:
         return next((scenario for scenario in self.scenarios if scenario.name == name), None)
 
+    def get_scenario_by_line_number(self, line_number: int, name: Optional[str] = None) -> Optional[Scenario]:
+        return next((scenario for scenario in self.scenarios if scenario.line_number == line_number and (
+                name is None or scenario.name == name)), None)
+
     def validate_feature(self) -> bool:
         """
         Validate the feature to check the following
@@ -131,10 +155,10 @@ class Feature(TestNode):
     # noinspection PyTypeChecker
     def get_next_iteration_scenarios(self, random: Random) -> list[Scenario]:
         if self.iteration_policy == IterationPolicy.ALL_PER_ITERATION:
-            return list(self.scenarios)
+            return list(self._ordered_scenarios)
         elif self.iteration_policy == IterationPolicy.ONE_PER_ITERATION:
-            return [randomization_utils.generate_next_mutex_composition_from_objects(self.scenarios, random)]
+            return [self._iteration_sampler.generate_next(random)]
         elif self.iteration_policy == IterationPolicy.SOME_PER_ITERATION:
-            return randomization_utils.generate_next_composition_from_objects(self.scenarios, random)
+            return self._iteration_sampler.generate_next(random)
         else:
             raise NotImplemented(f"Iteration policy {self.iteration_policy} is not implemented.")
@@ -1,3 +1,5 @@
+import math
+import statistics
 from datetime import datetime
 from typing import Optional, Dict, Union
 
@@ -25,6 +27,41 @@ class TestIncident(BaseModel):
         super().__init__(**kwargs)
 
 
+class LatencyDistribution(BaseModel):
+    """
+    Distribution of repeated time measurements of a step in seconds, with percentiles by nearest rank
+    """
+    count: int = 0
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    mean: Optional[float] = None
+    median: Optional[float] = None
+    p90: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+    standard_deviation: Optional[float] = None
+    samples: list[float] = []
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+    @staticmethod
+    def get_percentile(sorted_samples: list[float], percentile: float) -> float:
+        rank = max(math.ceil(percentile / 100.0 * len(sorted_samples)), 1)
+        return sorted_samples[rank - 1]
+
+    @classmethod
+    def from_samples(cls, samples: list[float]) -> 'LatencyDistribution':
+        if not samples:
+            return cls()
+        sorted_samples = sorted(samples)
+        return cls(count=len(samples), minimum=sorted_samples[0], maximum=sorted_samples[-1],
+                   mean=statistics.fmean(samples), median=statistics.median(sorted_samples),
+                   p90=cls.get_percentile(sorted_samples, 90), p95=cls.get_percentile(sorted_samples, 95),
+                   p99=cls.get_percentile(sorted_samples, 99), standard_deviation=statistics.pstdev(samples),
+                   samples=list(samples))
+
+
 class StepResult(ResultNode):
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
@@ -33,6 +70,8 @@ class StepResult(ResultNode):
     results: Optional[Dict] = None
     step_results: Optional[list['StepResult']] = None
     incidents: Optional[list[TestIncident]] = None
+    # Distributions of time measurements recorded by the step by measurement name
+    measurements: Optional[dict[str, LatencyDistribution]] = None
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -73,6 +112,7 @@ class ScenarioResult(ResultNode):
     error: Optional[str] = None
     step_results: Optional[list[StepResult]] = []
     iteration_index: Optional[int] = 1
+    seed: Optional[int] = None
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -96,6 +136,8 @@ class FeatureResult(ResultNode):
     error: Optional[str] = None
     iterations_count: Optional[int] = 1
     failed_iterations: Optional[list[int]] = []
+    seed: Optional[int] = None
+    scenario_results: Optional[list[ScenarioResult]] = []
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -104,6 +146,9 @@ class FeatureResult(ResultNode):
         return not self.error and self.successful
 
     def add_scenario_result(self, scenario_result: ScenarioResult, iteration_index: Optional[int] = 1):
+        if self.scenario_results is None:
+            self.scenario_results = []
+        self.scenario_results.append(scenario_result)
         if not self.error:
             self.error = scenario_result.error
         if not scenario_result.is_successful() and iteration_index not in self.failed_iterations:
@@ -116,9 +161,11 @@ class FeatureResult(ResultNode):
 
 
 class Run(BaseModel):
+    id: Optional[str] = None
     name: Optional[str] = None
     description: Optional[str] = None
     tags: Optional[set[str]] = None
+    seed: Optional[int] = None
 
     # scenarios: Optional[set[TestScenario]] = set()
 
@@ -127,9 +174,15 @@ class Run(BaseModel):
 
 
 class RunResult(BaseModel):
+    run_id: Optional[str] = None
+    name: Optional[str] = None
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
+    seed: Optional[int] = None
     feature_results: Optional[list[FeatureResult]] = []
+    # Time budget of the run in seconds and the selected scenarios not run within it
+    time_budget: Optional[float] = None
+    skipped_scenarios: Optional[list[ResultNode]] = []
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
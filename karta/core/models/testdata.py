@@ -1,9 +1,83 @@
+import copy
+from collections import deque
 from random import Random
-from typing import Optional
+from typing import Optional, Callable
 
-from pydantic import BaseModel
+import numpy
+from pydantic import BaseModel, PrivateAttr
 
-from karta.core.utils import randomization_utils
+from karta.core.utils.randomization_utils import MutexCompositionSampler, CompositionSampler, derive_random
+
+RANDOM_STRING_CHARACTERS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_RANDOM_STRING_CHARACTER_CODES = numpy.frombuffer(RANDOM_STRING_CHARACTERS.encode('ascii'), dtype=numpy.uint8)
+
+
+def get_vectorized_generator(random: Random) -> numpy.random.Generator:
+    """
+    Creates a NumPy generator seeded from the given Random so that vectorized generation stays reproducible from the
+    seed of the Random instance.
+    """
+    return numpy.random.default_rng(random.getrandbits(64))
+
+
+def generate_nested_values(selected_objects: list, random: Random) -> list:
+    """
+    Replaces the DataValue items of the selected objects with generated values.
+    Every distinct DataValue is generated in a single batch for all the positions it was selected at.
+    """
+    data_value_positions: dict[int, tuple['DataValue', list[int]]] = {}
+    for index, selected_object in enumerate(selected_objects):
+        if isinstance(selected_object, DataValue):
+            data_value_positions.setdefault(id(selected_object), (selected_object, []))[1].append(index)
+
+    if not data_value_positions:
+        return selected_objects
+
+    processed_objects = list(selected_objects)
+    for data_value, positions in data_value_positions.values():
+        for position, generated_value in zip(positions, data_value.generate_next_values(random, len(positions))):
+            processed_objects[position] = generated_value
+    return processed_objects
+
+
+def generate_columns(values: list, random: Random, count: int) -> list[list]:
+    """
+    Generates count values for every item in values, returning one column of generated values per item.
+    Items which are not DataValue are repeated as is.
+    """
+    return [value.generate_next_values(random, count) if isinstance(value, DataValue) else [value] * count
+            for value in values]
+
+
+def split_rows(rows: list[list], random: Random) -> list[list]:
+    """
+    Generates the DataValue items of all rows in one flattened pass and splits the result back into rows.
+    """
+    flattened_rows = generate_nested_values([item for row in rows for item in row], random)
+    processed_rows = []
+    offset = 0
+    for row in rows:
+        processed_rows.append(flattened_rows[offset:offset + len(row)])
+        offset += len(row)
+    return processed_rows
+
+
+def compile_item(value: object) -> Callable[[Random], object]:
+    """
+    Compiles an item of a data rule, DataValue items into their generator function and other items into a constant.
+    """
+    if isinstance(value, DataValue):
+        return value.compile()
+    return lambda random: value
+
+
+def compile_template(values: list) -> tuple[list, tuple[tuple[int, Callable[[Random], object]], ...]]:
+    """
+    Splits the values into a template with the constant items folded in and the generator functions of the DataValue
+    items along with their positions.
+    """
+    return list(values), tuple((index, value.compile()) for index, value in enumerate(values)
+                               if isinstance(value, DataValue))
 
 
 class DataValue(BaseModel):
@@ -11,6 +85,7 @@ class DataValue(BaseModel):
     DataValue is a base class that represents a randomly generated random value or object.
     It can be used to generate random values based on the provided parameters.
     """
+    _compiled: Optional[Callable[[Random], object]] = PrivateAttr(default=None)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -18,6 +93,23 @@ class DataValue(BaseModel):
     def __hash__(self):
         return id(self)
 
+    def compile(self) -> Callable[[Random], object]:
+        """
+        Compiles the data rule tree into a generator function which is cached on the DataValue.
+        The generator function consumes the random stream the same way as generate_next_value and so generates the
+        same values for the same seed.
+        """
+        if self._compiled is None:
+            self._compiled = self.compile_generator()
+        return self._compiled
+
+    def compile_generator(self) -> Callable[[Random], object]:
+        """
+        Creates the generator function of the DataValue with its parameters validated and bound.
+        Subclasses override this to specialize the generation, the default generates using generate_next_value.
+        """
+        return self.generate_next_value
+
     def generate_next_value(self, random: Random) -> Optional[object]:
         """
         Generates the next random value based on the provided parameters.
@@ -25,6 +117,13 @@ class DataValue(BaseModel):
         """
         raise NotImplementedError("Subclasses must implement this method.")
 
+    def generate_next_values(self, random: Random, count: int) -> list:
+        """
+        Generates the next count random values in one batch.
+        Subclasses override this with vectorized sampling, the default generates the values one at a time.
+        """
+        return [self.generate_next_value(random) for _ in range(count)]
+
 
 class IntegerRangeValue(DataValue):
     """
@@ -44,6 +143,21 @@ class IntegerRangeValue(DataValue):
             raise ValueError("Minimum value cannot be greater than maximum value.")
         return random.randint(self.min, self.max)
 
+    def generate_next_values(self, random: Random, count: int) -> list[int]:
+        if self.min is None or self.max is None:
+            raise ValueError("Minimum and maximum values must be provided.")
+        if self.min > self.max:
+            raise ValueError("Minimum value cannot be greater than maximum value.")
+        return get_vectorized_generator(random).integers(self.min, self.max, size=count, endpoint=True).tolist()
+
+    def compile_generator(self) -> Callable[[Random], int]:
+        if self.min is None or self.max is None:
+            raise ValueError("Minimum and maximum values must be provided.")
+        if self.min > self.max:
+            raise ValueError("Minimum value cannot be greater than maximum value.")
+        minimum, maximum = self.min, self.max
+        return lambda random: random.randint(minimum, maximum)
+
 
 class FloatRangeValue(DataValue):
     """
@@ -63,6 +177,21 @@ class FloatRangeValue(DataValue):
             raise ValueError("Minimum value cannot be greater than maximum value.")
         return random.uniform(self.min, self.max)
 
+    def generate_next_values(self, random: Random, count: int) -> list[float]:
+        if self.min is None or self.max is None:
+            raise ValueError("Minimum and maximum values must be provided.")
+        if self.min > self.max:
+            raise ValueError("Minimum value cannot be greater than maximum value.")
+        return get_vectorized_generator(random).uniform(self.min, self.max, size=count).tolist()
+
+    def compile_generator(self) -> Callable[[Random], float]:
+        if self.min is None or self.max is None:
+            raise ValueError("Minimum and maximum values must be provided.")
+        if self.min > self.max:
+            raise ValueError("Minimum value cannot be greater than maximum value.")
+        minimum, maximum = self.min, self.max
+        return lambda random: random.uniform(minimum, maximum)
+
 
 class RandomStringValue(DataValue):
     """
@@ -78,7 +207,22 @@ class RandomStringValue(DataValue):
         """ Generates a random string of the specified length. """
         if self.length <= 0:
             raise ValueError("Length must be a positive integer.")
-        return ''.join(random.choices('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ', k=self.length))
+        return ''.join(random.choices(RANDOM_STRING_CHARACTERS, k=self.length))
+
+    def generate_next_values(self, random: Random, count: int) -> list[str]:
+        if self.length <= 0:
+            raise ValueError("Length must be a positive integer.")
+        character_indices = get_vectorized_generator(random).integers(0, len(RANDOM_STRING_CHARACTERS),
+                                                                       size=(count, self.length))
+        # View every row of character codes as one fixed length byte string
+        string_rows = _RANDOM_STRING_CHARACTER_CODES[character_indices].view(f'S{self.length}').ravel()
+        return [string_row.decode('ascii') for string_row in string_rows]
+
+    def compile_generator(self) -> Callable[[Random], str]:
+        if self.length <= 0:
+            raise ValueError("Length must be a positive integer.")
+        length = self.length
+        return lambda random: ''.join(random.choices(RANDOM_STRING_CHARACTERS, k=length))
 
 
 class OneSelectedFromListValue(DataValue):
@@ -99,6 +243,19 @@ class OneSelectedFromListValue(DataValue):
             generated_object = generated_object.generate_next_value(random)
         return generated_object
 
+    def generate_next_values(self, random: Random, count: int) -> list:
+        if not self.values:
+            raise ValueError("The values list is empty.")
+        selected_indices = get_vectorized_generator(random).integers(0, len(self.values), size=count)
+        return generate_nested_values([self.values[index] for index in selected_indices], random)
+
+    def compile_generator(self) -> Callable[[Random], object]:
+        if not self.values:
+            raise ValueError("The values list is empty.")
+        # Choosing from the generators draws the same random numbers as choosing from the values
+        item_generators = [compile_item(value) for value in self.values]
+        return lambda random: random.choice(item_generators)(random)
+
 
 class SomeSelectedFromListValue(DataValue):
     """
@@ -122,6 +279,28 @@ class SomeSelectedFromListValue(DataValue):
                 processed_objects.append(generated_object)
         return processed_objects
 
+    def generate_next_values(self, random: Random, count: int) -> list[list]:
+        if not self.values:
+            raise ValueError("The values list is empty.")
+        vectorized_generator = get_vectorized_generator(random)
+        # A random permutation per row, of which a random sized prefix is selected
+        permutations = vectorized_generator.random((count, len(self.values))).argsort(axis=1)
+        selection_sizes = vectorized_generator.integers(1, len(self.values), size=count, endpoint=True)
+        return split_rows([[self.values[index] for index in permutation[:selection_size]]
+                           for permutation, selection_size in zip(permutations, selection_sizes)], random)
+
+    def compile_generator(self) -> Callable[[Random], list]:
+        if not self.values:
+            raise ValueError("The values list is empty.")
+        item_generators = [compile_item(value) for value in self.values]
+        values_count = len(item_generators)
+
+        def generate(random: Random) -> list:
+            return [item_generator(random) for item_generator in
+                    random.sample(item_generators, k=random.randint(1, values_count))]
+
+        return generate
+
 
 class ListDataValue(DataValue):
     """
@@ -144,6 +323,26 @@ class ListDataValue(DataValue):
                 generated_objects.append(value)
         return generated_objects
 
+    def generate_next_values(self, random: Random, count: int) -> list[list]:
+        if not self.values:
+            raise ValueError("The values list is empty.")
+        return [list(row) for row in zip(*generate_columns(self.values, random, count))]
+
+    def compile_generator(self) -> Callable[[Random], list]:
+        if not self.values:
+            raise ValueError("The values list is empty.")
+        template, item_generators = compile_template(self.values)
+        if not item_generators:
+            return lambda random: template.copy()
+
+        def generate(random: Random) -> list:
+            generated_objects = template.copy()
+            for index, item_generator in item_generators:
+                generated_objects[index] = item_generator(random)
+            return generated_objects
+
+        return generate
+
 
 class ProbabilityMapOneValue(DataValue):
     """
@@ -151,19 +350,41 @@ class ProbabilityMapOneValue(DataValue):
     It can be used to generate random values based on the provided probability map.
     """
     probability_map: Optional[dict[object, float]] = None
+    _sampler: Optional[MutexCompositionSampler] = PrivateAttr(default=None)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+    def model_post_init(self, context: object, /) -> None:
+        # Validate the probability map once on creation instead of on every draw
+        if self.probability_map:
+            self._sampler = MutexCompositionSampler.from_probability_map(self.probability_map)
+
     def generate_next_value(self, random: Random) -> object:
         if not self.probability_map:
             raise ValueError("The values list is empty.")
-        generated_object = randomization_utils.generate_next_mutex_composition_from_probability_map(
-            self.probability_map, random)
+        generated_object = self._sampler.generate_next(random)
         if isinstance(generated_object, DataValue):
             generated_object = generated_object.generate_next_value(random)
         return generated_object
 
+    def generate_next_values(self, random: Random, count: int) -> list:
+        if not self.probability_map:
+            raise ValueError("The values list is empty.")
+        objects = self._sampler.objects
+        # First object whose cumulative probability covers the random chance, same as the one at a time selection
+        selected_indices = numpy.searchsorted(self._sampler.cumulative_probabilities,
+                                              get_vectorized_generator(random).random(count), side='left')
+        selected_indices = numpy.minimum(selected_indices, len(objects) - 1)
+        return generate_nested_values([objects[index] for index in selected_indices], random)
+
+    def compile_generator(self) -> Callable[[Random], object]:
+        if not self.probability_map:
+            raise ValueError("The values list is empty.")
+        sampler = MutexCompositionSampler([compile_item(obj) for obj in self.probability_map.keys()],
+                                          list(self.probability_map.values()))
+        return lambda random: sampler.generate_next(random)(random)
+
 
 class ProbabilityMapSomeValue(DataValue):
     """
@@ -171,15 +392,20 @@ class ProbabilityMapSomeValue(DataValue):
     It can be used to generate random values based on the provided probability map.
     """
     probability_map: Optional[dict[object, float]] = None
+    _sampler: Optional[CompositionSampler] = PrivateAttr(default=None)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+    def model_post_init(self, context: object, /) -> None:
+        # Validate the probability map once on creation instead of on every draw
+        if self.probability_map:
+            self._sampler = CompositionSampler.from_probability_map(self.probability_map)
+
     def generate_next_value(self, random: Random) -> list:
         if not self.probability_map:
             raise ValueError("The values list is empty.")
-        generated_objects = randomization_utils.generate_next_composition_from_probability_map(
-            self.probability_map, random)
+        generated_objects = self._sampler.generate_next(random)
         processed_objects = []
         for generated_object in generated_objects:
             if isinstance(generated_object, DataValue):
@@ -188,6 +414,22 @@ class ProbabilityMapSomeValue(DataValue):
                 processed_objects.append(generated_object)
         return processed_objects
 
+    def generate_next_values(self, random: Random, count: int) -> list[list]:
+        if not self.probability_map:
+            raise ValueError("The values list is empty.")
+        objects = self._sampler.objects
+        probabilities = numpy.array(self._sampler.probabilities)
+        selection_mask = get_vectorized_generator(random).random((count, len(objects))) <= probabilities
+        return split_rows([[objects[index] for index in numpy.flatnonzero(selected_row)]
+                           for selected_row in selection_mask], random)
+
+    def compile_generator(self) -> Callable[[Random], list]:
+        if not self.probability_map:
+            raise ValueError("The values list is empty.")
+        sampler = CompositionSampler([compile_item(obj) for obj in self.probability_map.keys()],
+                                     list(self.probability_map.values()))
+        return lambda random: [item_generator(random) for item_generator in sampler.generate_next(random)]
+
 
 class GeneratedObjectValue(DataValue):
     """
@@ -209,3 +451,71 @@ class GeneratedObjectValue(DataValue):
             else:
                 data[field_name] = field_value
         return data
+
+    def generate_next_values(self, random: Random, count: int) -> list:
+        if not self.fields_dict:
+            return [None] * count
+        field_names = list(self.fields_dict.keys())
+        field_columns = generate_columns(list(self.fields_dict.values()), random, count)
+        return [dict(zip(field_names, row)) for row in zip(*field_columns)]
+
+    def compile_generator(self) -> Callable[[Random], object]:
+        if not self.fields_dict:
+            return lambda random: None
+        field_names = list(self.fields_dict.keys())
+        template_values, field_generators = compile_template(list(self.fields_dict.values()))
+        template = dict(zip(field_names, template_values))
+        # Static objects are only copied, the copy keeps the order of the fields
+        if not field_generators:
+            return lambda random: template.copy()
+        named_field_generators = tuple((field_names[index], field_generator) for index, field_generator in
+                                       field_generators)
+
+        def generate(random: Random) -> dict:
+            data = template.copy()
+            for field_name, field_generator in named_field_generators:
+                data[field_name] = field_generator(random)
+            return data
+
+        return generate
+
+
+class BatchedDataGenerator:
+    """
+    BatchedDataGenerator pregenerates the values of a DataValue tree for the next batch_size calls in one vectorized
+    pass and hands them out one at a time.
+    Every batch is generated from a random stream derived from the seed and the batch index, so the value of any call
+    can be regenerated with generate_value_at without generating the batches before it.
+    """
+
+    def __init__(self, data_value: DataValue, seed: int, batch_size: int = 100):
+        if batch_size <= 0:
+            raise ValueError("Batch size must be a positive integer.")
+        self.data_value = data_value
+        self.seed = seed
+        self.batch_size = batch_size
+        self.batch_index = 0
+        self.pregenerated_values = deque()
+        # The last batch regenerated by generate_value_at, reused by calls in the same batch
+        self.cached_batch_index = None
+        self.cached_batch = None
+
+    def generate_batch(self, batch_index: int) -> list:
+        return self.data_value.generate_next_values(derive_random(self.seed, batch_index), self.batch_size)
+
+    def generate_next_value(self) -> Optional[object]:
+        if not self.pregenerated_values:
+            self.pregenerated_values.extend(self.generate_batch(self.batch_index))
+            self.batch_index += 1
+        return self.pregenerated_values.popleft()
+
+    def generate_value_at(self, index: int) -> Optional[object]:
+        """
+        Regenerates the value returned by the call number index (starting from 0) of generate_next_value. Values of a
+        cached batch are copied, so that changes made by a step to its data are not seen by a later call.
+        """
+        batch_index = index // self.batch_size
+        if batch_index != self.cached_batch_index:
+            self.cached_batch = self.generate_batch(batch_index)
+            self.cached_batch_index = batch_index
+        return copy.deepcopy(self.cached_batch[index % self.batch_size])
@@ -1,17 +1,27 @@
+import math
+import os
 import queue
+import shutil
+import struct
+import tempfile
 import threading
 import time
-from typing import Optional, Union
+import zlib
+from collections import deque
+from typing import Iterator, Optional, Union, Callable, Any
 
 import mss
+import numpy as np
 from mss import tools
 
-from karta.core.utils.waitutil import wait_until
+from karta.core.utils.logger import logger
+from karta.core.utils.measurements import Measurements
+from karta.core.utils.waitutil import wait_for_conditions, sleep_until_notified
 
 
 class ImageFrame:
     def __init__(self, data, timestamp: Optional[float] = None, index: Optional[int] = None,
-                 same_as_previous: bool = False):
+                 same_as_previous: bool = False, pixel_format: str = 'RGB', capture_time: Optional[float] = None):
         if not timestamp:
             timestamp = time.time()
         if not index:
@@ -20,25 +30,586 @@ class ImageFrame:
         self.index = index
         self.data = data
         self.timestamp = timestamp
-        self.same_as_previous = False
+        self.same_as_previous = same_as_previous
+        # 'RGB', or 'BGRA' for the pixels as grabbed from the screen
+        self.pixel_format = pixel_format
+        # time.perf_counter() just before the frame was grabbed, for measuring response times
+        self.capture_time = capture_time
+        self._rgb = None
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """
+        The RGB pixels of the frame, converted on first use for frames of BGRA pixels
+        """
+        if self._rgb is None:
+            self._rgb = self.data if self.pixel_format == 'RGB' else np.ascontiguousarray(self.data[..., 2::-1])
+        return self._rgb
 
     def __str__(self):
         return f"ImageFrame(index={self.index}, timestamp={self.timestamp}, same_as_previous={self.same_as_previous})"
 
     def __eq__(self, other):
-        return self.data == other.data
+        return np.array_equal(self.data, other.data)
+
+
+class FrameRingBuffer:
+    """
+    Fixed number of preallocated frame slots, overwriting the oldest frame when full so that memory stays bounded while
+    no one reads the frames. Frames are read in order, skipping frames overwritten before they were read.
+    The data of a frame read is a view of its slot, valid until the buffer is full of newer frames.
+    """
+
+    def __init__(self, capacity: int, frame_shape: tuple[int, ...], pixel_format: str = 'RGB'):
+        if capacity < 2:
+            raise ValueError("Frame buffer capacity must be at least 2.")
+        self.capacity = capacity
+        self.pixel_format = pixel_format
+        self.frames = np.empty((capacity, *frame_shape), dtype=np.uint8)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.same_as_previous = np.zeros(capacity, dtype=bool)
+        self.capture_times = np.full(capacity, np.nan, dtype=np.float64)
+        self.write_count = 0
+        self.read_count = 0
+        self.lock = threading.Lock()
+
+    def get_write_slot(self) -> np.ndarray:
+        """
+        Get the slot of the next frame to fill before adding it, which is not readable until then
+        """
+        return self.frames[self.write_count % self.capacity]
+
+    def add(self, timestamp: float, same_as_previous: bool, capture_time: Optional[float] = None):
+        with self.lock:
+            slot_index = self.write_count % self.capacity
+            self.timestamps[slot_index] = timestamp
+            self.same_as_previous[slot_index] = same_as_previous
+            self.capture_times[slot_index] = np.nan if capture_time is None else capture_time
+            self.write_count += 1
+
+    def read(self) -> Optional[ImageFrame]:
+        """
+        Read the oldest unread frame
+        :return: The frame, or None if there is no unread frame
+        """
+        with self.lock:
+            if self.read_count == self.write_count:
+                return None
+            # The slot being written next is the oldest one, it is not readable
+            self.read_count = max(self.read_count, self.write_count - self.capacity + 1)
+            frame_index = self.read_count
+            self.read_count += 1
+        slot_index = frame_index % self.capacity
+        capture_time = float(self.capture_times[slot_index])
+        return ImageFrame(self.frames[slot_index], float(self.timestamps[slot_index]), frame_index,
+                          bool(self.same_as_previous[slot_index]), self.pixel_format,
+                          None if math.isnan(capture_time) else capture_time)
+
+    def read_latest(self) -> Optional[ImageFrame]:
+        """
+        Read the newest unread frame, skipping the older unread frames
+        :return: The frame, or None if there is no unread frame
+        """
+        with self.lock:
+            if self.read_count == self.write_count:
+                return None
+            self.read_count = self.write_count - 1
+        return self.read()
+
+    def clear(self):
+        with self.lock:
+            self.read_count = self.write_count
+
+
+class FrameChangeDetector:
+    """
+    Detects frames changed from the previous matching frame by comparing the average colour of blocks of a downsampled
+    frame, within a tolerance so that noise such as anti-aliasing does not count as a change.
+    """
+
+    def __init__(self, change_tolerance: float = 0.0, sample_step: int = 2, block_size: int = 8):
+        """
+        :param change_tolerance: The largest difference of the average colour of a block of pixels between frames, out
+                                 of 255, for which the block is treated as unchanged
+        :param sample_step: Samples every sample_step-th pixel of every sample_step-th row
+        :param block_size: The width and height of the blocks of sampled pixels compared
+        """
+        self.change_tolerance = change_tolerance
+        self.sample_step = sample_step
+        self.block_size = block_size
+        self.previous_matching_signature: Optional[np.ndarray] = None
+
+    def get_signature(self, frame_data: np.ndarray) -> np.ndarray:
+        # Only the colour channels of RGB or BGRA pixels are compared
+        sampled_data = frame_data[::self.sample_step, ::self.sample_step, :3]
+        block_height = min(self.block_size, sampled_data.shape[0])
+        block_width = min(self.block_size, sampled_data.shape[1])
+        block_rows = sampled_data.shape[0] // block_height
+        block_columns = sampled_data.shape[1] // block_width
+        blocks = sampled_data[:block_rows * block_height, :block_columns * block_width].reshape(
+            block_rows, block_height, block_columns, block_width, -1)
+        return blocks.mean(axis=(1, 3), dtype=np.float32)
+
+    def is_same_as_previous(self, frame_data: np.ndarray) -> bool:
+        """
+        Check if a frame is the same as the previous matching frame, keeping it as the previous matching frame when it
+        is not
+        """
+        signature = self.get_signature(frame_data)
+        if self.previous_matching_signature is not None and self.previous_matching_signature.shape == signature.shape:
+            if np.abs(signature - self.previous_matching_signature).max() <= self.change_tolerance:
+                return True
+        self.previous_matching_signature = signature
+        return False
+
+    def reset(self):
+        self.previous_matching_signature = None
+
+
+LUMINANCE_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+BGR_LUMINANCE_WEIGHTS = LUMINANCE_WEIGHTS[::-1].copy()
+
+# Windows and templates with a smaller standard deviation of intensity are treated as flat, without a pattern to
+# correlate
+FLAT_STANDARD_DEVIATION = 1e-3
+
+
+def to_grayscale(image_data: np.ndarray, pixel_format: str = 'RGB') -> np.ndarray:
+    """
+    Convert RGB, RGBA or BGRA image data, or grayscale image data, to float grayscale intensities
+    """
+    if image_data.ndim == 2:
+        return image_data.astype(np.float32)
+    weights = BGR_LUMINANCE_WEIGHTS if pixel_format.startswith('BGR') else LUMINANCE_WEIGHTS
+    return image_data[..., :3].astype(np.float32) @ weights
+
+
+def next_fast_length(length: int) -> int:
+    """
+    Get the smallest length of at least the given length whose only prime factors are 2, 3 and 5, for fast FFTs
+    """
+    fast_length = length
+    while True:
+        remainder = fast_length
+        for factor in (2, 3, 5):
+            while remainder % factor == 0:
+                remainder //= factor
+        if remainder == 1:
+            return fast_length
+        fast_length += 1
+
+
+def get_window_sums(integral_image: np.ndarray, window_height: int, window_width: int) -> np.ndarray:
+    """
+    Get the sums of all the windows of a size fully inside an image, from its integral image padded with a leading
+    row and column of zeros
+    """
+    return (integral_image[window_height:, window_width:] - integral_image[:-window_height, window_width:] -
+            integral_image[window_height:, :-window_width] + integral_image[:-window_height, :-window_width])
+
+
+class Template:
+    """
+    Image to find in frames, such as a part of a screenshot. Its RGB or grayscale data is searched for in the region
+    of the frames, or all of the frames if there is no region.
+    """
+
+    def __init__(self, image_data: np.ndarray, name: Optional[str] = None,
+                 region: Optional[tuple[int, int, int, int]] = None, threshold: float = 0.9):
+        """
+        :param image_data: The image of the template, of shape (height, width) or (height, width, channels)
+        :param name: The name of the template in matches
+        :param region: The (left, top, width, height) of the frames to search
+        :param threshold: The least normalized cross-correlation, from -1 to 1, of a match
+        """
+        self.image_data = image_data
+        self.name = name
+        self.region = region
+        self.threshold = threshold
+
+    def __str__(self):
+        return f"Template(name={self.name}, shape={self.image_data.shape}, region={self.region})"
+
+
+class TemplateMatch:
+    def __init__(self, template: Template, location: Optional[tuple[int, int]], confidence: float,
+                 timestamp: Optional[float] = None):
+        """
+        :param template: The template matched
+        :param location: The (left, top) of the best match in the frame, None if the template does not fit its region
+        :param confidence: The normalized cross-correlation of the best match
+        :param timestamp: The timestamp of the frame
+        """
+        self.template = template
+        self.location = location
+        self.confidence = confidence
+        self.timestamp = timestamp
+
+    @property
+    def matched(self) -> bool:
+        return self.location is not None and self.confidence >= self.template.threshold
+
+    def __str__(self):
+        return (f"TemplateMatch(template={self.template.name}, location={self.location}, "
+                f"confidence={self.confidence:.3f}, matched={self.matched})")
+
+
+class TemplateMatcher:
+    """
+    Finds templates in frames by normalized cross-correlation, computed with FFTs so that the cost does not grow with
+    the size of the templates. Each search region of a frame is converted to grayscale and transformed once for all
+    the templates searched in it, and the transforms of the templates are reused across frames.
+    """
+
+    def __init__(self, templates: list[Template], downscale: int = 1):
+        """
+        :param templates: The templates to find
+        :param downscale: Match every downscale-th pixel of every downscale-th row of the frames and templates, trading
+                          location precision for speed
+        """
+        if downscale < 1:
+            raise ValueError("Downscale must be a positive integer.")
+        self.templates = templates
+        self.downscale = downscale
+        self.template_intensities = []
+        self.template_means = []
+        self.template_deviations = []
+        for template in templates:
+            intensities = to_grayscale(template.image_data[::downscale, ::downscale])
+            self.template_means.append(float(intensities.mean()))
+            self.template_intensities.append(intensities - self.template_means[-1])
+            self.template_deviations.append(float(np.sqrt(np.square(self.template_intensities[-1],
+                                                                    dtype=np.float64).sum())))
+        self.template_transforms: dict[tuple[int, tuple[int, int]], np.ndarray] = {}
+
+    def get_template_transform(self, template_index: int, transform_shape: tuple[int, int]) -> np.ndarray:
+        key = (template_index, transform_shape)
+        if key not in self.template_transforms:
+            self.template_transforms[key] = np.conj(
+                np.fft.rfft2(self.template_intensities[template_index], transform_shape))
+        return self.template_transforms[key]
+
+    def match(self, frame_data: np.ndarray, timestamp: Optional[float] = None, pixel_format: str = 'RGB') -> list[
+        TemplateMatch]:
+        """
+        Find the best match of each template in a frame
+        :param frame_data: The RGB, BGRA or grayscale data of the frame
+        :param timestamp: The timestamp of the frame
+        :param pixel_format: The pixel format of the frame data, converted to grayscale without converting to RGB
+        :return: The best match of each template, in the order of the templates
+        """
+        matches: list[Optional[TemplateMatch]] = [None] * len(self.templates)
+        template_indexes_by_region: dict[Optional[tuple[int, int, int, int]], list[int]] = {}
+        for template_index, template in enumerate(self.templates):
+            template_indexes_by_region.setdefault(template.region, []).append(template_index)
+
+        for region, template_indexes in template_indexes_by_region.items():
+            left, top = (region[0], region[1]) if region else (0, 0)
+            region_data = frame_data[top:top + region[3], left:left + region[2]] if region else frame_data
+            intensities = to_grayscale(region_data[::self.downscale, ::self.downscale], pixel_format)
+            height, width = intensities.shape
+            transform_shape = (next_fast_length(height), next_fast_length(width))
+            frame_transform = np.fft.rfft2(intensities, transform_shape)
+            integral_image = np.zeros((height + 1, width + 1), dtype=np.float64)
+            integral_image[1:, 1:] = intensities.cumsum(axis=0, dtype=np.float64).cumsum(axis=1)
+            squared_integral_image = np.zeros((height + 1, width + 1), dtype=np.float64)
+            squared_integral_image[1:, 1:] = np.square(intensities, dtype=np.float64).cumsum(axis=0).cumsum(axis=1)
+
+            for template_index in template_indexes:
+                template = self.templates[template_index]
+                template_intensities = self.template_intensities[template_index]
+                template_height, template_width = template_intensities.shape
+                if template_height > height or template_width > width:
+                    matches[template_index] = TemplateMatch(template, None, 0.0, timestamp)
+                    continue
+
+                # Correlation of the frame with the zero mean template for every template position inside the region
+                correlation = np.fft.irfft2(frame_transform * self.get_template_transform(
+                    template_index, transform_shape), transform_shape)[:height - template_height + 1,
+                              :width - template_width + 1]
+                pixel_count = template_height * template_width
+                window_sums = get_window_sums(integral_image, template_height, template_width)
+                window_variances = get_window_sums(squared_integral_image, template_height,
+                                                   template_width) - np.square(window_sums) / pixel_count
+                window_deviations = np.sqrt(np.maximum(window_variances, 0.0))
+                template_deviation = self.template_deviations[template_index]
+                flat_windows = window_deviations <= FLAT_STANDARD_DEVIATION * np.sqrt(pixel_count)
+
+                if template_deviation <= FLAT_STANDARD_DEVIATION * np.sqrt(pixel_count):
+                    # A flat template matches flat windows of about the same intensity
+                    scores = np.where(flat_windows & (np.abs(
+                        window_sums / pixel_count - self.template_means[template_index]) <= 1.0), 1.0, 0.0)
+                else:
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        scores = np.where(flat_windows, 0.0, correlation / (window_deviations * template_deviation))
+
+                best_index = int(np.argmax(scores))
+                best_row, best_column = np.unravel_index(best_index, scores.shape)
+                location = (left + int(best_column) * self.downscale, top + int(best_row) * self.downscale)
+                matches[template_index] = TemplateMatch(template, location, float(min(scores.flat[best_index], 1.0)),
+                                                        timestamp)
+        return matches
+
+
+# Clip file format: a header with the frame shape and pixel format, followed by frame records of a type, a timestamp
+# and a payload. Key frames hold the zlib compressed pixels, delta frames the zlib compressed XOR with the previous
+# recorded frame, and repeated frames no payload.
+CLIP_MAGIC = b'KARTACLIP1'
+CLIP_HEADER = struct.Struct('<10sIII4s')
+FRAME_RECORD_HEADER = struct.Struct('<cdI')
+KEY_FRAME = b'K'
+DELTA_FRAME = b'D'
+REPEATED_FRAME = b'R'
+
+
+class RecordingSegment:
+    def __init__(self, path: str, frame_shape: tuple[int, ...], pixel_format: str, start_time: float):
+        self.path = path
+        self.frame_shape = frame_shape
+        self.pixel_format = pixel_format
+        self.start_time = start_time
+        self.end_time = start_time
+        # Bytes of whole frame records written to the file, readable by clips
+        self.flushed_size = 0
+
+
+class FrameRecorder:
+    """
+    Records frames to disk as they are captured, as delta frames against the previous recorded frame and no pixels for
+    frames the same as the previous matching frame. The recording is split into segments starting with a key frame, and
+    segments older than the pre-roll are deleted, so that the recording holds the last pre-roll seconds at most.
+    Frames are copied to a few slots and encoded by a writer thread, so that capturing is not slowed down by the
+    encoding. Frames arriving while all the slots wait for the writer are dropped from the recording.
+    """
+
+    def __init__(self, pre_roll: float = 10.0, segment_duration: float = 2.0, directory: Optional[str] = None,
+                 compression_level: int = 1, queue_size: int = 4):
+        """
+        :param pre_roll: Seconds of the latest frames kept
+        :param segment_duration: Seconds of frames between key frames
+        :param directory: The directory of the temporary directory of the segments, the system temporary directory if
+                          None
+        :param compression_level: The zlib compression level of the frames
+        :param queue_size: The number of frames waiting for the writer at most
+        """
+        self.pre_roll = pre_roll
+        self.segment_duration = segment_duration
+        self.compression_level = compression_level
+        self.directory = tempfile.mkdtemp(prefix='karta-recording-', dir=directory)
+        self.segments: deque[RecordingSegment] = deque()
+        self.segment_file = None
+        self.segment_count = 0
+        self.previous_frame_data: Optional[np.ndarray] = None
+        # Clips being saved, segments are not deleted while they are copied
+        self.clip_count = 0
+        self.lock = threading.Lock()
+        # Frame slots free to fill, allocated on first use, and the filled slots waiting for the writer
+        self.free_slots: queue.Queue[Optional[np.ndarray]] = queue.Queue()
+        for _ in range(queue_size):
+            self.free_slots.put(None)
+        self.frame_queue: queue.Queue = queue.Queue()
+        self.frame_dropped = False
+        self.dropped_frame_count = 0
+        self.writer_thread = threading.Thread(target=self._write_frames, name='karta-frame-recorder', daemon=True)
+        self.writer_thread.start()
+
+    def write_frame_record(self, frame_type: bytes, timestamp: float, payload: bytes = b''):
+        self.segment_file.write(FRAME_RECORD_HEADER.pack(frame_type, timestamp, len(payload)))
+        self.segment_file.write(payload)
+
+    def flush_segment(self):
+        self.segment_file.flush()
+        with self.lock:
+            self.segments[-1].flushed_size = self.segment_file.tell()
+
+    def start_segment(self, frame_data: np.ndarray, timestamp: float, pixel_format: str):
+        if self.segment_file:
+            self.flush_segment()
+            self.segment_file.close()
+        self.segment_count += 1
+        segment = RecordingSegment(os.path.join(self.directory, 'segment{}.bin'.format(self.segment_count)),
+                                   frame_data.shape, pixel_format, timestamp)
+        self.segment_file = open(segment.path, 'wb')
+        self.write_frame_record(KEY_FRAME, timestamp,
+                                zlib.compress(np.ascontiguousarray(frame_data).data, self.compression_level))
+        self.previous_frame_data = frame_data.copy()
+        with self.lock:
+            self.segments.append(segment)
+
+    def add_frame(self, frame_data: np.ndarray, timestamp: float, same_as_previous: bool = False,
+                  pixel_format: str = 'RGB'):
+        """
+        Record a frame, copying it for the writer thread
+        :param frame_data: The pixels of the frame
+        :param timestamp: The time the frame was captured
+        :param same_as_previous: Whether the frame is the same as the previous matching frame, recorded without pixels
+        :param pixel_format: The pixel format of the frame
+        """
+        try:
+            slot = self.free_slots.get_nowait()
+        except queue.Empty:
+            # The frame after a dropped frame is recorded with its pixels, as it may differ from the last recorded one
+            self.frame_dropped = True
+            self.dropped_frame_count += 1
+            return
+        if slot is None or slot.shape != frame_data.shape:
+            slot = np.empty(frame_data.shape, dtype=np.uint8)
+        slot[...] = frame_data
+        self.frame_queue.put((slot, timestamp, same_as_previous and not self.frame_dropped, pixel_format))
+        self.frame_dropped = False
+
+    def write_frame(self, frame_data: np.ndarray, timestamp: float, same_as_previous: bool, pixel_format: str):
+        current_segment = self.segments[-1] if self.segments else None
+        if not current_segment or current_segment.frame_shape != frame_data.shape or \
+                current_segment.pixel_format != pixel_format or \
+                timestamp - current_segment.start_time >= self.segment_duration:
+            self.start_segment(frame_data, timestamp, pixel_format)
+        elif same_as_previous:
+            self.write_frame_record(REPEATED_FRAME, timestamp)
+        else:
+            delta_data = np.bitwise_xor(frame_data, self.previous_frame_data)
+            self.write_frame_record(DELTA_FRAME, timestamp, zlib.compress(delta_data.data, self.compression_level))
+            self.previous_frame_data[...] = frame_data
+
+        with self.lock:
+            self.segments[-1].end_time = timestamp
+            # Keep the segments with frames in the pre-roll, and all of them while clips are saved
+            while not self.clip_count and len(self.segments) > 1 and \
+                    self.segments[0].end_time < timestamp - self.pre_roll:
+                os.remove(self.segments.popleft().path)
+
+    def _write_frames(self):
+        while (item := self.frame_queue.get()) is not None:
+            if isinstance(item, threading.Event):
+                # Flush marker, set once the frames queued before it are written
+                if self.segment_file:
+                    self.flush_segment()
+                item.set()
+                continue
+            slot = item[0]
+            try:
+                self.write_frame(*item)
+            except Exception as e:
+                logger.warning("Recording frame failed: %s", str(e))
+            self.free_slots.put(slot)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the frames added before are written
+        :return: Whether the frames were written within the timeout
+        """
+        if not self.writer_thread.is_alive():
+            return True
+        flushed = threading.Event()
+        self.frame_queue.put(flushed)
+        return flushed.wait(timeout)
+
+    def save_clip(self, clip_path: str, start_time: Optional[float] = None) -> Optional[str]:
+        """
+        Save the recorded frames to a clip file
+        :param clip_path: The path of the clip file
+        :param start_time: The time of the earliest frames to save, all the recorded frames if None. Frames before it
+                           are saved from the key frame of their segment.
+        :return: The path of the clip file, or None if no frames are recorded
+        """
+        self.flush()
+        with self.lock:
+            if not self.segments:
+                return None
+            last_segment = self.segments[-1]
+            # Segments are copied outside the lock up to their flushed frames, the writer may append to the last one
+            segments = [(segment, segment.flushed_size) for segment in self.segments if
+                        segment.frame_shape == last_segment.frame_shape and
+                        segment.pixel_format == last_segment.pixel_format and
+                        (start_time is None or segment.end_time >= start_time)]
+            self.clip_count += 1
+
+        try:
+            clip_directory = os.path.dirname(clip_path)
+            if clip_directory:
+                os.makedirs(clip_directory, exist_ok=True)
+            height, width, channels = last_segment.frame_shape
+            with open(clip_path, 'wb') as clip_file:
+                clip_file.write(CLIP_HEADER.pack(CLIP_MAGIC, height, width, channels,
+                                                 last_segment.pixel_format.encode('ascii').ljust(4)))
+                for segment, segment_size in segments:
+                    with open(segment.path, 'rb') as segment_file:
+                        clip_file.write(segment_file.read(segment_size))
+        finally:
+            with self.lock:
+                self.clip_count -= 1
+        return clip_path
+
+    def close(self):
+        self.frame_queue.put(None)
+        self.writer_thread.join()
+        if self.segment_file:
+            self.segment_file.close()
+            self.segment_file = None
+        with self.lock:
+            self.segments.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def read_clip(clip_path: str) -> Iterator[ImageFrame]:
+    """
+    Read the frames of a clip saved by a frame recorder
+    :param clip_path: The path of the clip file
+    :return: The frames of the clip in order
+    """
+    with open(clip_path, 'rb') as clip_file:
+        magic, height, width, channels, pixel_format = CLIP_HEADER.unpack(clip_file.read(CLIP_HEADER.size))
+        if magic != CLIP_MAGIC:
+            raise ValueError("Not a clip file: " + clip_path)
+        pixel_format = pixel_format.decode('ascii').strip()
+        frame_shape = (height, width, channels)
+        frame_data = None
+        index = 0
+        while record_header := clip_file.read(FRAME_RECORD_HEADER.size):
+            frame_type, timestamp, payload_length = FRAME_RECORD_HEADER.unpack(record_header)
+            payload = clip_file.read(payload_length)
+            if frame_type == KEY_FRAME:
+                frame_data = np.frombuffer(zlib.decompress(payload), dtype=np.uint8).reshape(frame_shape)
+            elif frame_data is None:
+                raise ValueError("Clip does not start with a key frame: " + clip_path)
+            elif frame_type == DELTA_FRAME:
+                frame_data = np.bitwise_xor(frame_data,
+                                            np.frombuffer(zlib.decompress(payload), dtype=np.uint8).reshape(
+                                                frame_shape))
+            yield ImageFrame(frame_data, timestamp, index, frame_type == REPEATED_FRAME, pixel_format)
+            index += 1
 
 
 class ScreenCapture:
 
     def __init__(self, frame_rate: Optional[int] = None, monitor: Optional[int] = None,
-                 screen_area: Optional[Union[dict[str, int], tuple[int, int, int, int]]] = None):
+                 screen_area: Optional[Union[dict[str, int], tuple[int, int, int, int]]] = None,
+                 buffer_size: int = 8, change_tolerance: float = 0.0, sample_step: int = 2, block_size: int = 8):
+        """
+        :param frame_rate: Frames captured per second
+        :param monitor: The index of the monitor to capture
+        :param screen_area: The area to capture instead of a monitor
+        :param buffer_size: The number of frames kept for reading, older unread frames are dropped. Every frame slot
+                            holds a full screen of BGRA pixels, about 8 MB at 1080p.
+        :param change_tolerance: The largest difference of the average colour of a block of pixels between frames, out
+                                 of 255, for which the block is treated as unchanged
+        :param sample_step: Change detection samples every sample_step-th pixel of every sample_step-th row
+        :param block_size: The width and height of the blocks of sampled pixels compared by change detection
+        """
         self.capture_thread = None
         self.capturing = False
-        self.frame_queue = queue.Queue()
-
-        self.first_frame = None
-        self.previous_matching_frame = None
+        self.buffer_size = buffer_size
+        self.frame_buffer: Optional[FrameRingBuffer] = None
+        # Set on each captured frame to wake up waits for frames
+        self.frame_event = threading.Event()
+
+        self.change_detector = FrameChangeDetector(change_tolerance, sample_step, block_size)
+        # Records the captured frames in recorder mode
+        self.recorder: Optional[FrameRecorder] = None
+        # Screen grabbers are kept open per thread, as they can only be used by the thread which opened them
+        self.thread_grabbers = threading.local()
+        self.grabbers = []
+        self.grabbers_lock = threading.Lock()
 
         if frame_rate:
             if frame_rate <= 0:
@@ -49,26 +620,54 @@ class ScreenCapture:
 
         self.wait_time_per_frame = 1.0 / self.frame_rate
 
-        with mss.mss() as sct:
-            if monitor and screen_area:
-                raise ValueError("Specify either monitor or screen_area, not both.")
+        if monitor and screen_area:
+            raise ValueError("Specify either monitor or screen_area, not both.")
 
-            if monitor:
-                self.monitor = sct.monitors[monitor]
-            elif screen_area:
-                if not isinstance(screen_area, (tuple, dict)):
-                    raise ValueError("screen_area must be a dict or tuple specifying the area to capture.")
-                self.screen_area = screen_area
-            else:
-                self.monitor = sct.monitors[1]
+        if monitor:
+            self.monitor = self.get_grabber().monitors[monitor]
+        elif screen_area:
+            if not isinstance(screen_area, (tuple, dict)):
+                raise ValueError("screen_area must be a dict or tuple specifying the area to capture.")
+            self.screen_area = screen_area
+        else:
+            self.monitor = self.get_grabber().monitors[1]
 
-    def start_capture(self):
-        if self.capturing and self.capture_thread.is_alive:
-            return  # Already capturing
+    def start_capture(self) -> bool:
+        """
+        Start capturing frames unless already capturing
+        :return: Whether capturing was started
+        """
+        if self.capturing and self.capture_thread and self.capture_thread.is_alive():
+            return False  # Already capturing
 
         self.capturing = True
         self.capture_thread = threading.Thread(target=self._capture_frames, daemon=True)
         self.capture_thread.start()
+        return True
+
+    def start_recording(self, recorder: FrameRecorder):
+        """
+        Start capturing frames in recorder mode, recording every captured frame until recording is stopped. Waits for
+        frames while recording leave the capture running.
+        :param recorder: The recorder of the frames
+        """
+        self.recorder = recorder
+        self.start_capture()
+
+    def stop_recording(self):
+        self.stop_capture()
+        self.recorder = None
+
+    def start_wait_capture(self) -> bool:
+        """
+        Start capturing for a wait, or only forget the unread frames if already capturing such as while recording
+        :return: Whether capturing was started, and has to be stopped after the wait
+        """
+        if self.start_capture():
+            return True
+        if self.frame_buffer:
+            self.frame_buffer.clear()
+        return False
 
     def stop_capture(self):
         if self.capture_thread:
@@ -79,26 +678,42 @@ class ScreenCapture:
         else:
             self.capturing = False
 
-        # Clear the frame queue
-        if self.frame_queue:
-            self.frame_queue.queue.clear()
+        # Clear the frame buffer
+        if self.frame_buffer:
+            self.frame_buffer.clear()
 
-        if self.first_frame:
-            self.first_frame = None
-
-        if self.previous_matching_frame:
-            self.previous_matching_frame = None
+        self.change_detector.reset()
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.stop_capture()
+        self.close_grabbers()
+
+    def get_grabber(self):
+        """
+        Get the screen grabber of the current thread, opening it on first use and keeping it open for later grabs
+        """
+        grabber = getattr(self.thread_grabbers, 'grabber', None)
+        if grabber is None:
+            grabber = mss.mss()
+            self.thread_grabbers.grabber = grabber
+            with self.grabbers_lock:
+                self.grabbers.append(grabber)
+        return grabber
+
+    def close_grabbers(self):
+        with self.grabbers_lock:
+            grabbers = self.grabbers
+            self.grabbers = []
+        for grabber in grabbers:
+            grabber.close()
+        self.thread_grabbers = threading.local()
 
     def capture_frame(self):
         capture_param = self.monitor if hasattr(self, 'monitor') else self.screen_area
-        with mss.mss() as sct:
-            return sct.grab(capture_param)
+        return self.get_grabber().grab(capture_param)
 
     def save_screenshot(self, filepath: str):
         screenshot = self.capture_frame()
@@ -107,81 +722,213 @@ class ScreenCapture:
     def _capture_frames(self):
         self.capturing = True
         capture_param = self.monitor if hasattr(self, 'monitor') else self.screen_area
-        frame_index = 0
-        with mss.mss() as sct:
+        # One grabber is kept open for all the frames of the capture session
+        with mss.mss() as grabber:
             while self.capturing:
                 start_time = time.time()
-                image = sct.grab(capture_param)
-                frame = ImageFrame(data=image.rgb, timestamp=time.time(), index=frame_index)
-                frame_index += 1
-
-                if self.first_frame is None:
-                    frame.same_as_previous = True
-                    self.first_frame = frame
-                    self.previous_matching_frame = frame
-                else:
-                    if frame == self.previous_matching_frame:
-                        # Use data from previous matching frame to save memory
-                        frame.data = self.previous_matching_frame.data
-                        frame.same_as_previous = True
-                    else:
-                        frame.same_as_previous = False
-                        self.previous_matching_frame = frame
-
-                self.frame_queue.put(frame)
+                # Monotonic time the screen was grabbed at, for response times measured from a trigger
+                capture_time = time.perf_counter()
+                image = grabber.grab(capture_param)
+                frame_shape = (image.height, image.width, 4)
+                if self.frame_buffer is None or self.frame_buffer.frames.shape[1:] != frame_shape:
+                    self.frame_buffer = FrameRingBuffer(self.buffer_size, frame_shape, 'BGRA')
+
+                # The raw BGRA pixels are copied into the frame slot as they are, converted only by readers needing RGB
+                frame_data = self.frame_buffer.get_write_slot()
+                frame_data[...] = np.frombuffer(image.raw, dtype=np.uint8).reshape(frame_shape)
+                # The first frame is the first matching frame, the same as itself
+                same_as_previous = self.change_detector.is_same_as_previous(
+                    frame_data) or self.frame_buffer.write_count == 0
+                timestamp = time.time()
+                self.frame_buffer.add(timestamp, same_as_previous, capture_time)
+                self.frame_event.set()
+
+                if self.recorder:
+                    try:
+                        self.recorder.add_frame(frame_data, timestamp, same_as_previous, 'BGRA')
+                    except Exception as e:
+                        logger.warning("Recording frame failed, stopping recording: %s", str(e))
+                        self.recorder = None
 
                 elapsed_time = time.time() - start_time
                 sleep_time = max(0.0, self.wait_time_per_frame - elapsed_time)
                 if sleep_time > 0:
                     time.sleep(sleep_time)
 
+    def read_frame(self) -> Optional[ImageFrame]:
+        return self.frame_buffer.read() if self.frame_buffer else None
+
     def has_frame_changed(self):
         if not self.capturing:
             raise RuntimeError("Screen capture is not running. Call start_capture() first.")
 
         while True:
-            try:
-                frame = self.frame_queue.get_nowait()
-                if not frame.same_as_previous:
-                    return True, frame.timestamp
-            except queue.Empty:
+            frame = self.read_frame()
+            if frame is None:
                 return False, time.time()
+            if not frame.same_as_previous:
+                return True, frame.timestamp
 
     def wait_until_frame_changes(self, timeout: float, check_interval: float = 0.1) -> tuple:
         if not check_interval or check_interval <= 0:
             check_interval = 0.1
 
-        self.start_capture()
-
+        capture_started = self.start_wait_capture()
         try:
-            wait_result, image_change_time = wait_until(self.has_frame_changed, timeout, check_interval)
+            _, condition_outcomes = wait_for_conditions([self.has_frame_changed], timeout, check_interval,
+                                                        sleep_function=sleep_until_notified(self.frame_event))
+            wait_result, image_change_time = condition_outcomes[0]
             if not image_change_time:
                 image_change_time = time.time()
             return wait_result, image_change_time
         finally:
-            self.stop_capture()
+            if capture_started:
+                self.stop_capture()
 
-    def is_frame_matching(self, image_rgb_data: bytes):
+    def is_frame_matching(self, image_rgb_data: Union[bytes, np.ndarray]):
         if not self.capturing:
             raise RuntimeError("Screen capture is not running. Call start_capture() first.")
 
+        image_data = np.frombuffer(image_rgb_data, dtype=np.uint8) if isinstance(image_rgb_data, bytes) else \
+            image_rgb_data
         while True:
-            try:
-                frame = self.frame_queue.get_nowait()
-                if frame.data == image_rgb_data:
-                    return True, frame.timestamp
-            except queue.Empty:
+            frame = self.read_frame()
+            if frame is None:
                 return False, time.time()
+            # Compare the colour channels of the frame in RGB order without converting the frame
+            height, width = frame.data.shape[:2]
+            if image_data.size == height * width * 3 and np.array_equal(
+                    frame.data[..., 2::-1] if frame.pixel_format == 'BGRA' else frame.data,
+                    image_data.reshape(height, width, 3)):
+                return True, frame.timestamp
+
+    def find_templates(self, template_matcher: TemplateMatcher, match_all: bool = False) -> tuple[
+        bool, list[TemplateMatch]]:
+        """
+        Find templates in the newest captured frame, skipping older frames so that matching keeps up with capturing
+        :param template_matcher: The matcher of the templates
+        :param match_all: Whether all the templates must match instead of any of them
+        :return: Whether the templates matched, and the best match of each template in the frame
+        """
+        if not self.capturing:
+            raise RuntimeError("Screen capture is not running. Call start_capture() first.")
+
+        frame = self.frame_buffer.read_latest() if self.frame_buffer else None
+        if frame is None:
+            return False, []
+        matches = template_matcher.match(frame.data, frame.timestamp, frame.pixel_format)
+        matched = [template_match.matched for template_match in matches]
+        return all(matched) if match_all else any(matched), matches
+
+    def wait_until_templates_match(self, templates: list[Template], timeout: float, check_interval: float = 0.1,
+                                   match_all: bool = False, downscale: int = 1) -> tuple[bool, list[TemplateMatch]]:
+        """
+        Wait until any, or all, of the templates are found in a captured frame
+        :param templates: The templates to find
+        :param timeout: Maximum time to wait in seconds
+        :param check_interval: Longest time to wait between checks of new frames in seconds
+        :param match_all: Whether all the templates must match in the same frame instead of any of them
+        :param downscale: Match every downscale-th pixel of every downscale-th row
+        :return: Whether the templates matched, and the best match of each template in the last frame checked
+        """
+        if not check_interval or check_interval <= 0:
+            check_interval = 0.1
+
+        template_matcher = TemplateMatcher(templates, downscale)
+        capture_started = self.start_wait_capture()
+        try:
+            _, condition_outcomes = wait_for_conditions([lambda: self.find_templates(template_matcher, match_all)],
+                                                        timeout, check_interval,
+                                                        sleep_function=sleep_until_notified(self.frame_event))
+            return condition_outcomes[0]
+        finally:
+            if capture_started:
+                self.stop_capture()
+
+    def find_response(self, trigger_time: float, template_matcher: Optional[TemplateMatcher] = None,
+                      match_all: bool = False) -> Union[bool, tuple[bool, float]]:
+        """
+        Find the first frame captured after the trigger which changed, or in which the templates match, checking every
+        unread frame in order
+        :param trigger_time: time.perf_counter() of the trigger
+        :param template_matcher: The matcher of the templates, or None to find the first changed frame
+        :param match_all: Whether all the templates must match instead of any of them
+        :return: Whether the response was found, and the capture time of its frame
+        """
+        if not self.capturing:
+            raise RuntimeError("Screen capture is not running. Call start_capture() first.")
+
+        while (frame := self.read_frame()) is not None:
+            if frame.capture_time is None or frame.capture_time < trigger_time:
+                continue
+            if template_matcher:
+                matched = [template_match.matched for template_match in
+                           template_matcher.match(frame.data, frame.timestamp, frame.pixel_format)]
+                if all(matched) if match_all else any(matched):
+                    return True, frame.capture_time
+            elif not frame.same_as_previous:
+                return True, frame.capture_time
+        return False
+
+    def measure_response_time(self, trigger: Callable[[], Any], timeout: float,
+                              templates: Optional[list[Template]] = None, match_all: bool = False,
+                              downscale: int = 1, measurements: Optional[Measurements] = None,
+                              name: str = 'response_time') -> Optional[float]:
+        """
+        Measure the time from a trigger, such as Element.click, to the capture of the first frame of the screen which
+        changed, or in which the templates match. The precision is the time between frames, and frames dropped from
+        the frame buffer before they are checked are not seen.
+        :param trigger: Performs the action, returning its time.perf_counter() if taken more precisely than the call
+        :param timeout: Maximum time to wait for the response in seconds
+        :param templates: The templates of the response, or None for any change of the screen
+        :param match_all: Whether all the templates must match in the same frame instead of any of them
+        :param downscale: Match every downscale-th pixel of every downscale-th row
+        :param measurements: The measurements to record the response time into, such as context.measurements
+        :param name: The name of the measurement recorded
+        :return: The response time in seconds, or None if there was no response before the timeout
+        """
+        template_matcher = TemplateMatcher(templates, downscale) if templates else None
+        capture_started = self.start_wait_capture()
+        try:
+            # The frames after the trigger are compared to a frame of the screen before it
+            baseline_captured, _ = wait_for_conditions(
+                [lambda: self.frame_buffer is not None and self.frame_buffer.write_count > 0], timeout,
+                self.wait_time_per_frame, sleep_function=sleep_until_notified(self.frame_event))
+            if not baseline_captured:
+                raise RuntimeError("No frame was captured before the trigger.")
+
+            trigger_time = time.perf_counter()
+            trigger_return = trigger()
+            if isinstance(trigger_return, float):
+                trigger_time = trigger_return
+
+            response_found, condition_outcomes = wait_for_conditions(
+                [lambda: self.find_response(trigger_time, template_matcher, match_all)], timeout,
+                self.wait_time_per_frame, sleep_function=sleep_until_notified(self.frame_event))
+            if not response_found:
+                return None
+            response_time = condition_outcomes[0][1] - trigger_time
+            if measurements is not None:
+                measurements.record(name, response_time)
+            return response_time
+        finally:
+            if capture_started:
+                self.stop_capture()
 
     def wait_until_frame_matches(self, image_rgb_data: bytes, timeout: float, check_interval: float = 0.1) -> tuple:
         if not check_interval or check_interval <= 0:
             check_interval = 0.1
 
-        self.start_capture()
+        capture_started = self.start_wait_capture()
         try:
-            wait_result, image_appear_time = wait_until(self.is_frame_matching, timeout, check_interval, image_rgb_data)
+            image_data = np.frombuffer(image_rgb_data, dtype=np.uint8)
+            _, condition_outcomes = wait_for_conditions([lambda: self.is_frame_matching(image_data)], timeout,
+                                                        check_interval,
+                                                        sleep_function=sleep_until_notified(self.frame_event))
+            wait_result, image_appear_time = condition_outcomes[0]
             if not image_appear_time:
                 image_appear_time = time.time()
             return wait_result, image_appear_time
         finally:
-            self.start_capture()
+            if capture_started:
+                self.stop_capture()
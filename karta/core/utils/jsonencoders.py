@@ -17,5 +17,9 @@ class CustomJSONEncoder(json.JSONEncoder):
         object_type = type(obj)
         if object_type in coder_mapping.keys():
             return coder_mapping[object_type](obj)
+        elif hasattr(obj, 'model_dump'):
+            return obj.model_dump(mode='json')
+        elif isinstance(obj, (set, frozenset)):
+            return list(obj)
         else:
             return json.JSONEncoder.default(self, obj)
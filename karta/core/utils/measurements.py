@@ -0,0 +1,30 @@
+import threading
+
+from karta.core.models.test_execution import LatencyDistribution
+
+
+class Measurements:
+    """
+    Time measurements recorded by a step, such as response times, available to steps as context.measurements and
+    aggregated into latency distributions in the step result
+    """
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+        self.lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        """
+        Record a measurement
+        :param name: The name of the measurement, repeated measurements of a name form its distribution
+        :param seconds: The measured time in seconds
+        """
+        with self.lock:
+            self.samples.setdefault(name, []).append(seconds)
+
+    def get_distributions(self) -> dict[str, LatencyDistribution]:
+        with self.lock:
+            return {name: LatencyDistribution.from_samples(samples) for name, samples in self.samples.items()}
+
+    def __bool__(self):
+        return bool(self.samples)
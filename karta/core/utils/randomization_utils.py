@@ -1,9 +1,38 @@
-from random import Random
-from typing import TypeVar
+import hashlib
+from bisect import bisect_left
+from random import Random, SystemRandom
+from typing import TypeVar, Generic, Sequence, Optional
 
 ITEM = TypeVar('ITEM')
 
 
+def generate_seed() -> int:
+    """
+    Generates a new 64 bit root seed from the system entropy source.
+    """
+    return SystemRandom().getrandbits(64)
+
+
+def derive_seed(seed: int, *keys) -> int:
+    """
+    Derives an independent 64 bit seed for the random stream identified by keys under the parent seed.
+    The derived seed only depends on the parent seed and the keys, so any stream can be recreated without replaying the
+    streams before it.
+    :param seed: The parent seed
+    :param keys: Hashable values with a stable repr (str, int, float, None) identifying the child stream
+    :return: The derived seed
+    """
+    digest = hashlib.blake2b(repr((seed, *keys)).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def derive_random(seed: int, *keys) -> Random:
+    """
+    Creates a Random for the random stream identified by keys under the parent seed.
+    """
+    return Random(derive_seed(seed, *keys))
+
+
 def generate_next_composition_from_probability_map(probability_map: dict[ITEM, float], random: Random) -> list[ITEM]:
     chosen_objects = []
 
@@ -82,3 +111,87 @@ def generate_next_mutex_composition_from_objects(objects_with_probability: list[
         raise SyntaxError("probability total for mutex combination need to be 1.0f")
 
     return return_value
+
+
+def validate_probabilities(probabilities: list[float]) -> list[float]:
+    for probability in probabilities:
+        if not isinstance(probability, float) or not (0.0 < probability <= 1.0):
+            raise SyntaxError("probability needs to be an floating point value between 0-1")
+    return probabilities
+
+
+def get_mutex_cumulative_probabilities(probabilities: list[float]) -> list[float]:
+    cumulative_probabilities = []
+    probabilty_covered = 0.0
+    for probability in probabilities:
+        if not (0.0 < probability <= 1.0):
+            raise SyntaxError("probability needs to be an floating point value between 0-1")
+        probabilty_covered += probability
+        cumulative_probabilities.append(probabilty_covered)
+
+    if round(probabilty_covered, 2) != 1.0:
+        raise SyntaxError("probability total for mutex combination need to be 1.0f")
+
+    return cumulative_probabilities
+
+
+def get_object_probability(obj) -> float:
+    probability = obj.probability if hasattr(obj, 'probability') else 1.0
+    return 1.0 if probability is None else probability
+
+
+class CompositionSampler(Generic[ITEM]):
+    """
+    Immutable, validated sampling structure to choose a composition of independent objects with their probabilities.
+    Validation is done once on creation so that each draw only compares random chances.
+    """
+    __slots__ = ('objects', 'probabilities')
+
+    def __init__(self, objects: Sequence[ITEM], probabilities: Sequence[float]):
+        if len(objects) != len(probabilities):
+            raise ValueError("Number of objects and probabilities need to match")
+        self.objects: tuple[ITEM, ...] = tuple(objects)
+        self.probabilities: tuple[float, ...] = tuple(validate_probabilities(list(probabilities)))
+
+    @classmethod
+    def from_probability_map(cls, probability_map: dict[ITEM, float]) -> 'CompositionSampler[ITEM]':
+        return cls(list(probability_map.keys()), list(probability_map.values()))
+
+    @classmethod
+    def from_objects(cls, objects_with_probability: Sequence[ITEM]) -> 'CompositionSampler[ITEM]':
+        return cls(objects_with_probability, [get_object_probability(obj) for obj in objects_with_probability])
+
+    def generate_next(self, random: Random) -> list[ITEM]:
+        # A random chance is drawn for every object, same as generate_next_composition_from_probability_map
+        return [obj for obj, probability in zip(self.objects, self.probabilities) if
+                random.uniform(0.0, 1.0) <= probability]
+
+
+class MutexCompositionSampler(Generic[ITEM]):
+    """
+    Immutable, validated sampling structure to choose one of mutually exclusive objects with their probabilities.
+    The cumulative probabilities are computed once on creation and each draw is a binary search over them.
+    """
+    __slots__ = ('objects', 'cumulative_probabilities')
+
+    def __init__(self, objects: Sequence[ITEM], probabilities: Sequence[float]):
+        if len(objects) != len(probabilities):
+            raise ValueError("Number of objects and probabilities need to match")
+        self.objects: tuple[ITEM, ...] = tuple(objects)
+        self.cumulative_probabilities: tuple[float, ...] = tuple(
+            get_mutex_cumulative_probabilities(list(probabilities))) if self.objects else ()
+
+    @classmethod
+    def from_probability_map(cls, probability_map: dict[ITEM, float]) -> 'MutexCompositionSampler[ITEM]':
+        return cls(list(probability_map.keys()), list(probability_map.values()))
+
+    @classmethod
+    def from_objects(cls, objects_with_probability: Sequence[ITEM]) -> 'MutexCompositionSampler[ITEM]':
+        return cls(objects_with_probability, [get_object_probability(obj) for obj in objects_with_probability])
+
+    def generate_next(self, random: Random) -> Optional[ITEM]:
+        if not self.objects:
+            return None
+        # First object whose cumulative probability covers the random chance
+        index = bisect_left(self.cumulative_probabilities, random.uniform(0.0, 1.0))
+        return self.objects[min(index, len(self.objects) - 1)]
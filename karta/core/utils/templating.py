@@ -0,0 +1,101 @@
+import re
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Optional
+
+# Returned by variable lookups for variables not found in a scope
+MISSING = object()
+
+
+def lookup_variable(scope: Any, name: str) -> Any:
+    """
+    Look up a variable in a scope, as a key of the scope or as a dotted path into its nested dictionaries, lists and
+    object attributes such as ${properties.browser.name} or ${data.users.0}
+    :param scope: The dictionary of variables
+    :param name: The name or dotted path of the variable
+    :return: The value of the variable, or MISSING if not found
+    """
+    if isinstance(scope, Mapping) and name in scope:
+        return scope[name]
+    value = scope
+    for key in name.split('.'):
+        if isinstance(value, Mapping):
+            value = value.get(key, MISSING)
+        elif isinstance(value, (list, tuple)) and key.isdigit():
+            value = value[int(key)] if int(key) < len(value) else MISSING
+        elif key and not key.startswith('_') and not isinstance(value, (str, bytes)):
+            value = getattr(value, key, MISSING)
+        else:
+            return MISSING
+        if value is MISSING:
+            return MISSING
+    return value
+
+
+class VariableTemplate:
+    """
+    A string with variable placeholders split once into literal text and variable names, rendered in one pass
+    """
+
+    def __init__(self, parts: list[str], variable_prefix: str = '${', variable_suffix: str = '}'):
+        """
+        :param parts: The literal text at even indexes and the variable names at odd indexes
+        :param variable_prefix: The prefix of the variable placeholders
+        :param variable_suffix: The suffix of the variable placeholders
+        """
+        self.parts = tuple(parts)
+        self.variable_prefix = variable_prefix
+        self.variable_suffix = variable_suffix
+
+    @property
+    def variable_names(self) -> tuple[str, ...]:
+        return self.parts[1::2]
+
+    def render(self, *scopes: Optional[Mapping]) -> str:
+        """
+        Replace the variables with their values from the first scope having them, leaving variables not found as they
+        are. Replaced values are not searched for variables again.
+        :param scopes: The dictionaries of variables in the priority order
+        :return: The rendered string
+        """
+        if len(self.parts) == 1:
+            return self.parts[0]
+        rendered_parts = list(self.parts)
+        for index in range(1, len(rendered_parts), 2):
+            name = rendered_parts[index]
+            for scope in scopes:
+                if scope is None:
+                    continue
+                value = lookup_variable(scope, name)
+                if value is not MISSING:
+                    rendered_parts[index] = str(value)
+                    break
+            else:
+                rendered_parts[index] = self.variable_prefix + name + self.variable_suffix
+        return ''.join(rendered_parts)
+
+
+@lru_cache(maxsize=4096)
+def compile_template(string_to_compile: str, variable_prefix: str = '${', variable_suffix: str = '}') -> \
+        VariableTemplate:
+    """
+    Tokenize the variable placeholders of a string, cached per string
+    """
+    variable_regex = re.escape(variable_prefix) + '(.*?)' + re.escape(variable_suffix)
+    return VariableTemplate(re.split(variable_regex, string_to_compile, flags=re.DOTALL), variable_prefix,
+                            variable_suffix)
+
+
+def render_template(string_to_process: str, *scopes: Optional[Mapping], variable_prefix: str = '${',
+                    variable_suffix: str = '}') -> str:
+    """
+    Replace the variables of a string in one pass with their values from the first scope having them
+    :param string_to_process: The string with variable placeholders
+    :param scopes: The dictionaries of variables in the priority order
+    :param variable_prefix: The prefix of the variable placeholders
+    :param variable_suffix: The suffix of the variable placeholders
+    :return: The rendered string
+    """
+    if variable_prefix not in string_to_process:
+        return string_to_process
+    return compile_template(string_to_process, variable_prefix, variable_suffix).render(*scopes)
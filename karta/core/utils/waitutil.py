@@ -1,40 +1,125 @@
-from time import time, sleep
-from typing import Callable, Union
+import random
+import threading
+from time import monotonic, sleep
+from typing import Callable, Optional, Sequence, Union
+
+ConditionOutcome = Union[bool, tuple[bool, ...]]
+
+# Interval of the first condition check after the initial one, when it is shorter than the check interval
+INITIAL_CHECK_INTERVAL = 0.01
+
+
+def is_condition_met(condition_outcome: Optional[ConditionOutcome]) -> bool:
+    """
+    Checks the outcome of a condition, a boolean or a tuple whose first element is a boolean.
+    """
+    return bool((isinstance(condition_outcome, bool) and condition_outcome) or (
+            isinstance(condition_outcome, tuple) and len(condition_outcome) > 0 and condition_outcome[0]))
+
+
+class Backoff:
+    """
+    Intervals between condition checks, growing from an initial interval to a maximum interval, with random jitter so
+    that waits started together do not check in lockstep.
+    """
+
+    def __init__(self, initial_interval: float, max_interval: float, factor: float = 2.0, jitter: float = 0.1):
+        """
+        :param initial_interval: The first interval in seconds
+        :param max_interval: The largest interval in seconds
+        :param factor: The growth of the interval after each check
+        :param jitter: The fraction of each interval by which it is randomly shortened or lengthened
+        """
+        self.interval = min(initial_interval, max_interval)
+        self.max_interval = max_interval
+        self.factor = factor
+        self.jitter = jitter
+
+    def next_interval(self) -> float:
+        interval = self.interval
+        self.interval = min(self.interval * self.factor, self.max_interval)
+        return interval * (1.0 + random.uniform(-self.jitter, self.jitter))
+
+
+def sleep_until_notified(wake_event: threading.Event) -> Callable[[float], None]:
+    """
+    Get a sleep function for waits which returns early when the event is set, such as by a producer of a queue.
+    :param wake_event: The event set to wake up the wait
+    :return: The sleep function taking the seconds to sleep at most
+    """
+
+    def sleep_or_wake(interval: float):
+        if wake_event.wait(interval):
+            wake_event.clear()
+
+    return sleep_or_wake
+
+
+def wait_for_conditions(
+        conditions: Sequence[Callable[[], ConditionOutcome]],
+        timeout: float,
+        check_interval: float = 0.1,
+        wait_for_all: bool = False,
+        initial_interval: Optional[float] = None,
+        sleep_function: Optional[Callable[[float], None]] = None,
+        ignored_exceptions: tuple[type[BaseException], ...] = (),
+) -> tuple[bool, list[Optional[ConditionOutcome]]]:
+    """
+    Waits until any, or all, of the conditions are met or the timeout is reached, checking the conditions together on
+    each poll. Checks stop at the first met condition, or the first unmet one when waiting for all.
+    The interval between polls backs off from the initial interval to the check interval with jitter. The sleep
+    function between polls may return early on a notification, so that the wait returns as soon as a condition holds.
+    :param conditions: Callables returning a boolean or a tuple whose first element is a boolean.
+    :param timeout: Maximum time to wait in seconds.
+    :param check_interval: Longest time to wait between condition checks in seconds.
+    :param wait_for_all: Wait for all the conditions instead of any of them.
+    :param initial_interval: Time to wait before the first repeated check in seconds, shorter than the check interval.
+    :param sleep_function: Sleeps between checks for the seconds passed, returning early if notified.
+    :param ignored_exceptions: Exceptions raised by conditions which count as the condition not being met.
+    :return: Whether the conditions were met, and the last outcome of each condition or None if it was not checked.
+    """
+    deadline = monotonic() + timeout
+    if initial_interval is None:
+        initial_interval = min(check_interval, INITIAL_CHECK_INTERVAL)
+    backoff = Backoff(initial_interval, check_interval)
+    sleep_function = sleep_function or sleep
+    condition_outcomes: list[Optional[ConditionOutcome]] = [None] * len(conditions)
+
+    while True:
+        conditions_met = wait_for_all
+        for index, condition in enumerate(conditions):
+            try:
+                condition_outcomes[index] = condition()
+            except ignored_exceptions:
+                condition_outcomes[index] = False
+            if is_condition_met(condition_outcomes[index]) != wait_for_all:
+                conditions_met = not wait_for_all
+                break
+        if conditions_met:
+            return True, condition_outcomes
+
+        remaining_time = deadline - monotonic()
+        if remaining_time <= 0:
+            return False, condition_outcomes
+        sleep_function(min(backoff.next_interval(), remaining_time))
 
 
 def wait_until(
-        condition: Callable[..., Union[bool, tuple[bool, ...]]],
+        condition: Callable[..., ConditionOutcome],
         timeout: float,
         check_interval: float = 0.1,
         *condition_args,
         **condition_kwargs,
-) -> Union[bool, tuple[bool, ...]]:
+) -> ConditionOutcome:
     """
     Waits until the given condition is True or the timeout is reached.
     :param condition: A callable that returns a boolean or a tuple whose first element is a boolean.
     :param timeout: Maximum time to wait in seconds.
-    :param check_interval: Time to wait between condition checks in seconds.
+    :param check_interval: Longest time to wait between condition checks in seconds.
     :param condition_args: Positional arguments to pass to the condition callable.
     :param condition_kwargs: Keyword arguments to pass to the condition callable.
     :return: The result of the condition callable when it returns True, or the last result before timeout.
     """
-    start_time = time()
-    expected_elapsed_time = 0.0
-
-    if timeout <= 0:
-        return condition(*condition_args, **condition_kwargs)
-
-    condition_outcome = None
-    while time() - start_time < timeout:
-        condition_outcome = condition(*condition_args, **condition_kwargs)
-        condition_result = (isinstance(condition_outcome, bool) and condition_outcome) or (
-                isinstance(condition_outcome, tuple) and len(condition_outcome) > 0 and condition_outcome[0])
-        if condition_result:
-            return condition_outcome
-        elapsed_time = time() - start_time
-        expected_elapsed_time += check_interval
-        time_to_sleep = expected_elapsed_time - elapsed_time
-        if time_to_sleep > 0:
-            sleep(check_interval)
-
-    return condition_outcome if condition_outcome is not None else condition(*condition_args, **condition_kwargs)
+    _, condition_outcomes = wait_for_conditions([lambda: condition(*condition_args, **condition_kwargs)], timeout,
+                                                check_interval)
+    return condition_outcomes[0]
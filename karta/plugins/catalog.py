@@ -1,3 +1,4 @@
+import os
 from typing import Optional
 
 from karta.core.interfaces.plugins import TestCatalogManager
@@ -8,6 +9,7 @@ class KartaTestCatalogManager(TestCatalogManager):
     feature_map: dict[str, set[Feature]] = {}
     scenario_map: dict[str, set[Scenario]] = {}
     scenario_to_feature_map: dict[Scenario, Feature] = {}
+    scenario_location_map: dict[tuple[str, int], Scenario] = {}
 
     def list_scenarios(self):
         return self.scenario_map
@@ -20,6 +22,8 @@ class KartaTestCatalogManager(TestCatalogManager):
             if feature.name not in self.feature_map.keys():
                 self.feature_map[feature.name] = set()
             self.feature_map[feature.name].add(feature)
+            for scenario in feature.scenarios:
+                self.scenario_to_feature_map[scenario] = feature
             for tag in feature.tags:
                 if tag not in self.feature_map.keys():
                     self.feature_map[tag] = set()
@@ -27,7 +31,6 @@ class KartaTestCatalogManager(TestCatalogManager):
                 if tag not in self.scenario_map.keys():
                     self.scenario_map[tag] = set()
                 for scenario in feature.scenarios:
-                    self.scenario_to_feature_map[scenario] = feature
                     if scenario not in self.scenario_map[tag]:
                         self.scenario_map[tag].add(scenario)
 
@@ -39,6 +42,8 @@ class KartaTestCatalogManager(TestCatalogManager):
             if scenario.name not in self.scenario_map.keys():
                 self.scenario_map[scenario.name] = set()
             self.scenario_map[scenario.name].add(scenario)
+            if scenario.source:
+                self.scenario_location_map[(os.path.normpath(scenario.source), scenario.line_number)] = scenario
             for tag in scenario.tags:
                 if tag not in self.scenario_map.keys():
                     self.scenario_map[tag] = set()
@@ -61,3 +66,8 @@ class KartaTestCatalogManager(TestCatalogManager):
         :return: The feature for the scenario
         """
         return self.scenario_to_feature_map.get(scenario, None)
+
+    def get_scenario_by_location(self, source: str, line_number: int) -> Optional[Scenario]:
+        if not source:
+            return None
+        return self.scenario_location_map.get((os.path.normpath(source), line_number), None)
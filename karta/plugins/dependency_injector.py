@@ -1,7 +1,9 @@
-from typing import Optional, TypeVar
+import weakref
+from typing import Optional, TypeVar, Callable, Iterable
 
 from karta.core.interfaces.plugins import DependencyInjector
 from karta.core.utils.datautils import is_builtin_class_instance
+from karta.plugins.fixtures import FixtureManager
 
 
 class Inject:
@@ -15,12 +17,71 @@ class Inject:
         return self
 
 
+class InjectionPlan:
+    """
+    The Inject fields of a class with the names of the objects to inject into them, and its __post_inject__ hook
+    """
+
+    def __init__(self, object_class: type):
+        self.object_class = object_class
+        self.fields: list[tuple[str, str]] = []
+        self.post_inject: Optional[Callable] = None
+        # Only the fields and hook defined by the class itself are injected
+        for field_name, field_value in object_class.__dict__.items():
+            if isinstance(field_value, Inject):
+                self.fields.append((field_name, field_value.name if field_value.name else field_name))
+        post_inject = object_class.__dict__.get('__post_inject__', None)
+        if callable(post_inject):
+            self.post_inject = post_inject
+
+
+injection_plans: dict[type, InjectionPlan] = {}
+
+
+def get_injection_plan(object_class: type) -> InjectionPlan:
+    """
+    Get the injection plan of a class, computed on first use
+    """
+    injection_plan = injection_plans.get(object_class)
+    if injection_plan is None:
+        injection_plan = InjectionPlan(object_class)
+        injection_plans[object_class] = injection_plan
+    return injection_plan
+
+
+instance_injection_fields: weakref.WeakKeyDictionary[object, list[tuple[str, str]]] = weakref.WeakKeyDictionary()
+
+
+def get_instance_injection_fields(object_to_inject: object) -> list[tuple[str, str]]:
+    """
+    Get the Inject fields set on an object itself, such as module globals, with the names of the objects to inject into
+    them. They are found on first use, Inject fields set on the object afterwards are not injected.
+    """
+    try:
+        instance_fields = instance_injection_fields.get(object_to_inject)
+    except TypeError:
+        # Objects that cannot be weakly referenced are looked up on every injection
+        instance_fields = None
+    if instance_fields is None:
+        instance_fields = [(field_name, field_value.name if field_value.name else field_name) for
+                           field_name, field_value in getattr(object_to_inject, '__dict__', {}).items() if
+                           isinstance(field_value, Inject)]
+        try:
+            instance_injection_fields[object_to_inject] = instance_fields
+        except TypeError:
+            pass
+    return instance_fields
+
+
 class KartaDependencyInjector(DependencyInjector):
     objects: Optional[dict[str, object]] = {}
 
     def __init__(self):
+        # Declared fixtures are injected as references creating them on first use in their scope
+        self.fixture_manager = FixtureManager()
         self.objects = {
             'dependency_injector': self,
+            'fixture_manager': self.fixture_manager,
         }
 
     def register(self, name: str, value: object) -> object:
@@ -28,23 +89,40 @@ class KartaDependencyInjector(DependencyInjector):
         self.objects[name] = value
         return previous_object
 
+    def has_object(self, name: str) -> bool:
+        return name in self.objects.keys() or self.fixture_manager.has_fixture(name)
+
+    def get_object(self, name: str) -> object:
+        return self.objects[name] if name in self.objects.keys() else self.fixture_manager.get_reference(name)
+
     def inject(self, *list_of_objects) -> bool:
-        for object_to_inject in list_of_objects:
-            for field_name, field_value in object_to_inject.__dict__.items():
-                if isinstance(field_value, Inject):
-                    object_name_to_inject = field_value.name if field_value.name else field_name
-                    if object_name_to_inject in self.objects.keys():
-                        object_to_inject.__setattr__(field_name, self.objects[object_name_to_inject])
-            if not is_builtin_class_instance(object_to_inject):
-                for field_name, field_value in object_to_inject.__class__.__dict__.items():
-                    if isinstance(field_value, Inject):
-                        object_name_to_inject = field_value.name if field_value.name else field_name
-                        if object_name_to_inject in self.objects.keys():
-                            object_to_inject.__setattr__(field_name, self.objects[object_name_to_inject])
-            # for obj_name, obj_value in self.objects.items():
-            #     if obj_name in object_to_inject.__dict__.keys() or obj_name in object_to_inject.__class__.__dict__.keys():
-            #         object_to_inject.__setattr__(obj_name, obj_value)
-            if (('__post_inject__' in object_to_inject.__class__.__dict__.keys())
-                    and callable(object_to_inject.__class__.__dict__['__post_inject__'])):
-                object_to_inject.__class__.__dict__['__post_inject__'](object_to_inject)
+        return self.inject_all(list_of_objects)
+
+    def inject_all(self, objects_to_inject: Iterable[object]) -> bool:
+        """
+        Inject the registered objects into many objects, using the cached injection plans of their classes and of the
+        objects themselves and looking up each injected object once for the batch
+        :param objects_to_inject: The objects to inject into
+        :return: True
+        """
+        resolved_plans: dict[type, list[tuple[str, object]]] = {}
+        for object_to_inject in objects_to_inject:
+            # Inject markers set on the object itself, such as module globals
+            for field_name, object_name_to_inject in get_instance_injection_fields(object_to_inject):
+                if self.has_object(object_name_to_inject):
+                    object_to_inject.__setattr__(field_name, self.get_object(object_name_to_inject))
+
+            if is_builtin_class_instance(object_to_inject):
+                continue
+            injection_plan = get_injection_plan(object_to_inject.__class__)
+            resolved_fields = resolved_plans.get(injection_plan.object_class)
+            if resolved_fields is None:
+                resolved_fields = [(field_name, self.get_object(object_name_to_inject)) for
+                                   field_name, object_name_to_inject in injection_plan.fields if
+                                   self.has_object(object_name_to_inject)]
+                resolved_plans[injection_plan.object_class] = resolved_fields
+            for field_name, object_to_set in resolved_fields:
+                object_to_inject.__setattr__(field_name, object_to_set)
+            if injection_plan.post_inject:
+                injection_plan.post_inject(object_to_inject)
         return True
@@ -0,0 +1,221 @@
+import inspect
+import threading
+from typing import Callable, Optional, Any
+
+from karta.core.utils.logger import logger
+
+# Fixture scopes from the widest to the narrowest
+FIXTURE_SCOPES = ['session', 'worker', 'feature', 'scenario']
+
+
+def fixture(scope: str = 'scenario', name: Optional[str] = None):
+    """
+    Declare a function creating a fixture injected by its name. The fixture is created on first use in its scope and
+    shared until the scope ends. A generator function yields the fixture, and is resumed at the end of the scope to
+    finalize it.
+    :param scope: 'session' for a fixture shared by the threads of a process, 'worker' for a fixture per worker
+                  thread, 'feature' or 'scenario'. Every worker process of a distributed run has its own session
+                  fixtures.
+    :param name: The name of the fixture to inject, the name of the function by default
+    """
+    if scope not in FIXTURE_SCOPES:
+        raise ValueError("Fixture scope must be one of " + ", ".join(FIXTURE_SCOPES))
+
+    def register_fixture(func):
+        fixture_name = name if name else func.__name__
+        logger.debug("registering %s fixture %s", scope, fixture_name)
+        FixtureManager.fixture_definitions[fixture_name] = FixtureDefinition(fixture_name, func, scope)
+        return func
+
+    return register_fixture
+
+
+class FixtureDefinition:
+    def __init__(self, name: str, function: Callable, scope: str):
+        self.name = name
+        self.function = function
+        self.scope = scope
+
+
+class FixtureInstance:
+    """
+    A fixture created for a scope, with the generator to resume to finalize it
+    """
+
+    def __init__(self, definition: FixtureDefinition):
+        self.definition = definition
+        self.generator = None
+        if inspect.isgeneratorfunction(definition.function):
+            self.generator = definition.function()
+            self.value = next(self.generator)
+        else:
+            self.value = definition.function()
+
+    def finalize(self):
+        generator, self.generator = self.generator, None
+        if generator is None:
+            return
+        try:
+            next(generator)
+        except StopIteration:
+            return
+        generator.close()
+        raise Exception("Fixture {} yielded more than once".format(self.definition.name))
+
+
+class FixtureReference:
+    """
+    Injected in place of a fixture, getting the fixture of the current scope on use
+    """
+
+    def __init__(self, fixture_manager: 'FixtureManager', name: str):
+        self.fixture_manager = fixture_manager
+        self.name = name
+
+    def get(self) -> Any:
+        return self.fixture_manager.get_fixture(self.name)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+    def __getitem__(self, key):
+        return self.get()[key]
+
+    def __call__(self, *args, **kwargs):
+        return self.get()(*args, **kwargs)
+
+
+class FixtureManager:
+    """
+    Creates fixtures on first use in their scope and finalizes them at the end of the scope, the newest first.
+    Feature and scenario scopes are entered and exited by the thread running them, while session and worker fixtures
+    are available at any time until the end of the session.
+    """
+    fixture_definitions: dict[str, FixtureDefinition] = {}
+
+    def __init__(self):
+        self.session_fixtures: dict[str, FixtureInstance] = {}
+        # The worker fixtures of each thread, finalized at the end of the session if the worker did not exit its scope
+        self.worker_scopes: list[dict[str, FixtureInstance]] = []
+        self.references: dict[str, FixtureReference] = {}
+        self.local = threading.local()
+        self.lock = threading.RLock()
+
+    def has_fixture(self, name: str) -> bool:
+        return name in self.fixture_definitions
+
+    def get_reference(self, name: str) -> FixtureReference:
+        reference = self.references.get(name)
+        if reference is None:
+            reference = self.references.setdefault(name, FixtureReference(self, name))
+        return reference
+
+    def get_thread_scopes(self) -> dict[str, Optional[dict[str, FixtureInstance]]]:
+        thread_scopes = getattr(self.local, 'scopes', None)
+        if thread_scopes is None:
+            thread_scopes = {'worker': None, 'feature': None, 'scenario': None}
+            self.local.scopes = thread_scopes
+        return thread_scopes
+
+    def get_scope_fixtures(self, scope: str) -> dict[str, FixtureInstance]:
+        if scope == 'session':
+            return self.session_fixtures
+        thread_scopes = self.get_thread_scopes()
+        scope_fixtures = thread_scopes[scope]
+        if scope_fixtures is None:
+            if scope != 'worker':
+                raise Exception("Fixtures of scope {} can only be used in a {}".format(scope, scope))
+            scope_fixtures = {}
+            thread_scopes[scope] = scope_fixtures
+            with self.lock:
+                self.worker_scopes.append(scope_fixtures)
+        return scope_fixtures
+
+    def get_fixture(self, name: str) -> Any:
+        """
+        Get the fixture of the current scope, creating it on first use
+        :param name: The name of the fixture
+        :return: The fixture
+        """
+        definition = self.fixture_definitions.get(name)
+        if definition is None:
+            raise Exception("Unknown fixture " + name)
+        # Fixtures being created by this thread, to detect fixtures using narrower or circular fixtures
+        creating = getattr(self.local, 'creating', None)
+        if creating is None:
+            creating = []
+            self.local.creating = creating
+        if definition in creating:
+            raise Exception("Circular fixture dependency: " + " -> ".join(
+                [creating_definition.name for creating_definition in creating] + [name]))
+        if creating and FIXTURE_SCOPES.index(definition.scope) > FIXTURE_SCOPES.index(creating[-1].scope):
+            raise Exception("Fixture {} of scope {} can not use fixture {} of narrower scope {}".format(
+                creating[-1].name, creating[-1].scope, name, definition.scope))
+
+        scope_fixtures = self.get_scope_fixtures(definition.scope)
+        fixture_instance = scope_fixtures.get(name)
+        if fixture_instance is not None:
+            return fixture_instance.value
+
+        creating.append(definition)
+        try:
+            if definition.scope == 'session':
+                # Session fixtures are shared, created once by the first thread using them
+                with self.lock:
+                    fixture_instance = scope_fixtures.get(name)
+                    if fixture_instance is None:
+                        fixture_instance = FixtureInstance(definition)
+                        scope_fixtures[name] = fixture_instance
+            else:
+                fixture_instance = FixtureInstance(definition)
+                scope_fixtures[name] = fixture_instance
+        finally:
+            creating.pop()
+        return fixture_instance.value
+
+    def enter_scope(self, scope: str):
+        """
+        Start a feature or scenario scope in the current thread, finalizing fixtures left by a previous one
+        """
+        if scope in ('feature', 'scenario'):
+            thread_scopes = self.get_thread_scopes()
+            if thread_scopes[scope]:
+                self.finalize_fixtures(thread_scopes[scope])
+            thread_scopes[scope] = {}
+
+    def exit_scope(self, scope: str):
+        """
+        End a scope in the current thread, finalizing its fixtures. Ending the session also finalizes the worker
+        fixtures of all threads.
+        """
+        if scope == 'session':
+            with self.lock:
+                worker_scopes = self.worker_scopes
+                self.worker_scopes = []
+            for worker_fixtures in worker_scopes:
+                self.finalize_fixtures(worker_fixtures)
+            self.finalize_fixtures(self.session_fixtures)
+            return
+
+        thread_scopes = self.get_thread_scopes()
+        scope_fixtures = thread_scopes[scope]
+        thread_scopes[scope] = None
+        if scope_fixtures is None:
+            return
+        if scope == 'worker':
+            with self.lock:
+                self.worker_scopes = [worker_fixtures for worker_fixtures in self.worker_scopes if
+                                      worker_fixtures is not scope_fixtures]
+        self.finalize_fixtures(scope_fixtures)
+
+    @staticmethod
+    def finalize_fixtures(scope_fixtures: dict[str, FixtureInstance]):
+        # Fixtures are finalized before the fixtures they used, which were created before them
+        for name, fixture_instance in reversed(list(scope_fixtures.items())):
+            try:
+                fixture_instance.finalize()
+            except Exception as e:
+                logger.error("Error finalizing fixture %s: %s", name, str(e))
+        scope_fixtures.clear()
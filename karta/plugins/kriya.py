@@ -2,9 +2,11 @@ import itertools
 import os
 import re
 import sys
+import threading
 import traceback
+from collections import OrderedDict
 from pathlib import Path
-from typing import Union, Callable, Any, Optional
+from typing import Union, Callable, Any, Optional, Iterable
 
 import yaml
 
@@ -51,11 +53,8 @@ def before_run(tag_match_regex=None):
 
     def register_before_run(func):
 
-        if tag_match_regex not in Kriya.before_run_mapping.keys():
-            Kriya.before_run_mapping[tag_match_regex] = []
-
         logger.debug("registering hook before run %s", str(tag_match_regex))
-        Kriya.before_run_mapping[tag_match_regex].append(func)
+        Kriya.before_run_mapping.register(tag_match_regex, func)
 
         return func
 
@@ -71,11 +70,8 @@ def before_feature(tag_match_regex=None):
 
     def register_before_feature(func):
 
-        if tag_match_regex not in Kriya.before_feature_mapping.keys():
-            Kriya.before_feature_mapping[tag_match_regex] = []
-
         logger.debug("registering hook before feature %s", str(tag_match_regex))
-        Kriya.before_feature_mapping[tag_match_regex].append(func)
+        Kriya.before_feature_mapping.register(tag_match_regex, func)
 
         return func
 
@@ -91,11 +87,8 @@ def before_feature_iteration(tag_match_regex=None):
 
     def register_before_feature_iteration(func):
 
-        if tag_match_regex not in Kriya.before_feature_iteration_mapping.keys():
-            Kriya.before_feature_iteration_mapping[tag_match_regex] = []
-
         logger.debug("registering hook before feature_iteration %s", str(tag_match_regex))
-        Kriya.before_feature_iteration_mapping[tag_match_regex].append(func)
+        Kriya.before_feature_iteration_mapping.register(tag_match_regex, func)
 
         return func
 
@@ -111,11 +104,8 @@ def before_scenario(tag_match_regex=None):
 
     def register_before_scenario(func):
 
-        if tag_match_regex not in Kriya.before_scenario_mapping.keys():
-            Kriya.before_scenario_mapping[tag_match_regex] = []
-
         logger.debug("registering hook before scenario %s", str(tag_match_regex))
-        Kriya.before_scenario_mapping[tag_match_regex].append(func)
+        Kriya.before_scenario_mapping.register(tag_match_regex, func)
 
         return func
 
@@ -131,11 +121,8 @@ def after_scenario(tag_match_regex=None):
 
     def register_after_scenario(func):
 
-        if tag_match_regex not in Kriya.after_scenario_mapping.keys():
-            Kriya.after_scenario_mapping[tag_match_regex] = []
-
         logger.debug("registering hook after scenario %s", str(tag_match_regex))
-        Kriya.after_scenario_mapping[tag_match_regex].append(func)
+        Kriya.after_scenario_mapping.register(tag_match_regex, func)
 
         return func
 
@@ -151,11 +138,8 @@ def after_feature_iteration(tag_match_regex=None):
 
     def register_after_feature_iteration(func):
 
-        if tag_match_regex not in Kriya.after_feature_iteration_mapping.keys():
-            Kriya.after_feature_iteration_mapping[tag_match_regex] = []
-
         logger.debug("registering hook after feature_iteration %s", str(tag_match_regex))
-        Kriya.after_feature_iteration_mapping[tag_match_regex].append(func)
+        Kriya.after_feature_iteration_mapping.register(tag_match_regex, func)
 
         return func
 
@@ -171,11 +155,8 @@ def after_feature(tag_match_regex=None):
 
     def register_after_feature(func):
 
-        if tag_match_regex not in Kriya.after_feature_mapping.keys():
-            Kriya.after_feature_mapping[tag_match_regex] = []
-
         logger.debug("registering hook after feature %s", str(tag_match_regex))
-        Kriya.after_feature_mapping[tag_match_regex].append(func)
+        Kriya.after_feature_mapping.register(tag_match_regex, func)
 
         return func
 
@@ -191,27 +172,66 @@ def after_run(tag_match_regex=None):
 
     def register_after_run(func):
 
-        if tag_match_regex not in Kriya.after_run_mapping.keys():
-            Kriya.after_run_mapping[tag_match_regex] = []
-
         logger.debug("registering hook after run %s", str(tag_match_regex))
-        Kriya.after_run_mapping[tag_match_regex].append(func)
+        Kriya.after_run_mapping.register(tag_match_regex, func)
 
         return func
 
     return register_after_run
 
 
-def check_and_run_hooks(context: Context, hook_mapping: dict[str, list[Callable]], tags: list[str], hook_type: str):
-    for tag_match_regex, hooks in hook_mapping.items():
-        if any(re.match(tag_match_regex, tag) for tag in tags):
-            for hook in hooks:
-                try:
-                    logger.info("Running %s hook %s", hook_type, hook.__name__)
-                    hook(context)
-                except Exception as e:
-                    logger.error("Error running %s hook %s: %s", hook_type, hook.__name__, str(e))
-                    raise e
+class TagHookMapping(dict):
+    """
+    Hooks by the regex of the tags they run for, with the regexes compiled at registration and the hooks matching a
+    set of tags resolved once per set of tags. The resolved hooks of the most recently used sets of tags are kept, as
+    tags like the unique name of a run are only seen once.
+    """
+
+    def __init__(self, *args, max_resolved_tag_sets: int = 1024, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compiled_regexes: dict[str, re.Pattern] = {tag_match_regex: re.compile(tag_match_regex) for
+                                                        tag_match_regex in self.keys()}
+        self.max_resolved_tag_sets = max_resolved_tag_sets
+        self.resolved_hooks: OrderedDict[frozenset[str], list[Callable]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def register(self, tag_match_regex: str, func: Callable):
+        compiled_regex = re.compile(tag_match_regex)
+        with self.lock:
+            self.compiled_regexes[tag_match_regex] = compiled_regex
+            self.setdefault(tag_match_regex, []).append(func)
+            self.resolved_hooks.clear()
+
+    def get_hooks(self, tags: Optional[Iterable[str]]) -> list[Callable]:
+        """
+        Get the hooks of the regexes matching any of the tags, in the order of registration of the regexes
+        :param tags: The tags
+        :return: The hooks to run
+        """
+        tag_set = frozenset(tags) if tags else frozenset()
+        with self.lock:
+            hooks = self.resolved_hooks.get(tag_set)
+            if hooks is None:
+                hooks = [hook for tag_match_regex, regex_hooks in self.items() if
+                         any(self.compiled_regexes[tag_match_regex].match(tag) for tag in tag_set) for hook in
+                         regex_hooks]
+                self.resolved_hooks[tag_set] = hooks
+                if len(self.resolved_hooks) > self.max_resolved_tag_sets:
+                    self.resolved_hooks.popitem(last=False)
+            else:
+                self.resolved_hooks.move_to_end(tag_set)
+        return hooks
+
+
+def check_and_run_hooks(context: Context, hook_mapping: TagHookMapping, tags: Optional[Iterable[str]],
+                        hook_type: str):
+    for hook in hook_mapping.get_hooks(tags):
+        try:
+            logger.info("Running %s hook %s", hook_type, hook.__name__)
+            hook(context)
+        except Exception as e:
+            logger.error("Error running %s hook %s: %s", hook_type, hook.__name__, str(e))
+            raise e
 
 
 class Kriya(FeatureParser, StepRunner, TestLifecycleHook):
@@ -220,14 +240,14 @@ class Kriya(FeatureParser, StepRunner, TestLifecycleHook):
     step_definition_mapping: dict[str, StepIdentifier] = {}
     # step_definition_backend_mapping: dict[StepIdentifier, Callable] = {}
 
-    before_run_mapping: dict[str, list[Callable]] = {}
-    before_feature_mapping: dict[str, list[Callable]] = {}
-    before_feature_iteration_mapping: dict[str, list[Callable]] = {}
-    before_scenario_mapping: dict[str, list[Callable]] = {}
-    after_scenario_mapping: dict[str, list[Callable]] = {}
-    after_feature_iteration_mapping: dict[str, list[Callable]] = {}
-    after_feature_mapping: dict[str, list[Callable]] = {}
-    after_run_mapping: dict[str, list[Callable]] = {}
+    before_run_mapping: TagHookMapping = TagHookMapping()
+    before_feature_mapping: TagHookMapping = TagHookMapping()
+    before_feature_iteration_mapping: TagHookMapping = TagHookMapping()
+    before_scenario_mapping: TagHookMapping = TagHookMapping()
+    after_scenario_mapping: TagHookMapping = TagHookMapping()
+    after_feature_iteration_mapping: TagHookMapping = TagHookMapping()
+    after_feature_mapping: TagHookMapping = TagHookMapping()
+    after_run_mapping: TagHookMapping = TagHookMapping()
 
     def __init__(self, feature_directory: str, step_def_package: str):
         self.parser = KriyaParser()
@@ -260,10 +280,12 @@ class Kriya(FeatureParser, StepRunner, TestLifecycleHook):
         # Search for python modules in step definitions folder
         step_definition_module_python_files = importutils.get_python_files(self.step_def_package)
         # # Scan for each python module if it has step definitions, add them to step definition mapping
+        imported_modules = []
         for py_file in step_definition_module_python_files:
             module_name = Path(py_file).stem  # os.path.split(py_file)[-1].strip(".py")
-            imported_module = importutils.import_module_from_file(module_name, py_file)
-            self.dependency_injector.inject(imported_module)
+            imported_modules.append(importutils.import_module_from_file(module_name, py_file))
+        # Modules are injected once all are imported, so that fixtures declared in any module can be injected
+        self.dependency_injector.inject(*imported_modules)
 
     def parse_feature(self, feature_source: str, yaml_parser: bool = False) -> Feature:
         if yaml_parser:
@@ -318,6 +340,13 @@ class Kriya(FeatureParser, StepRunner, TestLifecycleHook):
                 return step_definition_obj.backend_function, match_parameters
         return None, []
 
+    def get_step_implementation(self, name: str) -> Optional[Callable]:
+        matching_step_definition_function, parameters = self.get_matching_step_implementation(name)
+        return matching_step_definition_function
+
+    def get_step_implementations(self) -> list[Callable]:
+        return [step_definition_obj.backend_function for step_definition_obj in self.step_definition_mapping.values()]
+
     def run_step(self, test_step: Step, context: dict) -> Union[tuple[dict, bool, str], bool]:
         step_to_call = test_step.identifier.strip()
         # if step_to_call in self.step_definition_mapping.keys():
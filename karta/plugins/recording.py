@@ -0,0 +1,99 @@
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+from karta.core.interfaces.plugins import TestLifecycleHook
+from karta.core.models.generic import Context
+from karta.core.utils.imageutils import ScreenCapture, FrameRecorder
+from karta.core.utils.logger import logger
+
+
+class FailureClipRecorder(TestLifecycleHook):
+    """
+    Records the screen during the run, keeping only the last seconds, and saves a clip of the screen before the end of
+    each failed scenario. Clips can be read with karta.core.utils.imageutils.read_clip.
+    """
+
+    def __init__(self, clip_directory: str = 'logs/clips', pre_roll: float = 10.0, frame_rate: int = 5,
+                 monitor: Optional[int] = None, change_tolerance: float = 0.0):
+        """
+        :param clip_directory: The directory of the clips of failed scenarios
+        :param pre_roll: Seconds of the screen before the end of a failed scenario saved in its clip at most
+        :param frame_rate: Frames recorded per second
+        :param monitor: The index of the monitor to record
+        :param change_tolerance: The change tolerance of frames recorded as the same as the previous frame
+        """
+        super().__init__()
+        self.clip_directory = clip_directory
+        self.pre_roll = pre_roll
+        self.frame_rate = frame_rate
+        self.monitor = monitor
+        self.change_tolerance = change_tolerance
+        self.screen_capture: Optional[ScreenCapture] = None
+        self.recorder: Optional[FrameRecorder] = None
+        self.scenario_start_times: dict[int, float] = {}
+        self.lock = threading.Lock()
+
+    def run_start(self, context: Context):
+        try:
+            # Recorded frames are copied by the recorder, so the capture keeps the fewest frames for reading
+            self.screen_capture = ScreenCapture(frame_rate=self.frame_rate, monitor=self.monitor, buffer_size=2,
+                                                change_tolerance=self.change_tolerance)
+            self.recorder = FrameRecorder(self.pre_roll)
+            self.screen_capture.start_recording(self.recorder)
+        except Exception as e:
+            logger.warning("Screen recording is not available, no clips of failed scenarios are saved: %s", str(e))
+            self.close()
+
+    def feature_start(self, context: Context):
+        pass
+
+    def feature_iteration_start(self, context: Context):
+        pass
+
+    def scenario_start(self, context: Context):
+        with self.lock:
+            self.scenario_start_times[id(context)] = time.time()
+
+    def step_start(self, context: Context):
+        pass
+
+    def step_complete(self, context: Context):
+        pass
+
+    def scenario_complete(self, context: Context):
+        with self.lock:
+            start_time = self.scenario_start_times.pop(id(context), None)
+        result = context.run_info.result
+        if not self.recorder or not result or result.is_successful():
+            return
+
+        scenario = context.run_info.scenario
+        clip_name = re.sub(r'[^\w.-]+', '_', '{}_{}_{}'.format(context.run_info.feature, scenario.name,
+                                                               context.run_info.iteration_index))
+        clip_path = os.path.join(self.clip_directory, '{}_{}.kclip'.format(clip_name, time.strftime('%Y%m%d%H%M%S')))
+        try:
+            if self.recorder.save_clip(clip_path, start_time):
+                logger.info("Saved screen clip of failed scenario %s: %s", scenario.name, clip_path)
+        except Exception as e:
+            logger.warning("Saving screen clip of failed scenario %s failed: %s", scenario.name, str(e))
+
+    def feature_iteration_complete(self, context: Context):
+        pass
+
+    def feature_complete(self, context: Context):
+        pass
+
+    def run_complete(self, context: Context):
+        self.close()
+
+    def close(self):
+        if self.screen_capture:
+            self.screen_capture.stop_recording()
+            self.screen_capture.close_grabbers()
+            self.screen_capture = None
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
@@ -0,0 +1,179 @@
+import http.client
+import json
+import queue
+import threading
+import time
+import traceback
+import urllib.parse
+from typing import Optional, Union
+
+from karta.core.interfaces.plugins import StepRunner
+from karta.core.models.test_catalog import Step, StepType
+from karta.core.models.test_execution import StepResult
+from karta.core.utils.jsonencoders import CustomJSONEncoder
+from karta.core.utils.logger import logger
+from karta.plugins.step_identifier import StepIdentifier
+
+
+class HTTPConnectionPool:
+    """
+    Pool of persistent keep-alive HTTP connections to a server, shared by the threads using it
+    """
+
+    # Errors of a kept alive connection which the server closed while it was idle
+    STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+    def __init__(self, url: str, pool_size: int = 4, timeout: float = 60.0):
+        """
+        :param url: The base URL of the server
+        :param pool_size: The maximum number of connections open at a time
+        :param timeout: The socket timeout of the connections in seconds
+        """
+        parsed_url = urllib.parse.urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parsed_url.scheme == 'https' else \
+            http.client.HTTPConnection
+        self.host = parsed_url.hostname
+        self.port = parsed_url.port
+        self.base_path = parsed_url.path.rstrip('/')
+        self.timeout = timeout
+        self.idle_connections: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue()
+        self.connection_slots = threading.BoundedSemaphore(pool_size)
+
+    def request(self, method: str, path: str, data: Optional[object] = None) -> object:
+        """
+        Sends a request with a JSON body on a pooled connection, retrying once on a new connection if a kept alive
+        connection turns out to be closed
+        :return: The JSON response
+        """
+        body = json.dumps(data, cls=CustomJSONEncoder).encode('utf-8') if data is not None else None
+        with self.connection_slots:
+            try:
+                connection, reused = self.idle_connections.get_nowait(), True
+            except queue.Empty:
+                connection, reused = self.connection_class(self.host, self.port, timeout=self.timeout), False
+            try:
+                response_data, keep_alive = self.send(connection, method, path, body)
+            except self.STALE_CONNECTION_ERRORS:
+                connection.close()
+                if not reused:
+                    raise
+                connection = self.connection_class(self.host, self.port, timeout=self.timeout)
+                response_data, keep_alive = self.send(connection, method, path, body)
+            except Exception:
+                connection.close()
+                raise
+            if keep_alive:
+                self.idle_connections.put(connection)
+            else:
+                connection.close()
+        return response_data
+
+    def send(self, connection: http.client.HTTPConnection, method: str, path: str, body: Optional[bytes]) -> tuple[
+        object, bool]:
+        headers = {'Connection': 'keep-alive', 'Accept': 'application/json'}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        connection.request(method, self.base_path + path, body=body, headers=headers)
+        response = connection.getresponse()
+        response_body = response.read()
+        if response.status >= 400:
+            raise Exception("Request {} {} failed with status {}: {}".format(method, path, response.status,
+                                                                            response_body.decode('utf-8', 'replace')))
+        return json.loads(response_body) if response_body else None, not response.will_close
+
+    def close(self):
+        while True:
+            try:
+                self.idle_connections.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class RemoteStepRunner(StepRunner):
+    """
+    Step runner running steps on a Karta server, over a pool of keep-alive connections.
+    Consecutive plain steps are sent to the server's /run_steps in one request, and the server's /steps catalog is
+    cached to match step texts locally.
+    """
+    supports_batching = True
+
+    def __init__(self, server_url: str, pool_size: int = 4, timeout: float = 60.0,
+                 steps_refresh_interval: Optional[float] = None):
+        """
+        :param server_url: The URL of the Karta server
+        :param pool_size: The maximum number of connections to the server open at a time
+        :param timeout: The timeout of requests to the server in seconds
+        :param steps_refresh_interval: Seconds after which the cached step catalog is fetched again, never if None
+        """
+        self.server_url = server_url
+        self.connection_pool = HTTPConnectionPool(server_url, pool_size, timeout)
+        self.steps_refresh_interval = steps_refresh_interval
+        self.step_identifiers: Optional[dict[str, StepIdentifier]] = None
+        self.steps_fetch_time = 0.0
+        self.available_steps: dict[str, bool] = {}
+        self.lock = threading.Lock()
+
+    def get_step_identifiers(self) -> dict[str, StepIdentifier]:
+        with self.lock:
+            if self.step_identifiers is None or (self.steps_refresh_interval is not None and time.monotonic() -
+                                                 self.steps_fetch_time > self.steps_refresh_interval):
+                steps = self.connection_pool.request('GET', '/steps')
+                self.step_identifiers = {step: StepIdentifier(step) for step in steps}
+                self.available_steps = {}
+                self.steps_fetch_time = time.monotonic()
+            return self.step_identifiers
+
+    def get_steps(self) -> list[str]:
+        return [*self.get_step_identifiers().keys()]
+
+    def is_step_available(self, name: str) -> bool:
+        try:
+            step_identifiers = self.get_step_identifiers()
+        except Exception as e:
+            logger.warning("Steps of remote server %s could not be fetched: %s", self.server_url, str(e))
+            return False
+        available = self.available_steps.get(name, None)
+        if available is None:
+            available = name in step_identifiers or any(
+                step_identifier.match(name)[0] for step_identifier in step_identifiers.values())
+            self.available_steps[name] = available
+        return available
+
+    def post_steps(self, steps: list[Step], step_data: list[Optional[dict]], context: dict) -> list[StepResult]:
+        run_info = context.get('run_info', None) or {}
+        run = run_info.get('run', None)
+        # Feature and scenario of the run info are names, or models at their start
+        feature = run_info.get('feature', None)
+        scenario = run_info.get('scenario', None)
+        steps_run_info = {
+            'name': run.name if run else None,
+            'description': run.description if run else None,
+            'context': {'data': context.get('data', None) or {}},
+            'feature_name': getattr(feature, 'name', feature),
+            'iteration_index': run_info.get('iteration_index', None) or 0,
+            'scenario_name': getattr(scenario, 'name', scenario),
+            # The data of the steps is generated locally
+            'steps': [step.model_copy(update={'data_rules': None}) for step in steps],
+            'step_data': step_data,
+        }
+        return [StepResult.model_validate(step_result) for step_result in
+                self.connection_pool.request('POST', '/run_steps', steps_run_info)]
+
+    def run_steps(self, steps: list[Step], step_data: list[Optional[dict]], context: dict) -> list[
+        Union[tuple[dict, bool, str], bool]]:
+        try:
+            step_results = self.post_steps(steps, step_data, context)
+        except Exception as e:
+            return [({}, False, str(e) + "\n" + traceback.format_exc())]
+        return [(step_result.results or {}, step_result.is_successful(), step_result.error, step_result.measurements)
+                for step_result in step_results]
+
+    def run_step(self, test_step: Step, context: dict) -> Union[tuple[dict, bool, str], bool]:
+        if test_step.type != StepType.STEP:
+            # Conditions and loops are evaluated remotely as plain steps, their nested steps are run by the caller
+            step_result = self.post_steps([test_step.model_copy(update={'type': StepType.STEP, 'steps': None})],
+                                          [context.get('step_data', None)], context)[0]
+            if step_result.error:
+                raise Exception(step_result.error)
+            return step_result.successful
+        return self.run_steps([test_step], [context.get('step_data', None)], context)[0]
@@ -2,7 +2,9 @@ import argparse
 import sys
 
 from karta.core.utils.logger import logger
+from karta.runner.distributed import run_distributed, run_worker
 from karta.runner.runtime import karta_runtime
+from karta.runner.scheduling import parse_shard, parse_time_budget
 
 logger.info('***************** Initializing Karta.py ********************')
 
@@ -15,19 +17,79 @@ def karta_main(args=None):
         # arg_parser.add_mutually_exclusive_group(required=True)
         group.add_argument("-t", "--tags", help="Tags to run", type=str, nargs='+')
         group.add_argument("-f", "--features", help="Features to run", type=str, nargs='+')
+        group.add_argument("-s", "--seed", help="Root random seed to reproduce a run", type=int)
+        group.add_argument("-c", "--changed-since", help="Git reference to run the scenarios affected by the changes "
+                                                         "since", type=str)
+        group.add_argument("--shard", help="Shard i/N of the selected scenarios to run, balanced by their durations",
+                           type=str)
+        group.add_argument("-o", "--order", help="Order of running the selected scenarios, one of location, "
+                                                 "recently_failed, fastest, longest or random", type=str)
+        group.add_argument("--time-budget", help="Time budget like 45m or 1h30m to select and run the most valuable "
+                                                 "scenarios within", type=str)
+        group.add_argument("-m", "--merge-results", help="Run ids or result files of shards to combine into one result",
+                           type=str, nargs='+')
+        group.add_argument("-w", "--workers", help="Number of local worker processes to run the selected scenarios on "
+                                                   "through a coordinator", type=int)
+        group.add_argument("--bind", help="host:port to serve the coordinator on", type=str, default='127.0.0.1:0')
+        group.add_argument("--worker", help="Coordinator URL to run scenarios for as a worker", type=str)
+        group.add_argument("-r", "--rerun-failed", help="Run id, result file or event log of a run to rerun the failed "
+                                                        "scenarios of", type=str)
         parsed_args = arg_parser.parse_args(args=args)
+        selection_options = [option for option, value in (('--shard', parsed_args.shard),
+                                                          ('--order', parsed_args.order),
+                                                          ('--time-budget', parsed_args.time_budget)) if value]
+        if selection_options and not (parsed_args.tags or parsed_args.changed_since):
+            arg_parser.error("{} can only be used with the scenarios selected by --tags or --changed-since".format(
+                ", ".join(selection_options)))
+        if parsed_args.seed is not None and (parsed_args.rerun_failed or parsed_args.merge_results):
+            # Reruns use the seed of the run rerun, and merged results keep the seed of their runs
+            arg_parser.error("--seed can not be combined with --rerun-failed or --merge-results")
+        if parsed_args.workers is not None:
+            # Workers run the scenarios in the order they lease them, longest first
+            if parsed_args.features or parsed_args.order or parsed_args.time_budget:
+                arg_parser.error("--workers can not be combined with --features, --order or --time-budget")
+            if not (parsed_args.tags or parsed_args.changed_since):
+                arg_parser.error("--workers needs --tags or --changed-since to select the scenarios to run")
 
         run_results = None
-        if parsed_args.tags:
+        shard = parse_shard(parsed_args.shard) if parsed_args.shard else None
+        time_budget = parse_time_budget(parsed_args.time_budget) if parsed_args.time_budget else None
+        if parsed_args.worker:
+            logger.info("Running as worker of {}".format(parsed_args.worker))
+            run_results = run_worker(karta_runtime, parsed_args.worker)
+        elif parsed_args.workers is not None:
+            scenarios = karta_runtime.filter_with_tags(parsed_args.tags) if parsed_args.tags else \
+                karta_runtime.filter_changed_since(parsed_args.changed_since)
+            history = karta_runtime.load_scenario_history()
+            if shard:
+                scenarios = karta_runtime.shard_scenarios(scenarios, *shard, history)
+            host, _, port = parsed_args.bind.rpartition(':')
+            logger.info("Running {} scenarios on {} workers".format(len(scenarios), parsed_args.workers))
+            run_results = run_distributed(karta_runtime, scenarios, parsed_args.workers, host, int(port),
+                                          seed=parsed_args.seed, tags=parsed_args.tags, history=history)
+        elif parsed_args.tags:
             logger.info("Tags to run {}".format(parsed_args.tags))
-            run_results = karta_runtime.run_tags(parsed_args.tags)
+            run_results = karta_runtime.run_tags(parsed_args.tags, seed=parsed_args.seed, shard=shard,
+                                                 ordering=parsed_args.order, time_budget=time_budget)
         elif parsed_args.features:
             logger.info("Features to run {}".format(parsed_args.features))
-            run_results = karta_runtime.run_feature_files(parsed_args.features)
+            run_results = karta_runtime.run_feature_files(parsed_args.features, seed=parsed_args.seed)
+        elif parsed_args.changed_since:
+            logger.info("Running scenarios affected by changes since {}".format(parsed_args.changed_since))
+            run_results = karta_runtime.run_changed_since(parsed_args.changed_since, seed=parsed_args.seed,
+                                                          shard=shard, ordering=parsed_args.order,
+                                                          time_budget=time_budget)
+        elif parsed_args.merge_results:
+            logger.info("Combining results {}".format(parsed_args.merge_results))
+            run_results = karta_runtime.combine_run_results(parsed_args.merge_results)
+        elif parsed_args.rerun_failed:
+            logger.info("Rerunning failed scenarios of {}".format(parsed_args.rerun_failed))
+            run_results = karta_runtime.rerun_failed(parsed_args.rerun_failed)
         else:
             print("Error either tags or features needs to be passed to run", file=sys.stderr)
             arg_parser.print_help(sys.stderr)
 
+        logger.info("Run seed is {}".format(run_results.seed))
         logger.debug("Run results are " + str(run_results))
         for feature_result in run_results.feature_results:
             logger.info(
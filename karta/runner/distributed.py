@@ -0,0 +1,554 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Callable, TYPE_CHECKING
+
+from karta.core.interfaces.plugins import TestEventListener
+from karta.core.models.generic import Context
+from karta.core.models.test_catalog import Feature, Scenario
+from karta.core.models.test_execution import StepResult, ScenarioResult, FeatureResult, Run, RunResult
+from karta.core.utils.jsonencoders import CustomJSONEncoder
+from karta.core.utils.logger import logger
+from karta.runner.results import generate_run_id, get_event_log_file
+from karta.runner.scheduling import ScenarioHistory, partition_scenarios
+
+if TYPE_CHECKING:
+    from karta.runner.runtime import KartaRuntime
+
+# Events of workers sent to the event listeners of the coordinator, which sends its own run events
+FORWARDED_EVENT_TYPES = ('feature_start', 'feature_iteration_start', 'scenario_start', 'step_start', 'step_complete',
+                         'scenario_complete', 'feature_iteration_complete', 'feature_complete')
+# Result models of the events, sent as JSON by the workers
+EVENT_RESULT_MODELS = {
+    'step_complete': StepResult,
+    'scenario_complete': ScenarioResult,
+    'feature_complete': FeatureResult,
+}
+
+
+def to_json_data(value: object) -> object:
+    """
+    Converts the models in event data to JSON compatible data
+    """
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(mode='json')
+    if isinstance(value, dict):
+        return {key: to_json_data(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [to_json_data(item) for item in value]
+    return value
+
+
+def from_json_event(event: dict) -> Context:
+    """
+    Converts an event sent by a worker back to the event context of event listeners, with its result models
+    """
+    event_type = event['type']
+    event_context = Context({key: value for key, value in event.items() if key != 'type'})
+    if event_type == 'feature_iteration_complete':
+        event_context.result = [ScenarioResult.model_validate(result) for result in event_context.result]
+    elif event_type in EVENT_RESULT_MODELS:
+        event_context.result = EVENT_RESULT_MODELS[event_type].model_validate(event_context.result)
+    return event_context
+
+
+class WorkLease:
+    __slots__ = ('worker_id', 'started')
+
+    def __init__(self, worker_id: str):
+        self.worker_id = worker_id
+        self.started = False
+
+
+class Coordinator:
+    """
+    Coordinator holds the queue of scenarios of a distributed run which workers lease, start and complete.
+    Idle workers steal leased scenarios which were not started yet, and scenarios of workers missing their heartbeats
+    are queued again.
+    """
+    heartbeat_timeout: float = 30.0
+
+    def __init__(self, run_info: dict, work_items: list[dict], heartbeat_timeout: Optional[float] = None,
+                 event_handler: Optional[Callable[[list[dict]], None]] = None):
+        """
+        :param run_info: The id, name and seed of the run passed to workers on registration
+        :param work_items: The scenarios to run, each with source, line_number, iteration_index and an id
+        :param heartbeat_timeout: Seconds after the last heartbeat of a worker to consider it dead
+        :param event_handler: Called with the events sent by a worker
+        """
+        if heartbeat_timeout is not None:
+            self.heartbeat_timeout = heartbeat_timeout
+        self.run_info = run_info
+        self.event_handler = event_handler
+        self.work_items: dict[int, dict] = {work_item['id']: work_item for work_item in work_items}
+        self.pending_item_ids: deque[int] = deque(work_item['id'] for work_item in work_items)
+        self.leases: dict[int, WorkLease] = {}
+        self.results: dict[int, ScenarioResult] = {}
+        self.worker_heartbeats: dict[str, float] = {}
+        self.events: list[dict] = []
+        self.lock = threading.Lock()
+        self.completed = threading.Event()
+        if not self.work_items:
+            self.completed.set()
+
+    def register(self, worker_id: str) -> dict:
+        self.heartbeat(worker_id)
+        return self.run_info
+
+    def heartbeat(self, worker_id: str, now: Optional[float] = None):
+        with self.lock:
+            self.worker_heartbeats[worker_id] = time.monotonic() if now is None else now
+
+    def lease(self, worker_id: str, count: int = 1) -> list[dict]:
+        """
+        Leases up to count pending scenarios to the worker, stealing not started ones from other workers if none are
+        pending
+        """
+        self.heartbeat(worker_id)
+        with self.lock:
+            leased_item_ids = []
+            while self.pending_item_ids and len(leased_item_ids) < count:
+                leased_item_ids.append(self.pending_item_ids.popleft())
+            if not leased_item_ids:
+                leased_item_ids = self.steal_work(worker_id, count)
+            for item_id in leased_item_ids:
+                self.leases[item_id] = WorkLease(worker_id)
+            return [self.work_items[item_id] for item_id in leased_item_ids]
+
+    def steal_work(self, worker_id: str, count: int) -> list[int]:
+        # Steal the latest half of the not started scenarios of the worker with the most of them
+        not_started_item_ids: dict[str, list[int]] = {}
+        for item_id, lease in self.leases.items():
+            if not lease.started and lease.worker_id != worker_id:
+                not_started_item_ids.setdefault(lease.worker_id, []).append(item_id)
+        if not not_started_item_ids:
+            return []
+        victim_item_ids = max(not_started_item_ids.values(), key=len)
+        steal_count = min(count, (len(victim_item_ids) + 1) // 2)
+        return victim_item_ids[-steal_count:]
+
+    def start(self, worker_id: str, item_id: int) -> bool:
+        """
+        Marks a leased scenario started, returns False if the scenario was stolen or requeued and must be skipped
+        """
+        self.heartbeat(worker_id)
+        with self.lock:
+            lease = self.leases.get(item_id, None)
+            if lease is None or lease.worker_id != worker_id or item_id in self.results:
+                return False
+            lease.started = True
+            return True
+
+    def complete(self, worker_id: str, item_id: int, scenario_result: ScenarioResult) -> bool:
+        """
+        Records the result of a scenario, only the first result of a scenario is kept
+        """
+        self.heartbeat(worker_id)
+        with self.lock:
+            if item_id in self.results or item_id not in self.work_items:
+                return False
+            self.results[item_id] = scenario_result
+            self.leases.pop(item_id, None)
+            if item_id in self.pending_item_ids:
+                self.pending_item_ids.remove(item_id)
+            if len(self.results) == len(self.work_items):
+                self.completed.set()
+            return True
+
+    def add_events(self, worker_id: str, events: list[dict]):
+        self.heartbeat(worker_id)
+        with self.lock:
+            for event in events:
+                event['worker'] = worker_id
+                self.events.append(event)
+        if self.event_handler:
+            self.event_handler(events)
+
+    def requeue_dead_workers(self, now: Optional[float] = None) -> list[str]:
+        """
+        Queues the scenarios leased to workers missing their heartbeats again, ahead of the pending ones
+        :return: The ids of the dead workers
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            dead_worker_ids = [worker_id for worker_id, last_heartbeat in self.worker_heartbeats.items()
+                               if now - last_heartbeat > self.heartbeat_timeout]
+            for worker_id in dead_worker_ids:
+                del self.worker_heartbeats[worker_id]
+                for item_id in [item_id for item_id, lease in self.leases.items() if lease.worker_id == worker_id]:
+                    del self.leases[item_id]
+                    self.pending_item_ids.appendleft(item_id)
+            return dead_worker_ids
+
+    def is_complete(self) -> bool:
+        return self.completed.is_set()
+
+    def get_status(self) -> dict:
+        with self.lock:
+            return {
+                'complete': self.is_complete(),
+                'pending': len(self.pending_item_ids),
+                'leased': len(self.leases),
+                'completed': len(self.results),
+                'total': len(self.work_items),
+                'workers': list(self.worker_heartbeats.keys()),
+            }
+
+
+class CoordinatorRequestHandler(BaseHTTPRequestHandler):
+    coordinator: Coordinator = None
+
+    def log_message(self, format, *args):
+        logger.debug("Coordinator request: " + format, *args)
+
+    def send_json(self, data: object, status: int = 200):
+        body = json.dumps(data, cls=CustomJSONEncoder).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/status':
+            self.send_json(self.coordinator.get_status())
+        else:
+            self.send_json({'error': 'Unknown path ' + self.path}, 404)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        worker_id = request.get('worker_id')
+        if self.path == '/register':
+            self.send_json(self.coordinator.register(worker_id))
+        elif self.path == '/lease':
+            items = self.coordinator.lease(worker_id, int(request.get('count', 1)))
+            self.send_json({'items': items, 'complete': self.coordinator.is_complete()})
+        elif self.path == '/start':
+            self.send_json({'start': self.coordinator.start(worker_id, request['item_id'])})
+        elif self.path == '/complete':
+            scenario_result = ScenarioResult.model_validate(request['result'])
+            self.send_json({'accepted': self.coordinator.complete(worker_id, request['item_id'], scenario_result)})
+        elif self.path == '/events':
+            self.coordinator.add_events(worker_id, request.get('events', []))
+            self.send_json({})
+        elif self.path == '/heartbeat':
+            self.coordinator.heartbeat(worker_id)
+            self.send_json({'complete': self.coordinator.is_complete()})
+        else:
+            self.send_json({'error': 'Unknown path ' + self.path}, 404)
+
+
+def start_coordinator_server(coordinator: Coordinator, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """
+    Starts serving the coordinator over HTTP in a background thread, port 0 picks a free port
+    """
+    handler_class = type('BoundCoordinatorRequestHandler', (CoordinatorRequestHandler,), {'coordinator': coordinator})
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='karta-coordinator', daemon=True).start()
+    return server
+
+
+def get_work_item(item_id: int, feature: Feature, scenario: Scenario, iteration_index: int = 0) -> dict:
+    return {
+        'id': item_id,
+        'feature': feature.name,
+        'scenario': scenario.name,
+        # Scenarios of YAML features do not have their own source
+        'source': scenario.source or feature.source,
+        'line_number': scenario.line_number,
+        'iteration_index': iteration_index,
+    }
+
+
+class EventForwarder(TestEventListener):
+    """
+    EventForwarder buffers the events of a worker to be sent to the coordinator
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.buffered_events: list[dict] = []
+        self.lock = threading.Lock()
+
+    def add_event(self, event_type: str, context: Context):
+        event = json.loads(json.dumps(to_json_data({'type': event_type, **context}), cls=CustomJSONEncoder))
+        with self.lock:
+            self.buffered_events.append(event)
+
+    def take_events(self) -> list[dict]:
+        with self.lock:
+            events, self.buffered_events = self.buffered_events, []
+            return events
+
+    def run_start(self, context: Context):
+        self.add_event('run_start', context)
+
+    def feature_start(self, context: Context):
+        self.add_event('feature_start', context)
+
+    def feature_iteration_start(self, context: Context):
+        self.add_event('feature_iteration_start', context)
+
+    def scenario_start(self, context: Context):
+        self.add_event('scenario_start', context)
+
+    def step_start(self, context: Context):
+        self.add_event('step_start', context)
+
+    def step_complete(self, context: Context):
+        self.add_event('step_complete', context)
+
+    def scenario_complete(self, context: Context):
+        self.add_event('scenario_complete', context)
+
+    def feature_iteration_complete(self, context: Context):
+        self.add_event('feature_iteration_complete', context)
+
+    def feature_complete(self, context: Context):
+        self.add_event('feature_complete', context)
+
+    def run_complete(self, context: Context):
+        self.add_event('run_complete', context)
+
+
+class CoordinatorClient:
+    """
+    HTTP client of a worker to the coordinator
+    """
+
+    def __init__(self, coordinator_url: str, worker_id: Optional[str] = None, timeout: float = 30.0):
+        self.coordinator_url = coordinator_url.rstrip('/')
+        self.worker_id = worker_id or '{}-{}'.format(socket.gethostname(), os.getpid())
+        self.timeout = timeout
+
+    def post(self, path: str, data: Optional[dict] = None) -> dict:
+        request_data = {'worker_id': self.worker_id, **(data or {})}
+        request = urllib.request.Request(self.coordinator_url + path,
+                                         data=json.dumps(request_data, cls=CustomJSONEncoder).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def register(self) -> dict:
+        return self.post('/register')
+
+    def lease(self, count: int) -> dict:
+        return self.post('/lease', {'count': count})
+
+    def start(self, item_id: int) -> bool:
+        return self.post('/start', {'item_id': item_id})['start']
+
+    def complete(self, item_id: int, scenario_result: ScenarioResult) -> bool:
+        return self.post('/complete', {'item_id': item_id, 'result': scenario_result.model_dump(mode='json')})[
+            'accepted']
+
+    def send_events(self, events: list[dict]):
+        if events:
+            self.post('/events', {'events': events})
+
+    def heartbeat(self) -> dict:
+        return self.post('/heartbeat')
+
+
+def run_distributed(runtime: 'KartaRuntime', scenarios: set[Scenario], worker_count: int, host: str = '127.0.0.1',
+                    port: int = 0, run_name: str = None, run_description: str = None, context=None,
+                    seed: Optional[int] = None, tags: set[str] = None,
+                    history: Optional[ScenarioHistory] = None) -> RunResult:
+    """
+    Runs the scenarios on worker processes pulling them from a coordinator served over HTTP.
+    Workers on other hosts can join with karta_main --worker <coordinator url>. The events of the workers are sent
+    to the event listeners of the runtime.
+    :param runtime: The runtime of the coordinator
+    :param scenarios: The scenarios to run
+    :param worker_count: The number of local worker processes to start
+    :param host: The host to serve the coordinator on
+    :param port: The port to serve the coordinator on, 0 picks a free port
+    :param history: The history of saved run results if already loaded for the run
+    :return: The run result
+    """
+    if context is None:
+        context = Context()
+    if not run_name:
+        run_name = "Run-" + str(datetime.now())
+    if not run_description:
+        run_description = run_name
+    run = Run(id=generate_run_id(), name=run_name, description=run_description, tags=tags, seed=seed)
+    runtime.get_run_seed(run)
+
+    # Longest scenarios are queued first so that the short ones balance the workers at the end
+    if history is None:
+        history = runtime.load_scenario_history()
+    scenario_features = {scenario: runtime.test_catalog_manager.get_feature_for_scenario(scenario) for scenario in
+                         scenarios}
+    ordered_scenarios = partition_scenarios(scenarios, 1, lambda scenario: history.estimate_duration(
+        scenario, scenario_features[scenario]))[0]
+    work_items = [get_work_item(item_id, scenario_features[scenario], scenario) for item_id, scenario in
+                  enumerate(ordered_scenarios)]
+
+    def forward_events(events: list[dict]):
+        for event in events:
+            if event.get('type') in FORWARDED_EVENT_TYPES:
+                runtime.event_processor.forward_event(event['type'], from_json_event(event))
+
+    coordinator = Coordinator({'id': run.id, 'name': run.name, 'seed': run.seed}, work_items,
+                              event_handler=forward_events)
+    server = start_coordinator_server(coordinator, host, port)
+    coordinator_host = '127.0.0.1' if host in ('', '0.0.0.0') else host
+    coordinator_url = 'http://{}:{}'.format(coordinator_host, server.server_address[1])
+    logger.info("Coordinator of {} scenarios serving at {}".format(len(work_items), coordinator_url))
+
+    run_result = RunResult(run_id=run.id, name=run.name, seed=run.seed)
+    run_result.start_time = datetime.now()
+    runtime.event_processor.run_start(run, context)
+    worker_processes = [subprocess.Popen([sys.executable, '-c', 'from karta import main; main()', '--worker',
+                                          coordinator_url]) for _ in range(worker_count)]
+    try:
+        while not coordinator.completed.wait(timeout=1.0):
+            for dead_worker_id in coordinator.requeue_dead_workers():
+                logger.warning("Worker {} missed its heartbeats, its scenarios are queued again".format(
+                    dead_worker_id))
+            if worker_processes and all(worker_process.poll() is not None for worker_process in
+                                        worker_processes) and not coordinator.get_status()['workers']:
+                raise Exception("All workers exited before completing the run")
+    finally:
+        # Workers send their last events before exiting
+        for worker_process in worker_processes:
+            try:
+                worker_process.wait(timeout=coordinator.heartbeat_timeout)
+            except subprocess.TimeoutExpired:
+                worker_process.terminate()
+        server.shutdown()
+        server.server_close()
+
+    feature_results: dict[Feature, FeatureResult] = {}
+    for work_item, scenario in zip(work_items, ordered_scenarios):
+        feature = scenario_features[scenario]
+        if feature not in feature_results:
+            feature_results[feature] = runtime.create_feature_result(run, feature)
+            run_result.add_feature_result(feature_results[feature])
+        scenario_result = coordinator.results[work_item['id']]
+        feature_results[feature].add_scenario_result(scenario_result, scenario_result.iteration_index)
+    for feature_result in feature_results.values():
+        scenario_results = feature_result.scenario_results
+        feature_result.start_time = min(filter(None, (result.start_time for result in scenario_results)),
+                                        default=None)
+        feature_result.end_time = max(filter(None, (result.end_time for result in scenario_results)),
+                                      default=None)
+    run_result.end_time = datetime.now()
+    runtime.event_processor.run_complete(run, run_result, context)
+    runtime.save_run_result(run_result)
+    if runtime.config.results_directory:
+        events_file = get_event_log_file(run.id, runtime.config.results_directory)
+        events_file.write_text(json.dumps(coordinator.events, indent=4), encoding='utf-8')
+    return run_result
+
+
+def run_worker(runtime: 'KartaRuntime', coordinator_url: str, prefetch: int = 2) -> RunResult:
+    """
+    Runs scenarios leased from a coordinator until its run is complete, streaming the events back to it. The
+    feature of the scenarios is started when it changes from the one of the scenario before and completed when it
+    changes again, as in run_scenarios. The event listeners of the runtime are replaced by the coordinator for the
+    run, so that workers sharing a host do not write the same event files.
+    :param runtime: The runtime of the worker
+    :param coordinator_url: The URL of the coordinator
+    :param prefetch: The number of scenarios to lease at a time
+    :return: The result of the scenarios run by this worker
+    """
+    event_processor = runtime.event_processor
+    client = CoordinatorClient(coordinator_url)
+    run_info = client.register()
+    run = Run(id=run_info['id'], name=run_info['name'], seed=run_info['seed'])
+    logger.info("Worker {} joined run {}".format(client.worker_id, run.name))
+
+    event_forwarder = EventForwarder()
+    test_event_listeners = event_processor.test_event_listeners
+    event_processor.test_event_listeners = [event_forwarder]
+    stop_heartbeats = threading.Event()
+
+    def take_events() -> list[dict]:
+        # Taken on the event listener threads once the events submitted before are buffered
+        return event_processor.event_listener_thread_pool_executor.submit(event_forwarder.take_events).result()
+
+    def send_heartbeats():
+        while not stop_heartbeats.wait(Coordinator.heartbeat_timeout / 3):
+            try:
+                client.send_events(take_events())
+                client.heartbeat()
+            except (urllib.error.URLError, OSError) as e:
+                logger.warning("Heartbeat to coordinator failed: {}".format(e))
+
+    threading.Thread(target=send_heartbeats, name='karta-worker-heartbeat', daemon=True).start()
+
+    context = Context()
+    run_result = RunResult(run_id=run.id, name=run.name, seed=run.seed)
+    run_result.start_time = datetime.now()
+    event_processor.run_start(run, context)
+    parsed_features: dict[str, Feature] = {}
+    feature_results: dict[Feature, FeatureResult] = {}
+    feature, feature_context = None, None
+    try:
+        while True:
+            lease = client.lease(prefetch)
+            if not lease['items']:
+                if lease['complete']:
+                    break
+                # Other workers are running the last scenarios, which may be queued again if they die
+                time.sleep(1.0)
+                continue
+            for work_item in lease['items']:
+                if not client.start(work_item['id']):
+                    continue
+                found_scenario = runtime.find_scenario(work_item['source'], work_item['line_number'],
+                                                       parsed_features, work_item['scenario'])
+                if not found_scenario:
+                    scenario_result = ScenarioResult(name=work_item['scenario'], source=work_item['source'],
+                                                     line_number=work_item['line_number'],
+                                                     iteration_index=work_item['iteration_index'])
+                    scenario_result.successful = False
+                    scenario_result.error = "Scenario not found on worker " + client.worker_id
+                    client.complete(work_item['id'], scenario_result)
+                    continue
+
+                scenario_feature, scenario = found_scenario
+                if scenario_feature is not feature:
+                    if feature is not None:
+                        feature_results[feature].end_time = datetime.now()
+                        event_processor.feature_complete(run, feature, feature_results[feature], feature_context)
+                    feature = scenario_feature
+                    if feature not in feature_results:
+                        feature_results[feature] = runtime.create_feature_result(run, feature)
+                    feature_context = context.create_copy()
+                    event_processor.feature_start(run, feature, feature_context)
+                setup_steps = feature.background.steps if feature.background else []
+                scenario_result = runtime.run_scenario(run, feature.name, setup_steps, work_item['iteration_index'],
+                                                       scenario, feature_context, feature_source=feature.source)
+                # The coordinator keeps the result sent to it for the run
+                scenario_result = runtime.retain_scenario_result(scenario_result)
+                feature_results[feature].add_scenario_result(scenario_result, scenario_result.iteration_index)
+                client.send_events(take_events())
+                client.complete(work_item['id'], scenario_result)
+    finally:
+        if feature is not None:
+            feature_results[feature].end_time = datetime.now()
+            event_processor.feature_complete(run, feature, feature_results[feature], feature_context)
+        for feature_result in feature_results.values():
+            run_result.add_feature_result(feature_result)
+        run_result.end_time = datetime.now()
+        event_processor.run_complete(run, run_result, context)
+        stop_heartbeats.set()
+        try:
+            client.send_events(take_events())
+        except (urllib.error.URLError, OSError) as e:
+            logger.warning("Sending the last events to coordinator failed: {}".format(e))
+        event_processor.test_event_listeners = test_event_listeners
+    return run_result
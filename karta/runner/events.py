@@ -1,11 +1,13 @@
 import queue
 from concurrent.futures.thread import ThreadPoolExecutor
 from datetime import datetime
+from typing import Optional
 
 from karta.core.interfaces.plugins import TestLifecycleHook, TestEventListener
 from karta.core.models.generic import Context
 from karta.core.models.test_catalog import Feature, Scenario, Step
 from karta.core.models.test_execution import Run, StepResult, ScenarioResult, FeatureResult, RunResult
+from karta.plugins.fixtures import FixtureManager
 
 
 class EventProcessor:
@@ -14,6 +16,8 @@ class EventProcessor:
 
     number_of_threads: int = 1
     event_listener_thread_pool_executor: ThreadPoolExecutor = None
+    # Enters and exits the scopes of fixtures around the lifecycle hooks, so that hooks can use the fixtures
+    fixture_manager: Optional[FixtureManager] = None
 
     def __init__(self, test_lifecycle_hooks=None, test_event_listeners=None, number_of_threads=1):
         super().__init__()
@@ -75,6 +79,8 @@ class EventProcessor:
             self.event_listener_thread_pool_executor.submit(test_event_listener.feature_start,
                                                             event_context)
 
+        if self.fixture_manager:
+            self.fixture_manager.enter_scope('feature')
         for test_lifecycle_hooks in self.test_lifecycle_hooks:
             test_lifecycle_hooks.feature_start(feature_context)
 
@@ -123,6 +129,8 @@ class EventProcessor:
             self.event_listener_thread_pool_executor.submit(test_event_listener.scenario_start,
                                                             event_context)
 
+        if self.fixture_manager:
+            self.fixture_manager.enter_scope('scenario')
         for test_lifecycle_hooks in self.test_lifecycle_hooks:
             test_lifecycle_hooks.scenario_start(scenario_context)
 
@@ -203,8 +211,12 @@ class EventProcessor:
             self.event_listener_thread_pool_executor.submit(test_event_listener.scenario_complete,
                                                             event_context)
 
-        for test_lifecycle_hooks in self.test_lifecycle_hooks:
-            test_lifecycle_hooks.scenario_complete(scenario_context)
+        try:
+            for test_lifecycle_hooks in self.test_lifecycle_hooks:
+                test_lifecycle_hooks.scenario_complete(scenario_context)
+        finally:
+            if self.fixture_manager:
+                self.fixture_manager.exit_scope('scenario')
 
     def feature_iteration_complete(self, run: Run, feature: Feature, iteration_index: int,
                                    result: list[ScenarioResult], feature_context: Context):
@@ -248,8 +260,12 @@ class EventProcessor:
             self.event_listener_thread_pool_executor.submit(test_event_listener.feature_complete,
                                                             event_context)
 
-        for test_lifecycle_hooks in self.test_lifecycle_hooks:
-            test_lifecycle_hooks.feature_complete(feature_context)
+        try:
+            for test_lifecycle_hooks in self.test_lifecycle_hooks:
+                test_lifecycle_hooks.feature_complete(feature_context)
+        finally:
+            if self.fixture_manager:
+                self.fixture_manager.exit_scope('feature')
 
     def run_complete(self, run: Run, result: RunResult, run_context: Context):
         run_info = Context()
@@ -266,5 +282,19 @@ class EventProcessor:
         for test_event_listener in self.test_event_listeners:
             self.event_listener_thread_pool_executor.submit(test_event_listener.run_complete, event_context)
 
-        for test_lifecycle_hooks in self.test_lifecycle_hooks:
-            test_lifecycle_hooks.run_complete(run_context)
+        try:
+            for test_lifecycle_hooks in self.test_lifecycle_hooks:
+                test_lifecycle_hooks.run_complete(run_context)
+        finally:
+            if self.fixture_manager:
+                self.fixture_manager.exit_scope('worker')
+                self.fixture_manager.exit_scope('session')
+
+    def forward_event(self, event_type: str, event_context: Context):
+        """
+        Sends an event of another process, like a worker of a distributed run, to the event listeners
+        :param event_type: The name of the event listener method to call
+        :param event_context: The event context of the event listeners
+        """
+        for test_event_listener in self.test_event_listeners:
+            self.event_listener_thread_pool_executor.submit(getattr(test_event_listener, event_type), event_context)
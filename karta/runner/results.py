@@ -0,0 +1,170 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from karta.core.models.test_execution import RunResult, FeatureResult, ScenarioResult
+
+
+def generate_run_id() -> str:
+    return datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+
+
+# Suffix of the event logs of distributed runs saved next to the run results
+EVENT_LOG_SUFFIX = '-events.json'
+
+
+def get_run_result_file(run_id: str, results_directory: str) -> Path:
+    return Path(results_directory) / (run_id + '.json')
+
+
+def get_event_log_file(run_id: str, results_directory: str) -> Path:
+    return Path(results_directory) / (run_id + EVENT_LOG_SUFFIX)
+
+
+def save_run_result(run_result: RunResult, results_directory: str) -> Path:
+    """
+    Saves the run result as <run id>.json in the results directory
+    :param run_result: The run result to save
+    :param results_directory: The directory to save the result in
+    :return: The path of the saved result file
+    """
+    result_file = get_run_result_file(run_result.run_id, results_directory)
+    result_file.parent.mkdir(parents=True, exist_ok=True)
+    result_file.write_text(run_result.model_dump_json(indent=4), encoding='utf-8')
+    return result_file
+
+
+def read_event_log(events: list[dict]) -> RunResult:
+    """
+    Rebuilds the result of the last run in an event log written by DumpToJSONEventListener.
+    Event logs with feature results not holding scenario results are rebuilt from the scenario complete events.
+    """
+    run_complete_events = [event for event in events if event.get('type') == 'run_complete']
+    if not run_complete_events:
+        raise Exception("Event log does not have a completed run")
+    run_result = RunResult.model_validate(run_complete_events[-1]['result'])
+    if not run_result.name:
+        run_result.name = run_complete_events[-1].get('run')
+    if any(feature_result.scenario_results for feature_result in run_result.feature_results):
+        return run_result
+
+    run_events = [event for event in events if event.get('run') == run_result.name]
+    feature_results: dict[str, FeatureResult] = {}
+    for event in run_events:
+        if event.get('type') == 'feature_complete':
+            feature_result = FeatureResult.model_validate(event['result'])
+            feature_result.scenario_results = []
+            feature_results[event['feature']] = feature_result
+    for event in run_events:
+        if event.get('type') == 'scenario_complete' and event['feature'] in feature_results:
+            feature_results[event['feature']].scenario_results.append(ScenarioResult.model_validate(event['result']))
+    run_result.feature_results = list(feature_results.values())
+    return run_result
+
+
+def load_run_result(run_id_or_file: str, results_directory: Optional[str] = None) -> RunResult:
+    """
+    Loads a run result from a result file, an event log or the saved result of a run id in the results directory
+    :param run_id_or_file: The run id or path of the result file or event log
+    :param results_directory: The directory the run results are saved in
+    :return: The run result
+    """
+    result_file = Path(run_id_or_file)
+    if not result_file.is_file() and results_directory:
+        result_file = get_run_result_file(run_id_or_file, results_directory)
+    if not result_file.is_file():
+        raise Exception("No run result found for " + run_id_or_file)
+
+    with open(result_file, 'r', encoding='utf-8') as stream:
+        result_data = json.load(stream)
+    if isinstance(result_data, list):
+        return read_event_log(result_data)
+    return RunResult.model_validate(result_data)
+
+
+def get_scenario_result_key(feature_result: FeatureResult, scenario_result: ScenarioResult) -> tuple:
+    """
+    Gets the key of a scenario iteration result, by its source falling back to the feature source and by the feature
+    and scenario names to tell apart scenarios without line numbers like those of YAML features
+    """
+    return (scenario_result.source or feature_result.source, feature_result.name, scenario_result.name,
+            scenario_result.line_number, scenario_result.iteration_index)
+
+
+def get_failed_scenario_results(run_result: RunResult) -> list[tuple[FeatureResult, ScenarioResult]]:
+    return [(feature_result, scenario_result) for feature_result in run_result.feature_results
+            for scenario_result in feature_result.scenario_results if not scenario_result.is_successful()]
+
+
+def merge_run_results(run_result: RunResult, rerun_result: RunResult) -> RunResult:
+    """
+    Merges the scenario results of a rerun into the run result, replacing the results of the same scenario iterations
+    :param run_result: The result of the original run
+    :param rerun_result: The result of the rerun
+    :return: The combined run result with the id, name and times of the rerun
+    """
+    rerun_scenario_results = {get_scenario_result_key(feature_result, scenario_result): scenario_result
+                              for feature_result in rerun_result.feature_results
+                              for scenario_result in feature_result.scenario_results}
+    merged_result = RunResult(run_id=rerun_result.run_id, name=rerun_result.name, seed=run_result.seed,
+                              start_time=rerun_result.start_time, end_time=rerun_result.end_time)
+    for feature_result in run_result.feature_results:
+        merged_feature_result = FeatureResult(name=feature_result.name, source=feature_result.source,
+                                              line_number=feature_result.line_number,
+                                              start_time=feature_result.start_time,
+                                              end_time=feature_result.end_time,
+                                              iterations_count=feature_result.iterations_count,
+                                              seed=feature_result.seed)
+        for scenario_result in feature_result.scenario_results:
+            scenario_result = rerun_scenario_results.get(get_scenario_result_key(feature_result, scenario_result),
+                                                         scenario_result)
+            merged_feature_result.add_scenario_result(scenario_result, scenario_result.iteration_index)
+        merged_result.add_feature_result(merged_feature_result)
+    return merged_result
+
+
+def combine_run_results(run_results: list[RunResult], run_id: str, name: Optional[str] = None) -> RunResult:
+    """
+    Combines the results of the shards of a run into one run result, the scenario results of a feature run across
+    shards are merged into one feature result
+    :param run_results: The results of the shards
+    :param run_id: The run id of the combined result
+    :param name: The name of the combined result
+    :return: The combined run result
+    """
+    combined_result = RunResult(run_id=run_id, name=name or run_id)
+    start_times = [run_result.start_time for run_result in run_results if run_result.start_time]
+    end_times = [run_result.end_time for run_result in run_results if run_result.end_time]
+    combined_result.start_time = min(start_times) if start_times else None
+    combined_result.end_time = max(end_times) if end_times else None
+    combined_result.seed = next((run_result.seed for run_result in run_results if run_result.seed is not None), None)
+
+    combined_feature_results: dict[tuple, FeatureResult] = {}
+    for run_result in run_results:
+        combined_result.skipped_scenarios.extend(run_result.skipped_scenarios or [])
+        for feature_result in run_result.feature_results:
+            feature_key = (feature_result.source, feature_result.name)
+            combined_feature_result = combined_feature_results.get(feature_key, None)
+            if combined_feature_result is None:
+                combined_feature_result = FeatureResult(name=feature_result.name, source=feature_result.source,
+                                                        line_number=feature_result.line_number,
+                                                        start_time=feature_result.start_time,
+                                                        end_time=feature_result.end_time,
+                                                        iterations_count=feature_result.iterations_count,
+                                                        seed=feature_result.seed)
+                combined_feature_results[feature_key] = combined_feature_result
+                combined_result.add_feature_result(combined_feature_result)
+            else:
+                if feature_result.start_time and (not combined_feature_result.start_time or
+                                                  feature_result.start_time < combined_feature_result.start_time):
+                    combined_feature_result.start_time = feature_result.start_time
+                if feature_result.end_time and (not combined_feature_result.end_time or
+                                                feature_result.end_time > combined_feature_result.end_time):
+                    combined_feature_result.end_time = feature_result.end_time
+            if feature_result.error and not feature_result.scenario_results:
+                combined_feature_result.error = combined_feature_result.error or feature_result.error
+                combined_feature_result.successful = False
+            for scenario_result in feature_result.scenario_results:
+                combined_feature_result.add_scenario_result(scenario_result, scenario_result.iteration_index)
+    return combined_result
@@ -1,10 +1,13 @@
 import itertools
+import os
 import pathlib
+import time
 import traceback
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 from random import Random
-from typing import Union, Optional
+from typing import Union, Optional, Callable, Iterable
 
 import yaml
 
@@ -14,12 +17,24 @@ from karta.core.interfaces.plugins import StepRunner, FeatureParser, TestCatalog
 from karta.core.models.generic import Context
 from karta.core.models.karta_config import KartaConfig, default_karta_config
 from karta.core.models.test_catalog import Feature, Step, Scenario, StepType
-from karta.core.models.test_execution import StepResult, ScenarioResult, FeatureResult, Run, RunResult
+from karta.core.models.test_execution import StepResult, ScenarioResult, FeatureResult, Run, RunResult, \
+    ResultNode
+from karta.core.models.testdata import BatchedDataGenerator
 from karta.core.utils.datautils import deep_update
 from karta.core.utils.logger import logger
+from karta.core.utils.measurements import Measurements
 from karta.core.utils.properties import read_properties
+from karta.core.utils.randomization_utils import generate_seed, derive_seed, derive_random
 from karta.plugins.dependency_injector import KartaDependencyInjector
 from karta.runner.events import EventProcessor
+from karta.runner.results import generate_run_id, save_run_result, load_run_result, get_failed_scenario_results, \
+    merge_run_results, combine_run_results
+from karta.runner.scheduling import ScenarioHistory, partition_scenarios, order_scenarios, get_scenario_value, \
+    select_within_budget, group_by_feature, HISTORY_FREE_ORDERINGS
+from karta.runner.selection import ScenarioUsageIndex, get_changed_files
+
+# Most step data generators kept by a runtime, each holding a pregenerated batch of step data
+MAX_STEP_DATA_GENERATORS = 1024
 
 
 class KartaRuntime:
@@ -35,6 +50,14 @@ class KartaRuntime:
     event_processor: EventProcessor = None
 
     def __init__(self, config: KartaConfig = default_karta_config):
+        # Plugins and event processor of this runtime, so that runtimes loading other configs do not share them
+        self.plugins: dict[str, Plugin] = {}
+        self.step_runners: list[StepRunner] = []
+        self.feature_parsers: list[FeatureParser] = []
+        self.parser_map: dict[str, FeatureParser] = {}
+        self.event_processor: Optional[EventProcessor] = None
+        # Batched step data generators of this runtime, the least recently used dropped beyond the maximum count
+        self.step_data_generators: OrderedDict[int, BatchedDataGenerator] = OrderedDict()
         self.load_config(config)
 
     def __enter__(self):
@@ -51,6 +74,7 @@ class KartaRuntime:
 
     def load_config(self, config: KartaConfig = default_karta_config):
         self.config = config
+        self.step_data_generators.clear()
         self.load_properties()
         self.load_dependency_injector()
         self.load_plugins()
@@ -94,6 +118,7 @@ class KartaRuntime:
                 self.step_runners.append(plugin)
 
     def load_feature_parsers(self):
+        self.feature_parsers.clear()
         self.parser_map.clear()
         if not self.config.parser_map or (len(self.config.parser_map) == 0):
             raise Exception("Need at least one feature parser configured")
@@ -122,6 +147,7 @@ class KartaRuntime:
     def load_event_processor(self):
         if not self.event_processor:
             self.event_processor = EventProcessor()
+        self.event_processor.fixture_manager = getattr(self.dependency_injector, 'fixture_manager', None)
         self.event_processor.test_lifecycle_hooks.clear()
         for test_lifecycle_hook_name in self.config.test_lifecycle_hooks:
             plugin = self.plugins[test_lifecycle_hook_name]
@@ -150,8 +176,120 @@ class KartaRuntime:
             steps.extend(step_runner.get_steps())
         return steps
 
+    def get_step_implementation(self, name: str) -> Optional[Callable]:
+        step_runner = self.find_step_runner_for_step(name)
+        return step_runner.get_step_implementation(name) if step_runner else None
+
+    def get_catalog_features(self) -> set[Feature]:
+        catalog_features = set()
+        for features in self.test_catalog_manager.list_features().values():
+            catalog_features.update(features if isinstance(features, set) else {features})
+        return catalog_features
+
+    def build_usage_index(self) -> ScenarioUsageIndex:
+        """
+        Builds the index of the catalog scenarios using each step definition, feature file and step definition module
+        """
+        usage_index = ScenarioUsageIndex()
+        usage_index.add_features(self.get_catalog_features(), self.get_step_implementation)
+        for step_runner in self.step_runners:
+            usage_index.add_step_definitions(step_runner.get_step_implementations())
+        usage_index.add_source_directories({os.path.dirname(module_file) for module_file in
+                                            usage_index.step_definition_module_files})
+        return usage_index
+
+    def get_run_seed(self, run: Run) -> int:
+        if run.seed is None:
+            run.seed = self.config.random_seed if self.config.random_seed is not None else generate_seed()
+        return run.seed
+
+    def get_feature_seed(self, run: Run, feature_name: str) -> int:
+        return derive_seed(self.get_run_seed(run), feature_name)
+
+    def get_iteration_seed(self, run: Run, feature_name: str, iteration_index: int) -> int:
+        return derive_seed(self.get_feature_seed(run, feature_name), iteration_index)
+
+    def get_scenario_seed(self, run: Run, feature_name: str, iteration_index: int, scenario: Scenario) -> int:
+        return derive_seed(self.get_iteration_seed(run, feature_name, iteration_index), scenario.name,
+                           scenario.line_number)
+
+    def get_scenario_data_seed(self, run: Run, feature_name: str, scenario: Scenario) -> int:
+        """
+        Gets the seed of the batched step data of a scenario, shared by its iterations which index into the batches
+        """
+        return derive_seed(self.get_feature_seed(run, feature_name), 'step_data', scenario.name, scenario.line_number)
+
+    def get_iteration_scenarios(self, run: Run, feature: Feature, iteration_index: int) -> list[Scenario]:
+        """
+        Regenerates the scenarios picked for an iteration of a feature from the run seed, without replaying the
+        iterations before it.
+        """
+        iteration_seed = self.get_iteration_seed(run, feature.name, iteration_index)
+        return feature.get_next_iteration_scenarios(random=derive_random(iteration_seed, 'scenarios'))
+
+    def generate_step_data(self, run: Run, step: Step, random: Optional[Random] = None, iteration_index: int = 0,
+                           data_seed: Optional[int] = None, generated_steps: Optional[set[Step]] = None) -> Optional[
+        object]:
+        """
+        Generates the data of a step run. With a data batch size above 1, the data of the first run of a step in a
+        scenario iteration is the value at the iteration index of a batched stream seeded from the scenario data seed,
+        so that the run seed, the scenario and the iteration alone set it. Steps run again in the same iteration, like
+        the steps of a loop, draw their data from the step random.
+        :param random: The random of the step in the scenario
+        :param iteration_index: The index of the feature iteration
+        :param data_seed: The scenario data seed, the data is drawn from the step random if None
+        :param generated_steps: The steps which already got their data in the scenario iteration
+        :return: The step data
+        """
+        if not step.data_rules:
+            return {}
+        if not self.config.data_batch_size or self.config.data_batch_size <= 1 or data_seed is None or (
+                generated_steps is not None and step in generated_steps):
+            return step.data_rules.compile()(random if random else self.random)
+        if generated_steps is not None:
+            generated_steps.add(step)
+
+        step_seed = derive_seed(data_seed, step.source, step.line_number, step.identifier)
+        step_data_generator = self.step_data_generators.get(step_seed, None)
+        if step_data_generator is None:
+            step_data_generator = BatchedDataGenerator(step.data_rules, step_seed, self.config.data_batch_size)
+            self.step_data_generators[step_seed] = step_data_generator
+            if len(self.step_data_generators) > MAX_STEP_DATA_GENERATORS:
+                self.step_data_generators.popitem(last=False)
+        else:
+            self.step_data_generators.move_to_end(step_seed)
+        return step_data_generator.generate_value_at(iteration_index)
+
+    def process_step_return(self, step_result: StepResult, step_return: Union[tuple[dict, bool, str], bool, dict],
+                            scenario_context: Context):
+        """
+        Records the return of a plain step run in its step result, adding the returned data to the scenario context
+        """
+        step_result_data = {}
+        if not isinstance(step_return, type(None)):
+            if isinstance(step_return, dict):
+                step_result_data = step_return
+            elif isinstance(step_return, tuple):
+                if len(step_return) > 0:
+                    step_result_data = step_return[0]
+                    if len(step_return) > 1:
+                        step_result.successful = step_return[1]
+                        if len(step_return) > 2:
+                            step_result.error = step_return[2]
+                            if len(step_return) > 3:
+                                step_result.measurements = step_return[3]
+            elif isinstance(step_return, bool):
+                step_result.successful = step_return
+            else:
+                raise Exception("Unprocessable result type: ", type(step_result))
+        if step_result_data and len(step_result_data) > 0:
+            scenario_context.data.update(step_result_data)
+        step_result.results = step_result_data
+
     def run_step(self, run: Run, feature_name: str, iteration_index: int, scenario_name: str, step: Step,
-                 scenario_context: Context) -> Union[StepResult, bool]:
+                 scenario_context: Context, random: Optional[Random] = None,
+                 step_data: Optional[dict] = None, data_seed: Optional[int] = None,
+                 generated_steps: Optional[set[Step]] = None) -> Union[StepResult, bool]:
         # logger.info('Running step %s', str(step.name))
         step_result = StepResult(name=step.identifier, )
         step_result.source = step.source
@@ -162,37 +300,25 @@ class KartaRuntime:
         if step_runner is None:
             raise Exception("Unimplemented step: " + step.identifier)
         self.event_processor.step_start(run, feature_name, iteration_index, scenario_name, step, scenario_context)
-        scenario_context.step_data = step.data_rules.generate_next_value(self.random) if step.data_rules else {}
+        scenario_context.step_data = step_data if step_data is not None else self.generate_step_data(
+            run, step, random, iteration_index, data_seed, generated_steps)
+        # Time measurements recorded by the step, such as response times, kept apart from those of nested steps
+        outer_measurements = scenario_context.get('measurements', None)
+        step_measurements = Measurements()
+        scenario_context.measurements = step_measurements
 
         step_return = step_runner.run_step(step, scenario_context)
 
         if step.type == StepType.STEP:
-            step_result_data = {}
-            if not isinstance(step_return, type(None)):
-                if isinstance(step_return, dict):
-                    step_result_data = step_return
-                elif isinstance(step_return, tuple):
-                    if len(step_return) > 0:
-                        step_result_data = step_return[0]
-                        if len(step_return) > 1:
-                            step_result.successful = step_return[1]
-                            if len(step_return) > 2:
-                                step_result.error = step_return[2]
-                elif isinstance(step_return, bool):
-                    step_result.successful = step_return
-                else:
-                    raise Exception("Unprocessable result type: ", type(step_result))
-            if step_result_data and len(step_result_data) > 0:
-                scenario_context.data.update(step_result_data)
-            step_result.results = step_result_data
+            self.process_step_return(step_result, step_return, scenario_context)
 
         if step.type == StepType.CONDITION:
             if step_return:
                 for nested_step in step.steps:
                     try:
                         nested_step_result = self.run_step(run, feature_name, iteration_index, scenario_name,
-                                                           nested_step,
-                                                           scenario_context)
+                                                           nested_step, scenario_context, random,
+                                                           data_seed=data_seed, generated_steps=generated_steps)
                         step_result.add_step_result(nested_step_result)
                         if not nested_step_result.is_successful():
                             break
@@ -206,8 +332,8 @@ class KartaRuntime:
                 for nested_step in step.steps:
                     try:
                         nested_step_result = self.run_step(run, feature_name, iteration_index, scenario_name,
-                                                           nested_step,
-                                                           scenario_context)
+                                                           nested_step, scenario_context, random,
+                                                           data_seed=data_seed, generated_steps=generated_steps)
                         step_result.add_step_result(nested_step_result)
                         if not nested_step_result.is_successful():
                             break
@@ -215,75 +341,204 @@ class KartaRuntime:
                         step_result.successful = False
                         step_result.error = str(e) + "\n" + traceback.format_exc()
                         break
+                scenario_context.measurements = step_measurements
                 step_return = step_runner.run_step(step, scenario_context)
 
+        scenario_context.measurements = outer_measurements
+        if step_measurements:
+            step_result.measurements = step_measurements.get_distributions()
         step_result.end_time = datetime.now()
         self.event_processor.step_complete(run, feature_name, iteration_index, scenario_name, step, step_result,
                                            scenario_context)
         return step_result
 
+    def get_step_batch(self, steps: list[Step], start_index: int) -> tuple[Optional[StepRunner], list[Step]]:
+        """
+        Gets the consecutive plain steps from the start index run by the same step runner supporting batching
+        :return: The step runner and the steps to run in one call, only the step at the start index if not batchable
+        """
+        step = steps[start_index]
+        if step.type != StepType.STEP or not step.identifier:
+            return None, [step]
+        step_runner = self.find_step_runner_for_step(step.identifier.strip())
+        if step_runner is None or not step_runner.supports_batching:
+            return step_runner, [step]
+        batch_steps = [step]
+        for next_step in steps[start_index + 1:]:
+            if next_step.type != StepType.STEP or not next_step.identifier or self.find_step_runner_for_step(
+                    next_step.identifier.strip()) is not step_runner:
+                break
+            batch_steps.append(next_step)
+        return step_runner, batch_steps
+
+    def run_step_batch(self, run: Run, feature_name: str, iteration_index: int, scenario_name: str,
+                       step_runner: StepRunner, steps: list[Step], scenario_context: Context,
+                       randoms: list[Random], data_seed: Optional[int] = None,
+                       generated_steps: Optional[set[Step]] = None) -> list[StepResult]:
+        """
+        Runs consecutive plain steps of a step runner supporting batching in one call, stopping at the first failed
+        step. Step start events of all the steps are sent before the call and their complete events after it, steps
+        not run after a failed step completing unsuccessfully without being part of the results. The steps share the
+        times of the call, and measurements recorded through the context during the call are attached to the last
+        step run unless the step runner returned measurements of its own.
+        :return: The results of the steps run
+        """
+        step_data = [self.generate_step_data(run, step, random, iteration_index, data_seed, generated_steps) for
+                     step, random in zip(steps, randoms)]
+        for step, data in zip(steps, step_data):
+            scenario_context.step_data = data
+            self.event_processor.step_start(run, feature_name, iteration_index, scenario_name, step, scenario_context)
+        outer_measurements = scenario_context.get('measurements', None)
+        batch_measurements = Measurements()
+        scenario_context.measurements = batch_measurements
+        start_time = datetime.now()
+        try:
+            step_returns = step_runner.run_steps(steps, step_data, scenario_context)
+        finally:
+            scenario_context.measurements = outer_measurements
+        end_time = datetime.now()
+
+        step_results = []
+        for index, (step, data) in enumerate(zip(steps, step_data)):
+            step_result = StepResult(name=step.identifier, )
+            step_result.source = step.source
+            step_result.line_number = step.line_number
+            step_result.start_time = start_time
+            scenario_context.step_data = data
+            if index < len(step_returns):
+                self.process_step_return(step_result, step_returns[index], scenario_context)
+                if batch_measurements and index == len(step_returns) - 1 and not step_result.measurements:
+                    step_result.measurements = batch_measurements.get_distributions()
+                step_results.append(step_result)
+            else:
+                step_result.successful = False
+                step_result.error = "Step not run after a failed step of its batch"
+            step_result.end_time = end_time
+            self.event_processor.step_complete(run, feature_name, iteration_index, scenario_name, step, step_result,
+                                               scenario_context)
+        return step_results
+
     def run_scenario(self, run: Run, feature_name: str, setup_steps: list[Step], iteration_index: int,
-                     scenario: Scenario, feature_context: Context, ):
+                     scenario: Scenario, feature_context: Context, seed: Optional[int] = None,
+                     feature_source: Optional[str] = None):
+        """
+        Runs an iteration of a scenario with the scenario seed of the iteration unless a seed is given
+        :param feature_source: The source of the feature, recorded as the source of scenarios without one
+        """
+        scenario_seed = seed if seed is not None else self.get_scenario_seed(run, feature_name, iteration_index,
+                                                                             scenario)
         scenario_result = ScenarioResult(name=scenario.name, )
-        scenario_result.source = scenario.source
+        scenario_result.source = scenario.source or feature_source
         scenario_result.line_number = scenario.line_number
+        scenario_result.iteration_index = iteration_index
+        scenario_result.seed = scenario_seed
         scenario_result.start_time = datetime.now()
         scenario_context = feature_context.create_copy()
         scenario_context.data = {}
         scenario_context.properties = self.properties.create_copy()
         self.event_processor.scenario_start(run, feature_name, iteration_index, scenario, scenario_context)
         # logger.info('Running scenario %s', str(scenario.name))
-        for step in itertools.chain(setup_steps, scenario.steps):
+        steps = list(itertools.chain(setup_steps, scenario.steps))
+        data_seed = self.get_scenario_data_seed(run, feature_name, scenario)
+        generated_steps: set[Step] = set()
+        step_index = 0
+        while step_index < len(steps):
+            step_runner, batch_steps = self.get_step_batch(steps, step_index)
             try:
-                step_result = self.run_step(run, feature_name, iteration_index, scenario.name, step, scenario_context)
-                scenario_result.add_step_result(step_result)
-                if not step_result.is_successful():
+                if len(batch_steps) > 1:
+                    step_results = self.run_step_batch(run, feature_name, iteration_index, scenario.name, step_runner,
+                                                       batch_steps, scenario_context,
+                                                       [derive_random(scenario_seed, index) for index in
+                                                        range(step_index, step_index + len(batch_steps))],
+                                                       data_seed, generated_steps)
+                else:
+                    step_results = [self.run_step(run, feature_name, iteration_index, scenario.name,
+                                                  steps[step_index], scenario_context,
+                                                  derive_random(scenario_seed, step_index), data_seed=data_seed,
+                                                  generated_steps=generated_steps)]
+                for step_result in step_results:
+                    scenario_result.add_step_result(step_result)
+                if not all(step_result.is_successful() for step_result in step_results) or len(step_results) < len(
+                        batch_steps):
                     break
             except Exception as e:
                 scenario_result.successful = False
                 scenario_result.error = str(e) + "\n" + traceback.format_exc()
                 break
+            step_index += len(batch_steps)
         scenario_result.end_time = datetime.now()
         self.event_processor.scenario_complete(run, feature_name, iteration_index, scenario, scenario_result,
                                                scenario_context)
         return scenario_result
 
-    def run_scenarios(self, run: Run, scenarios: set[Scenario], run_context: Context, ) -> RunResult:
-        feature_to_scenario_map: dict[Feature, set[Scenario]] = {}
-        run_result = RunResult()
+    def run_scenarios(self, run: Run, scenarios: Iterable[Scenario], run_context: Context,
+                      deadline: Optional[float] = None) -> RunResult:
+        """
+        Runs the scenarios in the order given. The feature of the scenarios is started when it changes from the one of
+        the scenario before and completed when it changes again, so a feature whose scenarios are not consecutive is
+        started more than once. Every feature has one feature result holding all its scenario results.
+        :param deadline: time.monotonic() after which no more scenarios are started, they are reported skipped
+        """
+        run_result = RunResult(run_id=run.id, name=run.name)
         run_result.start_time = datetime.now()
+        run_result.seed = self.get_run_seed(run)
 
+        feature_results: dict[Feature, FeatureResult] = {}
+        scenarios_run: set[Scenario] = set()
+        feature, feature_context = None, None
         for scenario in scenarios:
-            feature = self.test_catalog_manager.get_feature_for_scenario(scenario)
-            if feature not in feature_to_scenario_map.keys():
-                feature_to_scenario_map[feature] = set()
-            if scenario not in feature_to_scenario_map[feature]:
-                feature_to_scenario_map[feature].add(scenario)
-
-        for feature in feature_to_scenario_map.keys():
-            feature_result = FeatureResult(name=feature.name)
-            feature_result.source = feature.source
-            feature_result.line_number = feature.line_number
-            feature_result.start_time = datetime.now()
-            feature_context = run_context.create_copy()
-            # logger.info('Running feature %s', str(feature.name))
-            self.event_processor.feature_start(run, feature, feature_context)
-            for scenario in feature_to_scenario_map[feature]:
-                scenario_result = self.run_scenario(run, feature.name, feature.background.steps, 0, scenario,
-                                                    feature_context)
-                feature_result.add_scenario_result(scenario_result)
-            feature_result.end_time = datetime.now()
-            run_result.add_feature_result(feature_result)
-            self.event_processor.feature_complete(run, feature, feature_result, feature_context)
+            if scenario in scenarios_run:
+                continue
+            scenarios_run.add(scenario)
+            scenario_feature = self.test_catalog_manager.get_feature_for_scenario(scenario)
+            if deadline is not None and time.monotonic() >= deadline:
+                run_result.skipped_scenarios.append(self.get_scenario_reference(scenario_feature, scenario))
+                continue
+            if scenario_feature is not feature:
+                if feature is not None:
+                    feature_results[feature].end_time = datetime.now()
+                    self.event_processor.feature_complete(run, feature, feature_results[feature], feature_context)
+                feature = scenario_feature
+                if feature not in feature_results:
+                    feature_results[feature] = self.create_feature_result(run, feature)
+                    run_result.add_feature_result(feature_results[feature])
+                feature_context = run_context.create_copy()
+                self.event_processor.feature_start(run, feature, feature_context)
+            setup_steps = feature.background.steps if feature.background else []
+            scenario_result = self.run_scenario(run, feature.name, setup_steps, 0, scenario, feature_context,
+                                                feature_source=feature.source)
+            feature_results[feature].add_scenario_result(self.retain_scenario_result(scenario_result))
+        if feature is not None:
+            feature_results[feature].end_time = datetime.now()
+            self.event_processor.feature_complete(run, feature, feature_results[feature], feature_context)
 
         run_result.end_time = datetime.now()
         return run_result
 
-    def run_feature(self, run: Run, feature: Feature, run_context: Context, ) -> FeatureResult:
+    @staticmethod
+    def get_scenario_reference(feature: Optional[Feature], scenario: Scenario) -> ResultNode:
+        return ResultNode(name=scenario.name, source=scenario.source or (feature.source if feature else None),
+                          line_number=scenario.line_number)
+
+    def retain_scenario_result(self, scenario_result: ScenarioResult) -> ScenarioResult:
+        """
+        Gets the scenario result to keep in the result of the run. Passed scenarios are kept without their step results
+        unless configured otherwise, so that long runs do not hold every step result.
+        """
+        if self.config.keep_passed_step_results or not scenario_result.is_successful():
+            return scenario_result
+        return scenario_result.model_copy(update={'step_results': []})
+
+    def create_feature_result(self, run: Run, feature: Feature) -> FeatureResult:
         feature_result = FeatureResult(name=feature.name)
         feature_result.source = feature.source
         feature_result.line_number = feature.line_number
         feature_result.start_time = datetime.now()
+        feature_result.seed = self.get_feature_seed(run, feature.name)
+        return feature_result
+
+    def run_feature(self, run: Run, feature: Feature, run_context: Context, ) -> FeatureResult:
+        feature_result = self.create_feature_result(run, feature)
         feature_result.iterations_count = feature.iterations
 
         feature_context = run_context.create_copy()
@@ -291,14 +546,14 @@ class KartaRuntime:
         self.event_processor.feature_start(run, feature, feature_context)
         for index in range(feature.iterations):
             logger.info('Running feature {} iteration {}'.format(feature.name, index))
-            scenarios = feature.get_next_iteration_scenarios(random=self.random)
+            scenarios = self.get_iteration_scenarios(run, feature, index)
             self.event_processor.feature_iteration_start(run, feature, index, scenarios, feature_context)
             iteration_results = []
             for scenario in scenarios:
                 scenario_result = self.run_scenario(run, feature.name, feature.background.steps, index, scenario,
-                                                    feature_context)
+                                                    feature_context, feature_source=feature.source)
                 iteration_results.append(scenario_result)
-                feature_result.add_scenario_result(scenario_result, index)
+                feature_result.add_scenario_result(self.retain_scenario_result(scenario_result), index)
             self.event_processor.feature_iteration_complete(run, feature, index, iteration_results, feature_context)
 
         feature_result.end_time = datetime.now()
@@ -307,15 +562,16 @@ class KartaRuntime:
         return feature_result
 
     def run_feature_files(self, feature_files: list[str], run_name: str = None,
-                          run_description: str = None) -> RunResult:
+                          run_description: str = None, seed: Optional[int] = None) -> RunResult:
         if not run_name:
             run_name = "Run-" + str(datetime.now())
         if not run_description:
             run_description = run_name
         feature_results = {}
-        run = Run(name=run_name, description=run_description)
-        run_result = RunResult()
+        run = Run(id=generate_run_id(), name=run_name, description=run_description, seed=seed)
+        run_result = RunResult(run_id=run.id, name=run.name)
         run_result.start_time = datetime.now()
+        run_result.seed = self.get_run_seed(run)
         run_context = Context()
 
         self.event_processor.run_start(run, run_context)
@@ -329,26 +585,240 @@ class KartaRuntime:
             feature_results = self.run_feature(run, feature, run_context)
             run_result.add_feature_result(feature_results)
 
+        run_result.end_time = datetime.now()
         self.event_processor.run_complete(run, run_result, run_context)
+        self.save_run_result(run_result)
         return run_result
 
     def filter_with_tags(self, tags: set[str]) -> set[Scenario]:
         return self.test_catalog_manager.filter_with_tags(tags)
 
-    def run_tags(self, tags: set[str], run_name: str = None, run_description: str = None, context=None) -> RunResult:
+    def filter_changed_since(self, git_ref: str) -> set[Scenario]:
+        changed_files = get_changed_files(git_ref)
+        logger.info("Files changed since {}: {}".format(git_ref, changed_files))
+        return self.build_usage_index().get_affected_scenarios(changed_files)
+
+    def load_scenario_history(self) -> ScenarioHistory:
+        history = ScenarioHistory(self.test_catalog_manager.get_feature_for_scenario)
+        if self.config.results_directory:
+            history.load_results_directory(self.config.results_directory)
+        return history
+
+    def shard_scenarios(self, scenarios: set[Scenario], shard_index: int, shard_count: int,
+                        history: Optional[ScenarioHistory] = None) -> set[Scenario]:
+        """
+        Gets the scenarios of a shard from a duration balanced partition of the scenarios
+        :param scenarios: The scenarios to partition
+        :param shard_index: The 1 based index of the shard
+        :param shard_count: The number of shards
+        :param history: The history of saved run results if already loaded for the run
+        :return: The scenarios of the shard
+        """
+        if history is None:
+            history = self.load_scenario_history()
+        shards = partition_scenarios(scenarios, shard_count, lambda scenario: history.estimate_duration(
+            scenario, self.test_catalog_manager.get_feature_for_scenario(scenario)))
+        return set(shards[shard_index - 1])
+
+    def order_scenarios(self, run: Run, scenarios: Iterable[Scenario], ordering: Optional[str] = None,
+                        history: Optional[ScenarioHistory] = None) -> list[Scenario]:
+        """
+        Orders the scenarios of a run with an ordering strategy using the history of saved run results, grouped by
+        feature unless features are configured to interleave
+        :param ordering: The name of the ordering strategy, the configured scenario ordering if None
+        :param history: The history of saved run results if already loaded for the run
+        :return: The ordered scenarios
+        """
+        ordering = ordering or self.config.scenario_ordering
+        if history is None and ordering in HISTORY_FREE_ORDERINGS:
+            history = ScenarioHistory(self.test_catalog_manager.get_feature_for_scenario)
+        elif history is None:
+            history = self.load_scenario_history()
+        ordered_scenarios = order_scenarios(scenarios, ordering, history, lambda scenario: history.estimate_duration(
+            scenario, self.test_catalog_manager.get_feature_for_scenario(scenario)),
+                                            derive_seed(self.get_run_seed(run), 'scenario_ordering'))
+        if self.config.interleave_features:
+            return ordered_scenarios
+        return group_by_feature(ordered_scenarios, self.test_catalog_manager.get_feature_for_scenario)
+
+    def select_within_budget(self, scenarios: Iterable[Scenario], time_budget: float,
+                             history: Optional[ScenarioHistory] = None) -> tuple[list[Scenario], list[Scenario]]:
+        """
+        Selects the scenarios of the most value fitting in a time budget by their historical durations, valuing the
+        configured tag weights and recent failures
+        :param scenarios: The scenarios to select from
+        :param time_budget: The time budget in seconds
+        :param history: The history of saved run results if already loaded for the run
+        :return: The selected and the skipped scenarios
+        """
+        if history is None:
+            history = self.load_scenario_history()
+        tag_weights = self.config.scenario_tag_weights or {}
+        failure_weight = self.config.recent_failure_weight or 0.0
+
+        def estimate_duration(scenario: Scenario) -> float:
+            return history.estimate_duration(scenario, self.test_catalog_manager.get_feature_for_scenario(scenario))
+
+        def get_value(scenario: Scenario) -> float:
+            return get_scenario_value(scenario, self.test_catalog_manager.get_feature_for_scenario(scenario), history,
+                                      tag_weights, failure_weight)
+
+        return select_within_budget(scenarios, time_budget, estimate_duration, get_value)
+
+    def run_tags(self, tags: set[str], run_name: str = None, run_description: str = None, context=None,
+                 seed: Optional[int] = None, shard: Optional[tuple[int, int]] = None,
+                 ordering: Optional[str] = None, time_budget: Optional[float] = None) -> RunResult:
+        return self.run_selected_scenarios(self.filter_with_tags(tags), run_name, run_description, context, seed, tags,
+                                           shard, ordering, time_budget)
+
+    def run_changed_since(self, git_ref: str, run_name: str = None, run_description: str = None, context=None,
+                          seed: Optional[int] = None, shard: Optional[tuple[int, int]] = None,
+                          ordering: Optional[str] = None, time_budget: Optional[float] = None) -> RunResult:
+        return self.run_selected_scenarios(self.filter_changed_since(git_ref), run_name, run_description, context, seed,
+                                           shard=shard, ordering=ordering, time_budget=time_budget)
+
+    def run_selected_scenarios(self, filtered_scenarios: set[Scenario], run_name: str = None,
+                               run_description: str = None, context=None, seed: Optional[int] = None,
+                               tags: set[str] = None, shard: Optional[tuple[int, int]] = None,
+                               ordering: Optional[str] = None, time_budget: Optional[float] = None) -> RunResult:
         if context is None:
             context = Context()
+        ordering = ordering or self.config.scenario_ordering
+        # The history of saved run results is loaded once, only for the selections and orderings using it
+        history = None
+        if shard or time_budget is not None or ordering not in HISTORY_FREE_ORDERINGS:
+            history = self.load_scenario_history()
+        if shard:
+            filtered_scenarios = self.shard_scenarios(filtered_scenarios, *shard, history)
+            logger.info("Running {} scenarios of shard {}/{}".format(len(filtered_scenarios), *shard))
         if not run_name:
             run_name = "Run-" + str(datetime.now())
         if not run_description:
             run_description = run_name
-        filtered_scenarios = self.filter_with_tags(tags)
-        run = Run(name=run_name, description=run_description, tags=tags, scenarios=filtered_scenarios)
+        run = Run(id=generate_run_id(), name=run_name, description=run_description, tags=tags,
+                  scenarios=filtered_scenarios, seed=seed)
+        self.get_run_seed(run)
+        skipped_scenarios = []
+        deadline = None
+        if time_budget is not None:
+            filtered_scenarios, skipped_scenarios = self.select_within_budget(filtered_scenarios, time_budget,
+                                                                              history)
+            logger.info("Running {} scenarios fitting the time budget of {} seconds, skipping {}".format(
+                len(filtered_scenarios), time_budget, len(skipped_scenarios)))
+            deadline = time.monotonic() + time_budget
+        ordered_scenarios = self.order_scenarios(run, filtered_scenarios, ordering, history)
         self.event_processor.run_start(run, context)
-        run_result = self.run_scenarios(run, filtered_scenarios, context)
+        run_result = self.run_scenarios(run, ordered_scenarios, context, deadline)
+        if time_budget is not None:
+            run_result.time_budget = time_budget
+            run_result.skipped_scenarios[:0] = [
+                self.get_scenario_reference(self.test_catalog_manager.get_feature_for_scenario(scenario), scenario)
+                for scenario in skipped_scenarios]
+            for skipped_scenario in run_result.skipped_scenarios:
+                logger.warning("Skipped scenario {} at {}:{} for the time budget".format(
+                    skipped_scenario.name, skipped_scenario.source, skipped_scenario.line_number))
         self.event_processor.run_complete(run, run_result, context)
+        self.save_run_result(run_result)
         return run_result
 
+    def combine_run_results(self, run_ids_or_files: list[str], run_name: str = None) -> RunResult:
+        """
+        Combines the results of the shards of a run into one run result and saves it
+        :param run_ids_or_files: The run ids or result files of the shards
+        :return: The combined run result
+        """
+        run_results = [load_run_result(run_id_or_file, self.config.results_directory) for run_id_or_file in
+                       run_ids_or_files]
+        combined_run_result = combine_run_results(run_results, generate_run_id(), run_name)
+        self.save_run_result(combined_run_result)
+        return combined_run_result
+
+    def save_run_result(self, run_result: RunResult):
+        if self.config.results_directory:
+            result_file = save_run_result(run_result, self.config.results_directory)
+            logger.info("Run result saved to {}".format(result_file))
+
+    def find_scenario(self, source: str, line_number: int, parsed_features: dict[str, Feature],
+                      name: Optional[str] = None) -> Optional[tuple[Feature, Scenario]]:
+        """
+        Resolves the scenario at a source location from the test catalog, parsing the source if it is not cataloged
+        :param source: The feature source file of the scenario
+        :param line_number: The line number of the scenario in the source
+        :param parsed_features: Features already parsed by source, which newly parsed features are added to
+        :param name: The name of the scenario, to tell apart scenarios without line numbers
+        :return: The feature and scenario at the location if found
+        """
+        scenario = self.test_catalog_manager.get_scenario_by_location(source, line_number)
+        if scenario:
+            feature = self.test_catalog_manager.get_feature_for_scenario(scenario)
+            if feature:
+                return feature, scenario
+
+        if not source:
+            return None
+        if source not in parsed_features:
+            feature_file_extn = pathlib.Path(source).suffix
+            if feature_file_extn not in self.parser_map.keys() or not Path(source).is_file():
+                return None
+            parsed_features[source] = self.parser_map[feature_file_extn].parse_feature_file(source)
+        feature = parsed_features[source]
+        scenario = feature.get_scenario_by_line_number(line_number, name)
+        return (feature, scenario) if scenario else None
+
+    def rerun_failed(self, run_id_or_file: str, run_name: str = None, run_description: str = None,
+                     context=None) -> RunResult:
+        """
+        Reruns the failed scenario iterations of a previous run with their seeds and merges the outcome into its result
+        :param run_id_or_file: The run id of a saved result, or the path of a result file or event log
+        :return: The combined result of the previous run and the rerun
+        """
+        if context is None:
+            context = Context()
+        previous_run_result = load_run_result(run_id_or_file, self.config.results_directory)
+        if not run_name:
+            run_name = "Rerun-" + str(previous_run_result.name or run_id_or_file)
+        if not run_description:
+            run_description = run_name
+
+        feature_scenario_results: dict[Feature, list[tuple[Scenario, ScenarioResult]]] = {}
+        parsed_features: dict[str, Feature] = {}
+        for feature_result, scenario_result in get_failed_scenario_results(previous_run_result):
+            source = scenario_result.source or feature_result.source
+            found_scenario = self.find_scenario(source, scenario_result.line_number, parsed_features,
+                                                scenario_result.name)
+            if not found_scenario:
+                logger.warning("Failed scenario {} at {}:{} was not found".format(scenario_result.name, source,
+                                                                                  scenario_result.line_number))
+                continue
+            feature, scenario = found_scenario
+            feature_scenario_results.setdefault(feature, []).append((scenario, scenario_result))
+
+        run = Run(id=generate_run_id(), name=run_name, description=run_description, seed=previous_run_result.seed)
+        run_result = RunResult(run_id=run.id, name=run.name)
+        run_result.start_time = datetime.now()
+        run_result.seed = self.get_run_seed(run)
+        self.event_processor.run_start(run, context)
+        for feature, scenario_results in feature_scenario_results.items():
+            feature_result = self.create_feature_result(run, feature)
+            feature_context = context.create_copy()
+            self.event_processor.feature_start(run, feature, feature_context)
+            setup_steps = feature.background.steps if feature.background else []
+            for scenario, previous_scenario_result in scenario_results:
+                scenario_result = self.run_scenario(run, feature.name, setup_steps,
+                                                    previous_scenario_result.iteration_index, scenario,
+                                                    feature_context, previous_scenario_result.seed, feature.source)
+                feature_result.add_scenario_result(self.retain_scenario_result(scenario_result),
+                                                   scenario_result.iteration_index)
+            feature_result.end_time = datetime.now()
+            run_result.add_feature_result(feature_result)
+            self.event_processor.feature_complete(run, feature, feature_result, feature_context)
+        run_result.end_time = datetime.now()
+
+        merged_run_result = merge_run_results(previous_run_result, run_result)
+        self.event_processor.run_complete(run, merged_run_result, context)
+        self.save_run_result(merged_run_result)
+        return merged_run_result
+
 
 config_file_path = Path('karta_config.yaml')
 karta_config = default_karta_config
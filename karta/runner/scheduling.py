@@ -0,0 +1,328 @@
+import heapq
+import math
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from random import Random
+from typing import Callable, Iterable, Optional
+
+from karta.core.models.test_catalog import Scenario, Feature
+from karta.core.models.test_execution import RunResult
+from karta.runner.results import EVENT_LOG_SUFFIX
+from karta.runner.selection import get_scenario_steps
+
+# Estimated seconds per step when there is no duration history at all
+DEFAULT_STEP_DURATION = 1.0
+
+
+def get_scenario_history_key(source: Optional[str], line_number: Optional[int], name: Optional[str]) -> str:
+    return '{}:{}:{}'.format(os.path.normpath(source) if source else '', line_number or 0, name or '')
+
+
+def get_scenario_sort_key(scenario: Scenario) -> tuple:
+    return scenario.source or '', scenario.line_number or 0, scenario.name or ''
+
+
+class ScenarioHistory:
+    """
+    Durations and failures of scenarios in earlier runs, by scenario source, line number and name. Scenarios without a
+    source, like those of YAML features, are found by the source of their feature.
+    """
+
+    def __init__(self, get_feature: Optional[Callable[[Scenario], Optional[Feature]]] = None):
+        """
+        :param get_feature: Gets the feature of a scenario, to find the history of scenarios without a source
+        """
+        self.get_feature = get_feature
+        self.total_durations: dict[str, float] = {}
+        self.run_counts: dict[str, int] = {}
+        self.result_counts: dict[str, int] = {}
+        self.failure_counts: dict[str, int] = {}
+        self.last_run_times: dict[str, datetime] = {}
+        self.last_failure_times: dict[str, datetime] = {}
+        self.last_failed: dict[str, bool] = {}
+        self.total_step_duration = 0.0
+        self.step_count = 0
+        # Scenario iteration results added, as combined shard results and merged rerun results repeat them
+        self.added_results: set[tuple] = set()
+
+    def get_scenario_key(self, scenario: Scenario) -> str:
+        source = scenario.source
+        if not source and self.get_feature:
+            feature = self.get_feature(scenario)
+            source = feature.source if feature else None
+        return get_scenario_history_key(source, scenario.line_number, scenario.name)
+
+    def add_run_result(self, run_result: RunResult):
+        for feature_result in run_result.feature_results:
+            for scenario_result in feature_result.scenario_results:
+                key = get_scenario_history_key(scenario_result.source or feature_result.source,
+                                               scenario_result.line_number, scenario_result.name)
+                if scenario_result.start_time:
+                    result_key = (key, scenario_result.iteration_index, scenario_result.start_time)
+                    if result_key in self.added_results:
+                        continue
+                    self.added_results.add(result_key)
+                run_time = scenario_result.start_time or run_result.start_time
+                failed = not scenario_result.is_successful()
+                self.result_counts[key] = self.result_counts.get(key, 0) + 1
+                self.failure_counts[key] = self.failure_counts.get(key, 0) + (1 if failed else 0)
+                if run_time:
+                    if key not in self.last_run_times or run_time >= self.last_run_times[key]:
+                        self.last_run_times[key] = run_time
+                        self.last_failed[key] = failed
+                    if failed and (key not in self.last_failure_times or run_time > self.last_failure_times[key]):
+                        self.last_failure_times[key] = run_time
+                if not scenario_result.start_time or not scenario_result.end_time:
+                    continue
+                duration = (scenario_result.end_time - scenario_result.start_time).total_seconds()
+                self.total_durations[key] = self.total_durations.get(key, 0.0) + duration
+                self.run_counts[key] = self.run_counts.get(key, 0) + 1
+                if scenario_result.step_results:
+                    self.total_step_duration += duration
+                    self.step_count += len(scenario_result.step_results)
+
+    def load_results_directory(self, results_directory: str):
+        """
+        Adds the saved run results in the results directory to the history, counting the scenario results repeated in
+        combined and merged results once
+        """
+        results_path = Path(results_directory)
+        if not results_path.is_dir():
+            return
+        for result_file in sorted(results_path.glob('*.json')):
+            if result_file.name.endswith(EVENT_LOG_SUFFIX):
+                continue
+            try:
+                self.add_run_result(RunResult.model_validate_json(result_file.read_text(encoding='utf-8')))
+            except ValueError:
+                # Skip files which are not run results
+                continue
+
+    def get_duration(self, scenario: Scenario) -> Optional[float]:
+        key = self.get_scenario_key(scenario)
+        if key not in self.run_counts:
+            return None
+        return self.total_durations[key] / self.run_counts[key]
+
+    def get_failure_rate(self, scenario: Scenario) -> float:
+        key = self.get_scenario_key(scenario)
+        result_count = self.result_counts.get(key, 0)
+        return self.failure_counts.get(key, 0) / result_count if result_count else 0.0
+
+    def get_last_failure_time(self, scenario: Scenario) -> Optional[datetime]:
+        return self.last_failure_times.get(self.get_scenario_key(scenario), None)
+
+    def has_failed_last(self, scenario: Scenario) -> bool:
+        return self.last_failed.get(self.get_scenario_key(scenario), False)
+
+    def get_step_duration(self) -> float:
+        return self.total_step_duration / self.step_count if self.step_count else DEFAULT_STEP_DURATION
+
+    def estimate_duration(self, scenario: Scenario, feature: Optional[Feature]) -> float:
+        """
+        Estimates the duration of a scenario from its history, or from its number of steps if it has no history
+        """
+        duration = self.get_duration(scenario)
+        if duration is not None:
+            return duration
+        steps = get_scenario_steps(feature, scenario) if feature else scenario.steps
+        return sum(1 for _ in steps) * self.get_step_duration()
+
+
+def partition_scenarios(scenarios: Iterable[Scenario], shard_count: int,
+                        estimate_duration: Callable[[Scenario], float]) -> list[list[Scenario]]:
+    """
+    Partitions scenarios into shards of balanced total durations with longest processing time first bin packing.
+    The partition is deterministic so that every shard computes the same one independently.
+    :param scenarios: The scenarios to partition
+    :param shard_count: The number of shards
+    :param estimate_duration: Estimates the duration of a scenario
+    :return: The scenarios of each shard
+    """
+    if shard_count <= 0:
+        raise ValueError("Shard count must be a positive integer.")
+    estimated_scenarios = sorted(((estimate_duration(scenario), scenario) for scenario in scenarios),
+                                 key=lambda estimated_scenario: (-estimated_scenario[0],
+                                                                 get_scenario_sort_key(estimated_scenario[1])))
+    shards: list[list[Scenario]] = [[] for _ in range(shard_count)]
+    # Least loaded shard first, ties broken by the shard index
+    shard_loads = [(0.0, shard_index) for shard_index in range(shard_count)]
+    for duration, scenario in estimated_scenarios:
+        shard_load, shard_index = heapq.heappop(shard_loads)
+        shards[shard_index].append(scenario)
+        heapq.heappush(shard_loads, (shard_load + duration, shard_index))
+    return shards
+
+
+def order_by_location(scenarios: Iterable[Scenario], history: ScenarioHistory,
+                      estimate_duration: Callable[[Scenario], float], seed: int) -> list[Scenario]:
+    return sorted(scenarios, key=get_scenario_sort_key)
+
+
+def order_recently_failed_first(scenarios: Iterable[Scenario], history: ScenarioHistory,
+                                estimate_duration: Callable[[Scenario], float], seed: int) -> list[Scenario]:
+    # Scenarios failing in their last run first, then the ones failing most recently and most often
+    def get_sort_key(scenario: Scenario) -> tuple:
+        last_failure_time = history.get_last_failure_time(scenario)
+        return (not history.has_failed_last(scenario), -last_failure_time.timestamp() if last_failure_time else 0.0,
+                -history.get_failure_rate(scenario), get_scenario_sort_key(scenario))
+
+    return sorted(scenarios, key=get_sort_key)
+
+
+def order_fastest_first(scenarios: Iterable[Scenario], history: ScenarioHistory,
+                        estimate_duration: Callable[[Scenario], float], seed: int) -> list[Scenario]:
+    return sorted(scenarios, key=lambda scenario: (estimate_duration(scenario), get_scenario_sort_key(scenario)))
+
+
+def order_longest_first(scenarios: Iterable[Scenario], history: ScenarioHistory,
+                        estimate_duration: Callable[[Scenario], float], seed: int) -> list[Scenario]:
+    return sorted(scenarios, key=lambda scenario: (-estimate_duration(scenario), get_scenario_sort_key(scenario)))
+
+
+def order_randomly(scenarios: Iterable[Scenario], history: ScenarioHistory,
+                   estimate_duration: Callable[[Scenario], float], seed: int) -> list[Scenario]:
+    ordered_scenarios = sorted(scenarios, key=get_scenario_sort_key)
+    Random(seed).shuffle(ordered_scenarios)
+    return ordered_scenarios
+
+
+# Scenario ordering strategies by name, more strategies can be registered here
+scenario_orderings: dict[str, Callable[[Iterable[Scenario], ScenarioHistory, Callable[[Scenario], float], int],
+                                       list[Scenario]]] = {
+    'location': order_by_location,
+    'recently_failed': order_recently_failed_first,
+    'fastest': order_fastest_first,
+    'longest': order_longest_first,
+    'random': order_randomly,
+}
+# Scenario orderings not using the history of earlier runs, which is not loaded for them
+HISTORY_FREE_ORDERINGS = {'location', 'random'}
+
+
+def group_by_feature(ordered_scenarios: Iterable[Scenario],
+                     get_feature: Callable[[Scenario], Optional[Feature]]) -> list[Scenario]:
+    """
+    Groups ordered scenarios by their feature so that every feature runs once. Features are ordered by their first
+    scenario, and the scenarios of a feature keep their order.
+    """
+    feature_scenarios: dict[Optional[Feature], list[Scenario]] = {}
+    for scenario in ordered_scenarios:
+        feature_scenarios.setdefault(get_feature(scenario), []).append(scenario)
+    return [scenario for scenarios in feature_scenarios.values() for scenario in scenarios]
+
+
+def order_scenarios(scenarios: Iterable[Scenario], ordering: str, history: ScenarioHistory,
+                    estimate_duration: Callable[[Scenario], float], seed: int) -> list[Scenario]:
+    """
+    Orders scenarios with a named ordering strategy
+    :param scenarios: The scenarios to order
+    :param ordering: The name of the ordering strategy in scenario_orderings
+    :param history: The history of earlier runs
+    :param estimate_duration: Estimates the duration of a scenario
+    :param seed: The seed of random orderings
+    :return: The ordered scenarios
+    """
+    if ordering not in scenario_orderings:
+        raise ValueError("Unknown scenario ordering {}, available orderings are {}".format(
+            ordering, ', '.join(scenario_orderings.keys())))
+    return scenario_orderings[ordering](scenarios, history, estimate_duration, seed)
+
+
+# Number of duration units the budget is divided into for the knapsack selection of scenarios
+TIME_BUDGET_RESOLUTION = 1000
+# Largest number of knapsack cells computed before falling back to selecting scenarios by value per second
+MAX_KNAPSACK_CELLS = 2_000_000
+
+
+def get_scenario_value(scenario: Scenario, feature: Optional[Feature], history: ScenarioHistory,
+                       tag_weights: dict[str, float], failure_weight: float) -> float:
+    """
+    Gets the value of running a scenario, one for its coverage plus the weights of its tags and its recent failures
+    """
+    tags = set(scenario.tags or ()) | set(feature.tags or () if feature else ())
+    failure_value = history.get_failure_rate(scenario) + (1.0 if history.has_failed_last(scenario) else 0.0)
+    return 1.0 + sum(tag_weights.get(tag, 0.0) for tag in tags) + failure_weight * failure_value
+
+
+def select_within_budget(scenarios: Iterable[Scenario], time_budget: float,
+                         estimate_duration: Callable[[Scenario], float],
+                         get_value: Callable[[Scenario], float]) -> tuple[list[Scenario], list[Scenario]]:
+    """
+    Selects the scenarios of the most total value with total estimated duration within the time budget, with a 0/1
+    knapsack over durations rounded up to a fraction of the budget. Falls back to taking the scenarios of the most
+    value per second first when there are too many scenarios for the knapsack.
+    :param scenarios: The scenarios to select from
+    :param time_budget: The time budget in seconds
+    :param estimate_duration: Estimates the duration of a scenario
+    :param get_value: Gets the value of running a scenario
+    :return: The selected scenarios and the skipped scenarios, each in location order
+    """
+    scenarios = sorted(scenarios, key=get_scenario_sort_key)
+    durations = [max(estimate_duration(scenario), 0.0) for scenario in scenarios]
+    values = [get_value(scenario) for scenario in scenarios]
+    duration_unit = time_budget / TIME_BUDGET_RESOLUTION if time_budget > 0 else 1.0
+    weights = [math.ceil(duration / duration_unit - 1e-9) for duration in durations]
+    capacity = TIME_BUDGET_RESOLUTION if time_budget > 0 else 0
+    candidate_indexes = [index for index, weight in enumerate(weights) if weight <= capacity]
+
+    if len(candidate_indexes) * (capacity + 1) <= MAX_KNAPSACK_CELLS:
+        best_values = [0.0] * (capacity + 1)
+        # Whether each candidate is taken for each remaining capacity, to trace back the selection
+        taken: list[bytearray] = []
+        for index in candidate_indexes:
+            weight, value = weights[index], values[index]
+            taken_at_capacity = bytearray(capacity + 1)
+            for remaining_capacity in range(capacity, weight - 1, -1):
+                candidate_value = best_values[remaining_capacity - weight] + value
+                if candidate_value > best_values[remaining_capacity]:
+                    best_values[remaining_capacity] = candidate_value
+                    taken_at_capacity[remaining_capacity] = 1
+            taken.append(taken_at_capacity)
+        selected_indexes = set()
+        remaining_capacity = capacity
+        for candidate_position in range(len(candidate_indexes) - 1, -1, -1):
+            if taken[candidate_position][remaining_capacity]:
+                index = candidate_indexes[candidate_position]
+                selected_indexes.add(index)
+                remaining_capacity -= weights[index]
+    else:
+        selected_indexes = set()
+        remaining_duration = time_budget
+        for index in sorted(candidate_indexes, key=lambda index: -values[index] / max(durations[index], 1e-9)):
+            if durations[index] <= remaining_duration:
+                selected_indexes.add(index)
+                remaining_duration -= durations[index]
+
+    selected_scenarios = [scenario for index, scenario in enumerate(scenarios) if index in selected_indexes]
+    skipped_scenarios = [scenario for index, scenario in enumerate(scenarios) if index not in selected_indexes]
+    return selected_scenarios, skipped_scenarios
+
+
+def parse_time_budget(time_budget: str) -> float:
+    """
+    Parses a time budget like 45m, 1h30m, 90s or 600 (seconds) into seconds
+    """
+    time_budget = time_budget.strip().lower()
+    if re.fullmatch(r'\d+(\.\d+)?', time_budget):
+        return float(time_budget)
+    parts = re.findall(r'(\d+(?:\.\d+)?)([hms])', time_budget)
+    if not parts or ''.join(number + unit for number, unit in parts) != time_budget:
+        raise ValueError("Time budget must be like 45m, 1h30m, 90s or a number of seconds, got " + time_budget)
+    unit_seconds = {'h': 3600.0, 'm': 60.0, 's': 1.0}
+    return sum(float(number) * unit_seconds[unit] for number, unit in parts)
+
+
+def parse_shard(shard: str) -> tuple[int, int]:
+    """
+    Parses a shard specification i/N into the 1 based shard index and the shard count
+    """
+    try:
+        shard_index, shard_count = (int(part) for part in shard.split('/'))
+    except ValueError:
+        raise ValueError("Shard must be in the format i/N, got " + shard)
+    if not 1 <= shard_index <= shard_count:
+        raise ValueError("Shard index must be between 1 and the shard count, got " + shard)
+    return shard_index, shard_count
@@ -0,0 +1,192 @@
+import ast
+import itertools
+import os
+import subprocess
+from pathlib import Path
+from typing import Callable, Optional, Iterable
+
+from karta.core.models.test_catalog import Feature, Scenario, Step
+
+
+def normalize_path(path: str) -> str:
+    return os.path.normcase(str(Path(path).resolve()))
+
+
+def get_step_definition_key(function: Callable) -> tuple[str, str]:
+    """
+    Gets the (module file, function name) key of a step definition function
+    """
+    function = getattr(function, '__wrapped__', function)
+    return normalize_path(function.__code__.co_filename), function.__qualname__
+
+
+def get_all_steps(steps: Optional[list[Step]]) -> Iterable[Step]:
+    for step in steps or []:
+        yield step
+        yield from get_all_steps(step.steps)
+
+
+def get_scenario_steps(feature: Feature, scenario: Scenario) -> Iterable[Step]:
+    background_steps = feature.background.steps if feature.background else []
+    return get_all_steps(list(itertools.chain(background_steps, scenario.setup_steps or [], scenario.steps,
+                                              scenario.teardown_steps or [])))
+
+
+def get_module_names(python_file: Path, source_directory: Path) -> list[str]:
+    """
+    Gets the names a python file in a source directory can be imported with, its stem and dotted package path
+    """
+    relative_parts = list(python_file.relative_to(source_directory.parent).with_suffix('').parts)
+    if relative_parts[-1] == '__init__':
+        relative_parts = relative_parts[:-1]
+    return ['.'.join(relative_parts), python_file.stem]
+
+
+def get_imported_module_names(python_file: Path, package_name: str) -> set[str]:
+    """
+    Gets the names of the modules imported by a python file, relative imports resolved against its package
+    """
+    imported_module_names = set()
+    tree = ast.parse(python_file.read_text(encoding='utf-8'), filename=str(python_file))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imported_module_names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base_parts = package_name.split('.')[:len(package_name.split('.')) - node.level + 1]
+                base_module_name = '.'.join(base_parts + ([node.module] if node.module else []))
+            else:
+                base_module_name = node.module
+            imported_module_names.add(base_module_name)
+            # Imported names may be modules of the package too
+            imported_module_names.update(base_module_name + '.' + alias.name for alias in node.names)
+    # Importing a module imports its parent packages too
+    for imported_module_name in list(imported_module_names):
+        module_name_parts = imported_module_name.split('.')
+        imported_module_names.update('.'.join(module_name_parts[:index]) for index in range(1, len(module_name_parts)))
+    return imported_module_names
+
+
+class ScenarioUsageIndex:
+    """
+    Index of the catalog scenarios using each step definition and feature file, for selecting the scenarios affected
+    by changed files.
+    """
+
+    def __init__(self):
+        self.step_definition_scenarios: dict[tuple[str, str], set[Scenario]] = {}
+        self.module_file_scenarios: dict[str, set[Scenario]] = {}
+        self.feature_file_scenarios: dict[str, set[Scenario]] = {}
+        self.unresolved_scenarios: set[Scenario] = set()
+        self.all_scenarios: set[Scenario] = set()
+        # Importing module files of each module file in the source directories
+        self.module_file_importers: dict[str, set[str]] = {}
+        self.module_files: set[str] = set()
+        self.step_definition_module_files: set[str] = set()
+
+    def add_features(self, features: Iterable[Feature], resolve_step: Callable[[str], Optional[Callable]]):
+        """
+        Adds the scenarios of the features to the index
+        :param features: The features to index
+        :param resolve_step: Resolves a step text to its step definition function, None if the step is not available
+        """
+        resolved_steps: dict[str, Optional[tuple[str, str]]] = {}
+        for feature in features:
+            for scenario in feature.scenarios:
+                self.all_scenarios.add(scenario)
+                if feature.source:
+                    self.feature_file_scenarios.setdefault(normalize_path(feature.source), set()).add(scenario)
+                for step in get_scenario_steps(feature, scenario):
+                    if not step.identifier:
+                        continue
+                    step_text = step.identifier.strip()
+                    if step_text not in resolved_steps:
+                        step_function = resolve_step(step_text)
+                        resolved_steps[step_text] = get_step_definition_key(step_function) if step_function else None
+                    step_definition_key = resolved_steps[step_text]
+                    if step_definition_key is None:
+                        self.unresolved_scenarios.add(scenario)
+                        continue
+                    self.step_definition_scenarios.setdefault(step_definition_key, set()).add(scenario)
+                    self.module_file_scenarios.setdefault(step_definition_key[0], set()).add(scenario)
+                    self.step_definition_module_files.add(step_definition_key[0])
+
+    def add_step_definitions(self, step_functions: Iterable[Callable]):
+        """
+        Registers the module files defining step definitions, including the ones not used by any scenario
+        """
+        self.step_definition_module_files.update(get_step_definition_key(step_function)[0]
+                                                 for step_function in step_functions)
+
+    def add_source_directories(self, source_directories: Iterable[str]):
+        """
+        Builds the import graph of the python modules in the source directories
+        """
+        module_name_files: dict[str, str] = {}
+        module_file_imports: dict[str, set[str]] = {}
+        for source_directory in {Path(directory).resolve() for directory in source_directories}:
+            for python_file in source_directory.rglob('*.py'):
+                module_file = normalize_path(str(python_file))
+                self.module_files.add(module_file)
+                module_names = get_module_names(python_file, source_directory)
+                for module_name in module_names:
+                    module_name_files.setdefault(module_name, module_file)
+                package_name = module_names[0] if python_file.stem == '__init__' else module_names[0].rpartition('.')[
+                    0]
+                module_file_imports[module_file] = get_imported_module_names(python_file, package_name)
+
+        for module_file, imported_module_names in module_file_imports.items():
+            for imported_module_name in imported_module_names:
+                imported_module_file = module_name_files.get(imported_module_name, None)
+                if imported_module_file and imported_module_file != module_file:
+                    self.module_file_importers.setdefault(imported_module_file, set()).add(module_file)
+
+    def get_dependent_module_files(self, module_file: str) -> set[str]:
+        """
+        Gets the module file and all module files importing it directly or transitively
+        """
+        dependent_module_files = {module_file}
+        pending_module_files = [module_file]
+        while pending_module_files:
+            for importer in self.module_file_importers.get(pending_module_files.pop(), ()):
+                if importer not in dependent_module_files:
+                    dependent_module_files.add(importer)
+                    pending_module_files.append(importer)
+        return dependent_module_files
+
+    def get_affected_scenarios(self, changed_files: Iterable[str]) -> set[Scenario]:
+        """
+        Gets the scenarios affected by the changed files.
+        A changed module reaching a module which is not imported by others and has no step definitions (like hooks) may
+        affect any scenario and selects all of them.
+        Scenarios with steps not resolving to a step definition are selected when any module changes.
+        """
+        affected_scenarios = set()
+        for changed_file in map(normalize_path, changed_files):
+            affected_scenarios.update(self.feature_file_scenarios.get(changed_file, ()))
+            if changed_file not in self.module_files:
+                continue
+            for module_file in self.get_dependent_module_files(changed_file):
+                if module_file in self.step_definition_module_files:
+                    affected_scenarios.update(self.module_file_scenarios.get(module_file, ()))
+                elif not self.module_file_importers.get(module_file, None):
+                    return set(self.all_scenarios)
+            affected_scenarios.update(self.unresolved_scenarios)
+        return affected_scenarios
+
+
+def get_changed_files(git_ref: str) -> list[str]:
+    """
+    Gets the files changed in the working tree since a git reference, including untracked files
+    :param git_ref: The git reference to compare with
+    :return: The absolute paths of the changed files
+    """
+    repository_root = subprocess.run(['git', 'rev-parse', '--show-toplevel'], capture_output=True, text=True,
+                                     check=True).stdout.strip()
+    changed_files = subprocess.run(['git', 'diff', '--name-only', git_ref, '--'], capture_output=True, text=True,
+                                   check=True, cwd=repository_root).stdout.splitlines()
+    untracked_files = subprocess.run(['git', 'ls-files', '--others', '--exclude-standard'], capture_output=True,
+                                     text=True, check=True, cwd=repository_root).stdout.splitlines()
+    return [str(Path(repository_root, changed_file)) for changed_file in itertools.chain(changed_files,
+                                                                                         untracked_files)
+            if changed_file]
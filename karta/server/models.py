@@ -49,6 +49,19 @@ class StepRunInfo(RunInfo):
     feature_name: Optional[str] = None
     iteration_index: Optional[int] = 0
     scenario_name: Optional[str] = None
+    # Data generated by the caller for the step, generated from the step data rules if not passed
+    step_data: Optional[dict] = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+
+class StepsRunInfo(RunInfo):
+    steps: list[Step]
+    feature_name: Optional[str] = None
+    iteration_index: Optional[int] = 0
+    scenario_name: Optional[str] = None
+    step_data: Optional[list[Optional[dict]]] = None
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -6,10 +6,10 @@ from fastapi import FastAPI
 from starlette.responses import FileResponse
 
 from karta.core.models.generic import Context
-from karta.core.models.test_catalog import Feature, Scenario
+from karta.core.models.test_catalog import Feature, Scenario, Step
 from karta.core.models.test_execution import StepResult, Run, FeatureResult, RunResult
 from karta.runner.runtime import karta_runtime
-from karta.server.models import FeatureRunInfo, FeatureSourceRunInfo, StepRunInfo, TagRunInfo
+from karta.server.models import FeatureRunInfo, FeatureSourceRunInfo, StepRunInfo, StepsRunInfo, TagRunInfo
 
 app = FastAPI(
     title="Karta.py",
@@ -106,6 +106,15 @@ async def run_start(context: dict):
     run_contexts[run.name] = context
 
 
+def get_step_error_result(step: Step, start_time: datetime, error: Exception) -> StepResult:
+    step_result = StepResult(name=step.identifier)
+    step_result.start_time = start_time
+    step_result.successful = False
+    step_result.error = str(error) + "\n" + traceback.format_exc()
+    step_result.end_time = datetime.now()
+    return step_result
+
+
 @app.post("/run_step")
 async def run_step_api(step_run_info: StepRunInfo) -> StepResult:
     context = Context(step_run_info.context) if step_run_info.context else Context()
@@ -123,14 +132,38 @@ async def run_step_api(step_run_info: StepRunInfo) -> StepResult:
     run.description = step_run_info.description
 
     try:
-        return karta_runtime.run_step(run, feature_name, iteration_index, scenario_name, step, context)
+        return karta_runtime.run_step(run, feature_name, iteration_index, scenario_name, step, context,
+                                      step_data=step_run_info.step_data)
     except Exception as e:
-        step_result = StepResult(name=step.identifier)
-        step_result.start_time = start_time
-        step_result.successful = False
-        step_result.error = str(e) + "\n" + traceback.format_exc()
-        step_result.end_time = datetime.now()
-        return step_result
+        return get_step_error_result(step, start_time, e)
+
+
+@app.post("/run_steps")
+async def run_steps_api(steps_run_info: StepsRunInfo) -> list[StepResult]:
+    """
+    Runs consecutive steps sharing one context in a single request, stopping at the first failed step
+    """
+    context = Context(steps_run_info.context) if steps_run_info.context else Context()
+    if not context.data:
+        context.data = {}
+
+    run = Run()
+    run.name = steps_run_info.name
+    run.description = steps_run_info.description
+
+    step_results = []
+    for step_index, step in enumerate(steps_run_info.steps):
+        step_data = steps_run_info.step_data[step_index] if steps_run_info.step_data else None
+        start_time = datetime.now()
+        try:
+            step_result = karta_runtime.run_step(run, steps_run_info.feature_name, steps_run_info.iteration_index,
+                                                 steps_run_info.scenario_name, step, context, step_data=step_data)
+        except Exception as e:
+            step_result = get_step_error_result(step, start_time, e)
+        step_results.append(step_result)
+        if not step_result.is_successful():
+            break
+    return step_results
 
 
 @app.get("/list_scenarios")
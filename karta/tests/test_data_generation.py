@@ -0,0 +1,144 @@
+from random import Random
+
+from karta.core.models.test_catalog import Feature, Scenario, IterationPolicy
+from karta.core.models.testdata import IntegerRangeValue, FloatRangeValue, RandomStringValue, \
+    OneSelectedFromListValue, SomeSelectedFromListValue, ProbabilityMapOneValue, ProbabilityMapSomeValue, \
+    GeneratedObjectValue, ListDataValue, BatchedDataGenerator, RANDOM_STRING_CHARACTERS
+from karta.core.utils.randomization_utils import generate_next_mutex_composition_from_probability_map, \
+    MutexCompositionSampler, derive_seed, derive_random
+
+
+def get_sample_data_rules() -> GeneratedObjectValue:
+    return GeneratedObjectValue(fields_dict={
+        'constant': 'value',
+        'int_value': IntegerRangeValue(min=1, max=10),
+        'float_value': FloatRangeValue(min=1.0, max=10.0),
+        'string_value': RandomStringValue(length=8),
+        'one_from_list': OneSelectedFromListValue(values=['a', 'b', IntegerRangeValue(min=100, max=200)]),
+        'some_from_list': SomeSelectedFromListValue(values=['a', 'b', 'c', 'd']),
+        'one_from_map': ProbabilityMapOneValue(probability_map={'x': 0.1, 'y': 0.2, 'z': 0.7}),
+        'some_from_map': ProbabilityMapSomeValue(probability_map={'p': 0.5, 'q': 1.0}),
+        'nested': GeneratedObjectValue(fields_dict={
+            'list_value': ListDataValue(values=[1, RandomStringValue(length=3)]),
+        }),
+    })
+
+
+def test_batch_generation_is_reproducible():
+    data_rules = get_sample_data_rules()
+    first_batch = data_rules.generate_next_values(Random(7), 50)
+    second_batch = data_rules.generate_next_values(Random(7), 50)
+    assert first_batch == second_batch
+    assert first_batch != data_rules.generate_next_values(Random(8), 50)
+
+
+def test_batch_generation_values():
+    values = get_sample_data_rules().generate_next_values(Random(1), 1000)
+    assert len(values) == 1000
+    for value in values:
+        assert value['constant'] == 'value'
+        assert 1 <= value['int_value'] <= 10 and isinstance(value['int_value'], int)
+        assert 1.0 <= value['float_value'] <= 10.0
+        assert len(value['string_value']) == 8 and all(c in RANDOM_STRING_CHARACTERS for c in value['string_value'])
+        assert value['one_from_list'] in ('a', 'b') or 100 <= value['one_from_list'] <= 200
+        assert 1 <= len(value['some_from_list']) <= 4 and len(set(value['some_from_list'])) == len(
+            value['some_from_list'])
+        assert value['one_from_map'] in ('x', 'y', 'z')
+        assert 'q' in value['some_from_map']
+        assert value['nested']['list_value'][0] == 1 and len(value['nested']['list_value'][1]) == 3
+
+    z_ratio = sum(1 for value in values if value['one_from_map'] == 'z') / len(values)
+    assert 0.6 < z_ratio < 0.8
+
+
+def test_batched_data_generator():
+    data_rules = get_sample_data_rules()
+    generator = BatchedDataGenerator(data_rules, 3, batch_size=10)
+    generated_values = [generator.generate_next_value() for _ in range(25)]
+    expected_values = [value for batch_index in range(3) for value in generator.generate_batch(batch_index)]
+    assert generated_values == expected_values[:25]
+    assert generated_values[17] == BatchedDataGenerator(data_rules, 3, batch_size=10).generate_value_at(17)
+    assert generated_values != [BatchedDataGenerator(data_rules, 4, batch_size=10).generate_next_value() for _ in
+                                range(25)]
+
+
+def test_derived_seeds():
+    assert derive_seed(1, 'feature', 'iteration', 5) == derive_seed(1, 'feature', 'iteration', 5)
+    assert derive_seed(1, 'feature', 'iteration', 5) != derive_seed(1, 'feature', 'iteration', 6)
+    assert derive_seed(1, 'feature') != derive_seed(2, 'feature')
+    assert derive_random(1, 'a').random() == derive_random(1, 'a').random()
+
+
+def test_compiled_generation_matches_interpreted():
+    data_rules = get_sample_data_rules()
+    compiled_generator = data_rules.compile()
+    assert data_rules.compile() is compiled_generator
+    compiled_random, interpreted_random = Random(13), Random(13)
+    for _ in range(500):
+        assert compiled_generator(compiled_random) == data_rules.generate_next_value(interpreted_random)
+
+    static_rules = GeneratedObjectValue(fields_dict={'constant': 'value', 'list': ListDataValue(values=[1, 2])})
+    static_generator = static_rules.compile()
+    first_value, second_value = static_generator(Random(1)), static_generator(Random(2))
+    assert first_value == second_value == {'constant': 'value', 'list': [1, 2]}
+    assert first_value is not second_value and first_value['list'] is not second_value['list']
+
+
+def test_mutex_sampler_matches_linear_scan():
+    probability_map = {'value1': 0.1, 'value2': 0.2, 'value3': 0.3, 'value4': 0.4}
+    sampler = MutexCompositionSampler.from_probability_map(probability_map)
+    sampler_random, linear_scan_random = Random(11), Random(11)
+    for _ in range(1000):
+        assert sampler.generate_next(sampler_random) == generate_next_mutex_composition_from_probability_map(
+            probability_map, linear_scan_random)
+
+
+def test_probability_maps_are_validated_on_creation():
+    for data_value_class in (ProbabilityMapOneValue, ProbabilityMapSomeValue):
+        try:
+            data_value_class(probability_map={'x': 1.5})
+            assert False, "Invalid probability map was not rejected"
+        except SyntaxError:
+            pass
+
+    try:
+        ProbabilityMapOneValue(probability_map={'x': 0.3, 'y': 0.3})
+        assert False, "Probability map not totalling 1 was not rejected"
+    except SyntaxError:
+        pass
+
+
+def test_feature_iteration_sampling():
+    scenarios = [Scenario(name='scenario1', steps=[], probability=0.4, line_number=10),
+                 Scenario(name='scenario2', steps=[], probability=0.6, line_number=20)]
+    feature = Feature(name='feature', scenarios=scenarios, iteration_policy=IterationPolicy.ONE_PER_ITERATION)
+    random = Random(5)
+    picked_names = [feature.get_next_iteration_scenarios(random)[0].name for _ in range(1000)]
+    assert 300 < picked_names.count('scenario1') < 500
+
+    feature = Feature(name='feature', scenarios=scenarios)
+    assert [scenario.name for scenario in feature.get_next_iteration_scenarios(random)] == ['scenario1',
+                                                                                           'scenario2']
+
+    try:
+        Feature(name='feature', scenarios=scenarios[:1], iteration_policy=IterationPolicy.ONE_PER_ITERATION)
+        assert False, "Scenario probabilities not totalling 1 were not rejected"
+    except SyntaxError:
+        pass
+
+
+def main():
+    test_batch_generation_is_reproducible()
+    test_batch_generation_values()
+    test_batched_data_generator()
+    test_derived_seeds()
+    test_compiled_generation_matches_interpreted()
+    test_mutex_sampler_matches_linear_scan()
+    test_probability_maps_are_validated_on_creation()
+    test_feature_iteration_sampling()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
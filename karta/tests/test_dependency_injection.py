@@ -0,0 +1,70 @@
+from karta.plugins.dependency_injector import Inject, KartaDependencyInjector, get_injection_plan, \
+    get_instance_injection_fields
+
+
+class Fixture:
+    config = Inject()
+    browser_pool: object = Inject('pool')
+    missing = Inject()
+
+    def __init__(self):
+        self.post_inject_count = 0
+        self.local = Inject('config')
+
+    def __post_inject__(self):
+        self.post_inject_count += 1
+
+
+def test_injection_plan_cached():
+    injection_plan = get_injection_plan(Fixture)
+    assert get_injection_plan(Fixture) is injection_plan
+    assert injection_plan.fields == [('config', 'config'), ('browser_pool', 'pool'), ('missing', 'missing')]
+    assert injection_plan.post_inject is Fixture.__dict__['__post_inject__']
+
+
+def test_batch_injection():
+    dependency_injector = KartaDependencyInjector()
+    dependency_injector.register('config', {'browser': 'chrome'})
+    dependency_injector.register('pool', 'browser pool')
+
+    fixtures = [Fixture() for _ in range(3)]
+    assert dependency_injector.inject_all(fixtures)
+    for fixture in fixtures:
+        assert fixture.config == {'browser': 'chrome'} and fixture.browser_pool == 'browser pool'
+        assert fixture.local is fixture.config
+        assert isinstance(fixture.missing, Inject)
+        assert fixture.post_inject_count == 1
+
+    dependency_injector.inject(fixtures[0], 'builtin values are skipped')
+    assert fixtures[0].post_inject_count == 2
+
+
+def test_instance_injection_fields_cached():
+    dependency_injector = KartaDependencyInjector()
+    dependency_injector.register('config', {'browser': 'chrome'})
+    fixture = Fixture()
+    fixture.late = Inject('late_object')
+
+    dependency_injector.inject(fixture)
+    instance_fields = get_instance_injection_fields(fixture)
+    assert instance_fields == [('local', 'config'), ('late', 'late_object')]
+    assert fixture.local == {'browser': 'chrome'} and isinstance(fixture.late, Inject)
+
+    # The recorded fields are injected again without looking through the object, once their object is registered
+    dependency_injector.register('late_object', 'late value')
+    dependency_injector.inject(fixture)
+    assert fixture.late == 'late value'
+    assert get_instance_injection_fields(fixture) is instance_fields
+    assert get_instance_injection_fields('builtin value') == []
+
+
+def main():
+    test_injection_plan_cached()
+    test_batch_injection()
+    test_instance_injection_fields_cached()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+from karta.core.models.test_execution import ScenarioResult
+from karta.runner.distributed import Coordinator
+
+
+def get_sample_coordinator(item_count: int) -> Coordinator:
+    work_items = [{'id': item_id, 'feature': 'feature', 'scenario': 'scenario' + str(item_id),
+                   'source': 'features/sample.feature', 'line_number': item_id, 'iteration_index': 0} for item_id in
+                  range(item_count)]
+    return Coordinator({'id': 'run', 'name': 'run', 'seed': 1}, work_items, heartbeat_timeout=10.0)
+
+
+def test_lease_and_steal():
+    coordinator = get_sample_coordinator(4)
+    assert [item['id'] for item in coordinator.lease('worker1', 4)] == [0, 1, 2, 3]
+    assert coordinator.start('worker1', 0)
+
+    # Idle worker steals the latest half of the not started leases
+    assert [item['id'] for item in coordinator.lease('worker2', 4)] == [2, 3]
+    assert not coordinator.start('worker1', 3)
+    assert coordinator.start('worker2', 3)
+    assert coordinator.start('worker1', 1)
+
+    assert [item['id'] for item in coordinator.lease('worker3', 4)] == [2]
+    assert coordinator.start('worker3', 2)
+
+    # Nothing left to steal which is not started
+    assert coordinator.lease('worker1', 4) == []
+
+
+def test_complete_keeps_first_result():
+    coordinator = get_sample_coordinator(2)
+    coordinator.lease('worker1', 2)
+    assert coordinator.complete('worker1', 0, ScenarioResult(name='scenario0'))
+    assert not coordinator.complete('worker2', 0, ScenarioResult(name='duplicate'))
+    assert coordinator.results[0].name == 'scenario0'
+    assert not coordinator.is_complete()
+    assert coordinator.complete('worker1', 1, ScenarioResult(name='scenario1'))
+    assert coordinator.is_complete()
+    assert coordinator.get_status()['completed'] == 2
+
+
+def test_requeue_dead_workers():
+    coordinator = get_sample_coordinator(3)
+    coordinator.heartbeat('worker1', now=0.0)
+    coordinator.heartbeat('worker2', now=0.0)
+    coordinator.lease('worker1', 2)
+    coordinator.heartbeat('worker1', now=0.0)
+    coordinator.heartbeat('worker2', now=8.0)
+
+    assert coordinator.requeue_dead_workers(now=12.0) == ['worker1']
+    assert list(coordinator.pending_item_ids) == [1, 0, 2]
+    assert not coordinator.start('worker1', 0)
+    assert [item['id'] for item in coordinator.lease('worker2', 1)] == [1]
+
+
+def main():
+    test_lease_and_steal()
+    test_complete_keeps_first_result()
+    test_requeue_dead_workers()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import sys
+import threading
+import types
+
+from karta.plugins.dependency_injector import Inject, KartaDependencyInjector
+from karta.plugins.fixtures import fixture, FixtureManager
+
+events = []
+
+
+@fixture(scope='worker', name='sample_browser')
+def create_browser():
+    events.append('open browser')
+    yield {'browser': len(events)}
+    events.append('close browser')
+
+
+@fixture(scope='scenario')
+def sample_page():
+    events.append('open page')
+    yield {'page': browser.get()}
+    events.append('close page')
+
+
+@fixture(scope='session')
+def sample_session_using_scenario():
+    return page.get()
+
+
+browser = Inject('sample_browser').get()
+page = Inject('sample_page').get()
+
+
+def inject_fixtures(*modules) -> FixtureManager:
+    # The fixtures used by fixtures are injected again from each new fixture manager
+    global browser, page
+    browser = Inject('sample_browser').get()
+    page = Inject('sample_page').get()
+    dependency_injector = KartaDependencyInjector()
+    dependency_injector.inject(sys.modules[__name__], *modules)
+    return dependency_injector.fixture_manager
+
+
+def test_fixture_scopes():
+    events.clear()
+    fixture_manager = inject_fixtures()
+    for _ in range(2):
+        fixture_manager.enter_scope('scenario')
+        page = fixture_manager.get_fixture('sample_page')
+        assert fixture_manager.get_fixture('sample_page') is page
+        assert page['page'] is fixture_manager.get_fixture('sample_browser')
+        fixture_manager.exit_scope('scenario')
+    # The worker fixture is created once and finalized at the end of the session
+    assert events == ['open page', 'open browser', 'close page', 'open page', 'close page']
+
+    worker_browsers = []
+    worker_thread = threading.Thread(
+        target=lambda: worker_browsers.append(fixture_manager.get_fixture('sample_browser')))
+    worker_thread.start()
+    worker_thread.join()
+    assert worker_browsers[0] is not fixture_manager.get_fixture('sample_browser')
+
+    fixture_manager.exit_scope('worker')
+    fixture_manager.exit_scope('session')
+    assert events[-3:] == ['open browser', 'close browser', 'close browser']
+
+    for fixture_name, error in (('sample_page', 'can only be used in a scenario'),
+                                ('sample_session_using_scenario', 'narrower scope'), ('missing', 'Unknown fixture')):
+        try:
+            fixture_manager.get_fixture(fixture_name)
+            assert False, fixture_name
+        except Exception as e:
+            assert error in str(e), str(e)
+
+
+def test_fixtures_injected():
+    events.clear()
+    step_module = types.ModuleType('sample_steps')
+    step_module.page = Inject('sample_page').get()
+    step_module.properties = Inject('properties').get()
+    fixture_manager = inject_fixtures(step_module)
+    assert isinstance(step_module.properties, Inject)
+
+    # Fixtures are created on first use, not on injection
+    assert events == []
+    fixture_manager.enter_scope('scenario')
+    assert step_module.page['page'] == {'browser': 2}
+    assert step_module.page.get() is fixture_manager.get_fixture('sample_page')
+    fixture_manager.exit_scope('scenario')
+    fixture_manager.exit_scope('session')
+    assert events == ['open page', 'open browser', 'close page', 'close browser']
+
+
+def main():
+    test_fixture_scopes()
+    test_fixtures_injected()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
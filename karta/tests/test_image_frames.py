@@ -0,0 +1,196 @@
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from karta.core.utils.imageutils import FrameRingBuffer, FrameChangeDetector, Template, TemplateMatcher, ImageFrame, \
+    FrameRecorder, read_clip, ScreenCapture
+
+
+def test_ring_buffer_bounded():
+    frame_buffer = FrameRingBuffer(4, (2, 2, 3))
+    for frame_index in range(10):
+        frame_buffer.get_write_slot()[...] = frame_index
+        frame_buffer.add(float(frame_index), False)
+
+    # Frames overwritten before they were read are skipped, and the next slot to write is not readable
+    frames = []
+    while (frame := frame_buffer.read()) is not None:
+        frames.append(frame)
+    assert [frame.index for frame in frames] == [7, 8, 9]
+    assert [int(frame.data[0, 0, 0]) for frame in frames] == [7, 8, 9]
+    assert frame_buffer.frames.shape == (4, 2, 2, 3)
+
+    frame_buffer.get_write_slot()[...] = 10
+    frame_buffer.add(10.0, True)
+    frame = frame_buffer.read()
+    assert (frame.index, frame.timestamp, frame.same_as_previous) == (10, 10.0, True)
+    frame_buffer.add(11.0, False)
+    frame_buffer.clear()
+    assert frame_buffer.read() is None
+
+
+def test_change_detection_tolerance():
+    change_detector = FrameChangeDetector(change_tolerance=2.0, sample_step=1, block_size=4)
+    frame_data = np.zeros((16, 16, 3), dtype=np.uint8)
+    assert not change_detector.is_same_as_previous(frame_data)
+    assert change_detector.is_same_as_previous(frame_data.copy())
+
+    # A single changed pixel shifts its block average within the tolerance
+    noisy_frame_data = frame_data.copy()
+    noisy_frame_data[0, 0] = 16
+    assert change_detector.is_same_as_previous(noisy_frame_data)
+
+    changed_frame_data = frame_data.copy()
+    changed_frame_data[4:8, 4:8] = 255
+    assert not change_detector.is_same_as_previous(changed_frame_data)
+    # The changed frame is the new previous matching frame
+    assert change_detector.is_same_as_previous(changed_frame_data.copy())
+
+    change_detector.reset()
+    assert not change_detector.is_same_as_previous(changed_frame_data)
+
+
+def test_template_matching():
+    random_generator = np.random.default_rng(1)
+    frame_data = random_generator.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    frame_data[5:15, 5:15] = 200
+    # Noise of a few intensity levels such as anti-aliasing keeps a high confidence
+    noisy_template_data = np.clip(frame_data[40:60, 70:100].astype(np.int16) + random_generator.integers(
+        -4, 5, (20, 30, 3)), 0, 255).astype(np.uint8)
+    templates = [Template(noisy_template_data, 'noisy'),
+                 Template(frame_data[80:100, 20:40], 'region', region=(10, 70, 50, 40)),
+                 Template(np.full((6, 6, 3), 200, dtype=np.uint8), 'flat'),
+                 Template(random_generator.integers(0, 256, (20, 20, 3), dtype=np.uint8), 'absent'),
+                 Template(frame_data[0:50, 0:50], 'too large', region=(0, 0, 40, 40))]
+
+    matches = TemplateMatcher(templates).match(frame_data, 1.0)
+    assert [template_match.location for template_match in matches[:3]] == [(70, 40), (20, 80), (5, 5)]
+    assert [template_match.matched for template_match in matches] == [True, True, True, False, False]
+    assert matches[0].confidence > 0.99
+    assert matches[1].confidence > 0.999 and matches[1].timestamp == 1.0
+    assert matches[3].confidence < 0.5
+    assert matches[4].location is None
+
+    downscaled_matches = TemplateMatcher(templates[:2], downscale=2).match(frame_data)
+    assert [template_match.location for template_match in downscaled_matches] == [(70, 40), (20, 80)]
+
+
+def test_bgra_frames_converted_lazily():
+    random_generator = np.random.default_rng(2)
+    rgb_data = random_generator.integers(0, 256, (40, 60, 3), dtype=np.uint8)
+    bgra_data = np.empty((40, 60, 4), dtype=np.uint8)
+    bgra_data[..., 2::-1] = rgb_data
+    bgra_data[..., 3] = 255
+
+    frame = ImageFrame(bgra_data, pixel_format='BGRA')
+    assert frame._rgb is None
+    assert np.array_equal(frame.rgb, rgb_data)
+    assert frame.rgb is frame.rgb
+    assert ImageFrame(rgb_data).rgb is rgb_data
+
+    template = Template(rgb_data[10:30, 20:40], 'bgra')
+    template_match = TemplateMatcher([template]).match(bgra_data, pixel_format='BGRA')[0]
+    assert template_match.location == (20, 10) and template_match.confidence > 0.999
+
+
+def test_recorded_clip_keeps_pre_roll():
+    random_generator = np.random.default_rng(3)
+    frames_data = []
+    frame_data = random_generator.integers(0, 256, (30, 40, 4), dtype=np.uint8)
+    for frame_index in range(20):
+        if frame_index % 3:
+            frame_data = frame_data.copy()
+            frame_data[frame_index, :10] = frame_index
+        frames_data.append(frame_data)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        recorder = FrameRecorder(pre_roll=5.0, segment_duration=2.0, directory=temp_dir)
+        for frame_index, frame_data in enumerate(frames_data):
+            recorder.add_frame(frame_data, float(frame_index), frame_index > 0 and frame_index % 3 == 0, 'BGRA')
+            recorder.flush()
+        # Segments ending before the pre-roll of the last frame are deleted
+        assert [segment.start_time for segment in recorder.segments] == [14.0, 16.0, 18.0]
+
+        clip_path = recorder.save_clip(os.path.join(temp_dir, 'clips', 'failed.kclip'), start_time=15.0)
+        clip_frames = list(read_clip(clip_path))
+        assert [frame.timestamp for frame in clip_frames] == [14.0, 15.0, 16.0, 17.0, 18.0, 19.0]
+        assert all(np.array_equal(frame.data, frames_data[int(frame.timestamp)]) for frame in clip_frames)
+        assert [frame.same_as_previous for frame in clip_frames] == [False, True, False, False, False, False]
+        assert clip_frames[0].pixel_format == 'BGRA'
+        assert os.path.getsize(clip_path) < sum(frame.data.nbytes for frame in clip_frames)
+
+        recorder.close()
+        assert not os.path.exists(recorder.directory)
+        assert FrameRecorder(directory=temp_dir).save_clip(os.path.join(temp_dir, 'empty.kclip')) is None
+
+
+def test_recorded_frame_after_dropped_frames():
+    frames_data = [np.full((4, 4, 4), frame_index, dtype=np.uint8) for frame_index in range(5)]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        recorder = FrameRecorder(segment_duration=60.0, directory=temp_dir, queue_size=2)
+        write_frame = recorder.write_frame
+        writer_blocked = threading.Event()
+        writer_released = threading.Event()
+
+        def write_frame_blocked(*args):
+            writer_blocked.set()
+            writer_released.wait()
+            write_frame(*args)
+
+        recorder.write_frame = write_frame_blocked
+        recorder.add_frame(frames_data[0], 10.0)
+        writer_blocked.wait()
+        # The writer is busy with the first frame, the second one fills the last slot and the others are dropped
+        for frame_index in range(1, 4):
+            recorder.add_frame(frames_data[frame_index], 10.0 + frame_index, frame_index == 3)
+        writer_released.set()
+        recorder.flush()
+        # The frame after the dropped frames is recorded with its pixels although the same as the dropped one before
+        recorder.add_frame(frames_data[4], 14.0, True)
+
+        clip_frames = list(read_clip(recorder.save_clip(os.path.join(temp_dir, 'dropped.kclip'))))
+        assert recorder.dropped_frame_count == 2
+        assert [frame.timestamp for frame in clip_frames] == [10.0, 11.0, 14.0]
+        assert [frame.same_as_previous for frame in clip_frames] == [False, False, False]
+        assert all(np.array_equal(frame.data, frames_data[int(frame.timestamp) - 10]) for frame in clip_frames)
+        recorder.close()
+
+
+def test_response_found_after_trigger():
+    screen_capture = ScreenCapture(screen_area=(0, 0, 20, 20))
+    screen_capture.capturing = True
+    screen_capture.frame_buffer = FrameRingBuffer(8, (20, 20, 4), 'BGRA')
+    marker_data = np.full((20, 20, 4), 255, dtype=np.uint8)
+    # A change before the trigger, no change just after it, then the response
+    for capture_time, same_as_previous, frame_value in ((1.0, True, 0), (2.0, False, 0), (3.0, True, 0),
+                                                         (4.0, False, 255)):
+        screen_capture.frame_buffer.get_write_slot()[...] = frame_value
+        screen_capture.frame_buffer.add(capture_time + 100.0, same_as_previous, capture_time)
+    assert screen_capture.find_response(2.5) == (True, 4.0)
+    assert not screen_capture.find_response(2.5)
+
+    screen_capture.frame_buffer.clear()
+    for capture_time in (1.0, 2.0, 3.0):
+        screen_capture.frame_buffer.get_write_slot()[...] = 255 if capture_time >= 2.0 else 0
+        screen_capture.frame_buffer.add(capture_time, True, capture_time)
+    template_matcher = TemplateMatcher([Template(marker_data[:4, :4, :3], 'marker')])
+    assert screen_capture.find_response(1.5, template_matcher) == (True, 2.0)
+    screen_capture.capturing = False
+
+
+def main():
+    test_ring_buffer_bounded()
+    test_change_detection_tolerance()
+    test_template_matching()
+    test_bgra_frames_converted_lazily()
+    test_recorded_clip_keeps_pre_roll()
+    test_recorded_frame_after_dropped_frames()
+    test_response_found_after_trigger()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
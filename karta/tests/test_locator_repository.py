@@ -0,0 +1,104 @@
+import os
+import tempfile
+
+from selenium.webdriver import Remote
+
+from karta.web.factory import WebAUT, Page
+from karta.web.locators import LocatorRepository, parse_page_locators
+from karta.web.models import WebDriverConfig
+
+SAMPLE_LOCATORS = """
+SamplePage:
+  frame:
+    type: ID
+    selector: frame
+  host:
+    selector: "#host"
+    iframe: frame
+  button:
+    selector: button
+    shadow_root: host
+"""
+
+
+class SampleDriver(Remote):
+    def __init__(self):
+        pass
+
+
+class SamplePage(Page):
+    def validate(self) -> bool:
+        return True
+
+
+class SampleApp(WebAUT):
+    def initialize_application(self):
+        self.driver = SampleDriver()
+        return SamplePage(self)
+
+
+def test_locators_cached_until_changed():
+    locator_repository = LocatorRepository()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        locators_file = os.path.join(temp_dir, 'locators.yaml')
+        with open(locators_file, 'w') as file:
+            file.write(SAMPLE_LOCATORS)
+
+        page_locators = locator_repository.get_page_locators(locators_file)
+        assert page_locators['SamplePage']['host'].iframe == 'frame'
+        assert page_locators['SamplePage']['button'].shadow_root == 'host'
+        assert locator_repository.get_page_locators(locators_file) is page_locators
+
+        with open(locators_file, 'w') as file:
+            file.write(SAMPLE_LOCATORS.replace('selector: button', 'selector: input'))
+        os.utime(locators_file, ns=(0, 0))
+        reloaded_page_locators = locator_repository.get_page_locators(locators_file)
+        assert reloaded_page_locators is not page_locators
+        assert reloaded_page_locators['SamplePage']['button'].selector == 'input'
+
+
+def test_reference_validation():
+    for locators_data in ({'Page': {'a': {'selector': 'a', 'iframe': 'missing'}}},
+                          {'Page': {'a': {'selector': 'a', 'shadow_root': 'a'}}},
+                          {'Page': {'a': {'selector': 'a', 'iframe': 'b'}, 'b': {'selector': 'b', 'shadow_root': 'c'},
+                                    'c': {'selector': 'c', 'iframe': 'a'}}}):
+        try:
+            parse_page_locators(locators_data)
+            assert False, "Invalid locator references were accepted"
+        except ValueError:
+            pass
+
+    # Elements may share iframes and shadow roots
+    parse_page_locators({'Page': {'a': {'selector': 'a'}, 'b': {'selector': 'b', 'iframe': 'a'},
+                                  'c': {'selector': 'c', 'iframe': 'a', 'shadow_root': 'b'}}})
+
+
+def test_page_elements_created_lazily():
+    application = SampleApp(WebDriverConfig())
+    application.page_locators = parse_page_locators({'SamplePage': {'button': {'selector': 'button'},
+                                                                    'link': {'selector': 'a'}}})
+    page = application.initialize_application()
+    other_page = SamplePage(application)
+    assert page.elements == {}
+
+    assert page.button is page.button
+    assert page.button.locator.selector == 'button'
+    assert [*page.elements.keys()] == ['button']
+    assert other_page.elements == {}
+    try:
+        page.missing
+        assert False, "Undefined element was found"
+    except AttributeError:
+        pass
+
+
+def main():
+    test_locators_cached_until_changed()
+    test_reference_validation()
+    test_page_elements_created_lazily()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+from karta.core.models.test_execution import LatencyDistribution, StepResult
+from karta.core.utils.measurements import Measurements
+
+
+def test_latency_distribution():
+    distribution = LatencyDistribution.from_samples([0.1 * sample for sample in range(10, 0, -1)])
+    assert distribution.count == 10
+    assert (distribution.minimum, distribution.maximum) == (0.1, 1.0)
+    assert round(distribution.mean, 6) == 0.55 and round(distribution.median, 6) == 0.55
+    # Percentiles by nearest rank are samples
+    assert (distribution.p90, distribution.p95, distribution.p99) == (0.9, 1.0, 1.0)
+    assert round(distribution.standard_deviation, 6) == 0.287228
+    assert LatencyDistribution.from_samples([]).count == 0
+
+
+def test_measurements_in_step_result():
+    measurements = Measurements()
+    assert not measurements
+    for response_time in (0.2, 0.1, 0.3):
+        measurements.record('response_time', response_time)
+    measurements.record('load_time', 1.5)
+    assert measurements
+
+    step_result = StepResult(name='step', measurements=measurements.get_distributions())
+    assert step_result.measurements['response_time'].samples == [0.2, 0.1, 0.3]
+    assert step_result.measurements['response_time'].median == 0.2
+    assert step_result.measurements['load_time'].p99 == 1.5
+    assert StepResult.model_validate(step_result.model_dump()).measurements == step_result.measurements
+
+
+def main():
+    test_latency_distribution()
+    test_measurements_in_step_result()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from karta.core.models.generic import Context
+from karta.core.models.test_catalog import Step
+from karta.core.models.test_execution import LatencyDistribution
+from karta.plugins.remote import RemoteStepRunner
+
+
+class SampleStepServerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests: list[str] = []
+    client_ports: set[int] = set()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, data: object):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        self.client_ports.add(self.client_address[1])
+        self.send_json(['remote step {int}', 'failing remote step'])
+
+    def do_POST(self):
+        self.requests.append(self.path)
+        self.client_ports.add(self.client_address[1])
+        steps_run_info = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        step_results = []
+        for step, step_data in zip(steps_run_info['steps'], steps_run_info['step_data']):
+            successful = step['identifier'] != 'failing remote step'
+            step_results.append({'name': step['identifier'], 'successful': successful,
+                                 'results': {step['identifier']: step_data},
+                                 'measurements': {'response': LatencyDistribution.from_samples(
+                                     [step_data['value'] / 10]).model_dump()}})
+            if not successful:
+                break
+        self.send_json(step_results)
+
+
+def test_remote_step_runner():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SampleStepServerHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        remote_step_runner = RemoteStepRunner('http://127.0.0.1:{}'.format(server.server_address[1]))
+        assert remote_step_runner.is_step_available('remote step 5')
+        assert not remote_step_runner.is_step_available('local step')
+
+        steps = [Step(identifier='remote step 1'), Step(identifier='failing remote step'),
+                 Step(identifier='remote step 3')]
+        step_returns = remote_step_runner.run_steps(steps, [{'value': 1}, {'value': 2}, {'value': 3}], Context())
+        assert [step_return[:3] for step_return in step_returns] == [
+            ({'remote step 1': {'value': 1}}, True, None), ({'failing remote step': {'value': 2}}, False, None)]
+        # Measurements of the remote steps are returned with each step
+        assert [step_return[3]['response'].samples for step_return in step_returns] == [[0.1], [0.2]]
+
+        context = Context(step_data={'value': 4})
+        assert remote_step_runner.run_step(Step(identifier='remote step 4'), context)[:3] == (
+            {'remote step 4': {'value': 4}}, True, None)
+
+        # The step catalog is fetched once and all requests share one kept alive connection
+        assert SampleStepServerHandler.requests == ['/steps', '/run_steps', '/run_steps']
+        assert len(SampleStepServerHandler.client_ports) == 1
+    finally:
+        remote_step_runner.connection_pool.close()
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    test_remote_step_runner()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
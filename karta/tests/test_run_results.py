@@ -0,0 +1,88 @@
+from karta.core.models.test_execution import RunResult, FeatureResult, ScenarioResult
+from karta.runner.results import get_failed_scenario_results, merge_run_results, read_event_log
+
+
+def get_sample_run_result() -> RunResult:
+    feature_result = FeatureResult(name='feature', source='features/sample.feature', seed=2)
+    for iteration_index, successful in enumerate([True, False]):
+        scenario_result = ScenarioResult(name='scenario', source='features/sample.feature', line_number=10,
+                                         iteration_index=iteration_index, seed=10 + iteration_index)
+        scenario_result.successful = successful
+        feature_result.add_scenario_result(scenario_result, iteration_index)
+    run_result = RunResult(run_id='run', name='run', seed=1)
+    run_result.add_feature_result(feature_result)
+    return run_result
+
+
+def test_failed_scenario_results():
+    failed_scenario_results = get_failed_scenario_results(get_sample_run_result())
+    assert [scenario_result.iteration_index for _, scenario_result in failed_scenario_results] == [1]
+    assert failed_scenario_results[0][1].seed == 11
+
+
+def test_merge_rerun_results():
+    run_result = get_sample_run_result()
+    assert not run_result.feature_results[0].is_successful()
+
+    rerun_feature_result = FeatureResult(name='feature', source='features/sample.feature')
+    rerun_feature_result.add_scenario_result(
+        ScenarioResult(name='scenario', source='features/sample.feature', line_number=10, iteration_index=1, seed=11),
+        1)
+    rerun_result = RunResult(run_id='rerun', name='rerun', seed=1)
+    rerun_result.add_feature_result(rerun_feature_result)
+
+    merged_result = merge_run_results(run_result, rerun_result)
+    assert merged_result.run_id == 'rerun'
+    merged_feature_result = merged_result.feature_results[0]
+    assert merged_feature_result.is_successful() and merged_feature_result.failed_iterations == []
+    assert len(merged_feature_result.scenario_results) == 2
+
+
+def test_merge_rerun_results_of_yaml_features():
+    # Scenarios of YAML features have no source nor line number of their own
+    run_result = RunResult(run_id='run', name='run', seed=1)
+    for feature_name in ['first', 'second']:
+        feature_result = FeatureResult(name=feature_name, source='features/{}.yaml'.format(feature_name))
+        scenario_result = ScenarioResult(name='scenario', line_number=0, iteration_index=0)
+        scenario_result.successful = False
+        feature_result.add_scenario_result(scenario_result, 0)
+        run_result.add_feature_result(feature_result)
+
+    rerun_feature_result = FeatureResult(name='second', source='features/second.yaml')
+    rerun_feature_result.add_scenario_result(ScenarioResult(name='scenario', line_number=0, iteration_index=0), 0)
+    rerun_result = RunResult(run_id='rerun', name='rerun', seed=1)
+    rerun_result.add_feature_result(rerun_feature_result)
+
+    merged_result = merge_run_results(run_result, rerun_result)
+    assert [feature_result.is_successful() for feature_result in merged_result.feature_results] == [False, True]
+
+
+def test_read_event_log():
+    run_result = get_sample_run_result()
+    feature_result = run_result.feature_results[0]
+    events = [{'type': 'run_start', 'run': 'run', 'tags': None}]
+    for scenario_result in feature_result.scenario_results:
+        events.append({'type': 'scenario_complete', 'run': 'run', 'feature': 'feature', 'sceanario': 'scenario',
+                       'result': scenario_result.model_dump()})
+    events.append({'type': 'feature_complete', 'run': 'run', 'feature': 'feature',
+                   'result': feature_result.model_dump(exclude={'scenario_results'})})
+    events.append({'type': 'run_complete', 'run': 'run',
+                   'result': run_result.model_dump(exclude={'feature_results': {'__all__': {'scenario_results'}}})})
+
+    read_run_result = read_event_log(events)
+    assert read_run_result.seed == 1
+    assert [scenario_result.seed for scenario_result in read_run_result.feature_results[0].scenario_results] == [10,
+                                                                                                                 11]
+
+
+def main():
+    test_failed_scenario_results()
+    test_merge_rerun_results()
+    test_merge_rerun_results_of_yaml_features()
+    test_read_event_log()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
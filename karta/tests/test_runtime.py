@@ -0,0 +1,433 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import Union, Optional
+
+import yaml
+
+import karta
+from karta.core.interfaces.plugins import FeatureParser, StepRunner, TestLifecycleHook, TestEventListener, \
+    PluginConfig
+from karta.core.models.generic import Context
+from karta.core.models.karta_config import KartaConfig
+from karta.core.models.test_catalog import Feature, Scenario, Step, Background
+from karta.core.models.test_execution import Run, RunResult
+from karta.core.models.testdata import GeneratedObjectValue, IntegerRangeValue
+from karta.plugins.dependency_injector import Inject
+from karta.plugins.fixtures import fixture, FixtureManager
+from karta.runner.distributed import Coordinator, start_coordinator_server, get_work_item, run_distributed, \
+    run_worker
+from karta.runner.runtime import KartaRuntime
+
+# Feature fixtures created and finalized
+feature_fixture_events = []
+
+
+@fixture(scope='feature')
+def runtime_feature_fixture():
+    feature_fixture = {'index': sum(1 for event, _ in feature_fixture_events if event == 'create')}
+    feature_fixture_events.append(('create', feature_fixture['index']))
+    yield feature_fixture
+    feature_fixture_events.append(('finalize', feature_fixture['index']))
+
+
+class SampleStepRunner(FeatureParser, StepRunner, TestLifecycleHook):
+    """
+    Runs the steps 'record step', 'failing step' and 'fixture step', recording the step data of every step run and
+    the step events. The fixture step records the feature fixture instead of its step data. Features are the ones
+    given to the runtime, or the JSON feature files of the feature directory.
+    """
+    fixture_manager: FixtureManager = Inject()
+    features: list[Feature] = []
+    # Scenario name, iteration index, step identifier and step data of the steps run
+    step_runs: list[tuple] = []
+    # Step events and step runs in the order they happened
+    events: list[tuple] = []
+
+    def __init__(self, supports_batching: bool = False, feature_directory: Optional[str] = None):
+        self.supports_batching = supports_batching
+        self.feature_directory = feature_directory
+
+    def parse_feature(self, feature_source: str) -> Feature:
+        return Feature.model_validate_json(feature_source)
+
+    def parse_feature_file(self, feature_file: str) -> Feature:
+        return self.parse_feature(Path(feature_file).read_text(encoding='utf-8'))
+
+    def get_features(self, ) -> list[Feature]:
+        if self.feature_directory:
+            return [self.parse_feature_file(str(feature_file)) for feature_file in
+                    sorted(Path(self.feature_directory).glob('*.sample'))]
+        return self.features
+
+    def get_steps(self) -> list[str]:
+        return ['record step', 'failing step', 'fixture step']
+
+    def is_step_available(self, name: str) -> bool:
+        return name in self.get_steps()
+
+    def run_step(self, step: Step, context: dict) -> Union[tuple[dict, bool, str], bool]:
+        run_info = context['run_info']
+        step_data = context['step_data']
+        if step.identifier == 'fixture step':
+            step_data = self.fixture_manager.get_fixture('runtime_feature_fixture')
+        self.step_runs.append((run_info.scenario, run_info.iteration_index, step.identifier, step_data))
+        self.events.append(('run', step.identifier))
+        return {}, step.identifier != 'failing step', None
+
+    def run_steps(self, steps: list[Step], step_data: list[Optional[dict]], context: dict) -> list[
+        Union[tuple[dict, bool, str], bool]]:
+        context['measurements'].record('call', 0.5)
+        step_returns = []
+        for step, data in zip(steps, step_data):
+            context['step_data'] = data
+            step_returns.append(self.run_step(step, context))
+            if not step_returns[-1][1]:
+                break
+        return step_returns
+
+    def run_start(self, context: Context):
+        pass
+
+    def feature_start(self, context: Context):
+        self.events.append(('feature_start', context.run_info.feature.name))
+
+    def feature_iteration_start(self, context: Context):
+        pass
+
+    def scenario_start(self, context: Context):
+        self.events.append(('scenario_start', context.run_info.scenario.name))
+
+    def step_start(self, context: Context):
+        self.events.append(('step_start', context.run_info.step.identifier))
+
+    def step_complete(self, context: Context):
+        self.events.append(('step_complete', context.run_info.step.identifier))
+
+    def scenario_complete(self, context: Context):
+        pass
+
+    def feature_iteration_complete(self, context: Context):
+        pass
+
+    def feature_complete(self, context: Context):
+        self.events.append(('feature_complete', context.run_info.feature.name))
+
+    def run_complete(self, context: Context):
+        pass
+
+
+class SampleEventListener(TestEventListener):
+    """
+    Records the type and context of the events
+    """
+    events: list[tuple[str, Context]] = []
+
+    def run_start(self, context: Context):
+        self.events.append(('run_start', context))
+
+    def feature_start(self, context: Context):
+        self.events.append(('feature_start', context))
+
+    def feature_iteration_start(self, context: Context):
+        self.events.append(('feature_iteration_start', context))
+
+    def scenario_start(self, context: Context):
+        self.events.append(('scenario_start', context))
+
+    def step_start(self, context: Context):
+        self.events.append(('step_start', context))
+
+    def step_complete(self, context: Context):
+        self.events.append(('step_complete', context))
+
+    def scenario_complete(self, context: Context):
+        self.events.append(('scenario_complete', context))
+
+    def feature_iteration_complete(self, context: Context):
+        self.events.append(('feature_iteration_complete', context))
+
+    def feature_complete(self, context: Context):
+        self.events.append(('feature_complete', context))
+
+    def run_complete(self, context: Context):
+        self.events.append(('run_complete', context))
+
+
+def get_sample_config(results_directory: Optional[str], supports_batching: bool = False,
+                      feature_directory: Optional[str] = None, **config) -> KartaConfig:
+    return KartaConfig(
+        property_files=[],
+        plugins={
+            'SampleStepRunner': PluginConfig(module_name=SampleStepRunner.__module__, class_name='SampleStepRunner',
+                                             kwargs={'supports_batching': supports_batching,
+                                                     'feature_directory': feature_directory}),
+            'KartaTestCatalogManager': PluginConfig(module_name='karta.plugins.catalog',
+                                                    class_name='KartaTestCatalogManager'),
+            'SampleEventListener': PluginConfig(module_name=SampleStepRunner.__module__,
+                                                class_name='SampleEventListener'),
+        },
+        step_runners=['SampleStepRunner'],
+        parser_map={'.sample': 'SampleStepRunner'},
+        test_catalog_manager='KartaTestCatalogManager',
+        test_lifecycle_hooks=['SampleStepRunner'],
+        results_directory=results_directory,
+        **config)
+
+
+def get_sample_runtime(features: list[Feature], results_directory: str, supports_batching: bool = False,
+                       **config) -> KartaRuntime:
+    SampleStepRunner.features = features
+    SampleStepRunner.step_runs = []
+    SampleStepRunner.events = []
+    SampleEventListener.events = []
+    return KartaRuntime(config=get_sample_config(results_directory, supports_batching, **config))
+
+
+def get_sample_feature(name: str, source: Optional[str], scenario_steps: list[list[Step]],
+                       iterations: int = 1) -> Feature:
+    scenarios = {Scenario(name='{} scenario{}'.format(name, index), source=source,
+                          line_number=(index + 1) * 10 if source else 0, tags=set(), steps=steps) for index, steps in
+                 enumerate(scenario_steps)}
+    return Feature(name=name, source=source, tags=set(), background=Background(steps=[]), scenarios=scenarios,
+                   iterations=iterations)
+
+
+def get_data_step() -> Step:
+    return Step(identifier='record step', data_rules=GeneratedObjectValue(fields_dict={
+        'value': IntegerRangeValue(min=0, max=1000000)}))
+
+
+def test_rerun_reproduces_batched_step_data():
+    failing_step = Step(identifier='failing step', data_rules=GeneratedObjectValue(fields_dict={
+        'value': IntegerRangeValue(min=0, max=1000000)}))
+    feature = get_sample_feature('rerun feature', 'features/rerun.sample', [[get_data_step(), failing_step]],
+                                 iterations=3)
+    with tempfile.TemporaryDirectory() as results_directory:
+        runtime = get_sample_runtime([feature], results_directory, random_seed=7, data_batch_size=2)
+        run = Run(id='run', name='run')
+        run_result = RunResult(run_id=run.id, name=run.name, seed=runtime.get_run_seed(run))
+        run_result.add_feature_result(runtime.run_feature(run, feature, Context()))
+        runtime.save_run_result(run_result)
+        step_runs = SampleStepRunner.step_runs
+        assert [iteration_index for _, iteration_index, _, _ in step_runs] == [0, 0, 1, 1, 2, 2]
+        # Every iteration draws its own data
+        assert len({step_data['value'] for _, _, _, step_data in step_runs}) == 6
+
+        # A new runtime rerunning the failed iterations regenerates the same data
+        rerun_runtime = get_sample_runtime([feature], results_directory, data_batch_size=2)
+        rerun_runtime.rerun_failed('run')
+        assert SampleStepRunner.step_runs == step_runs
+
+
+def test_scenario_results_of_yaml_features():
+    feature = get_sample_feature('yaml feature', None, [[get_data_step()], [get_data_step()]])
+    feature.source = 'features/yaml_feature.yaml'
+    with tempfile.TemporaryDirectory() as results_directory:
+        runtime = get_sample_runtime([feature], results_directory)
+        feature_result = runtime.run_feature(Run(id='run', name='run'), feature, Context())
+        assert {(scenario_result.source, scenario_result.line_number) for scenario_result in
+                feature_result.scenario_results} == {('features/yaml_feature.yaml', 0)}
+        assert len(feature_result.scenario_results) == 2
+
+
+def test_passed_scenario_results_without_step_results():
+    feature = get_sample_feature('retained feature', 'features/retained.sample',
+                                 [[get_data_step()], [get_data_step(), Step(identifier='failing step')]], iterations=2)
+    for keep_passed_step_results in [False, True]:
+        with tempfile.TemporaryDirectory() as results_directory:
+            runtime = get_sample_runtime([feature], results_directory,
+                                         keep_passed_step_results=keep_passed_step_results)
+            feature_result = runtime.run_feature(Run(id='run', name='run'), feature, Context())
+            step_counts = sorted((scenario_result.is_successful(), len(scenario_result.step_results),
+                                  scenario_result.iteration_index) for scenario_result in
+                                 feature_result.scenario_results)
+            passed_step_count = 1 if keep_passed_step_results else 0
+            assert step_counts == [(False, 2, 0), (False, 2, 1), (True, passed_step_count, 0),
+                                   (True, passed_step_count, 1)]
+            assert feature_result.failed_iterations == [0, 1]
+
+
+def test_batched_step_events_and_measurements():
+    steps = [get_data_step(), Step(identifier='record step'), Step(identifier='failing step'),
+             Step(identifier='record step')]
+    feature = get_sample_feature('batched feature', 'features/batched.sample', [steps])
+    with tempfile.TemporaryDirectory() as results_directory:
+        runtime = get_sample_runtime([feature], results_directory, supports_batching=True)
+        feature_result = runtime.run_feature(Run(id='run', name='run'), feature, Context())
+        step_events = [event for event in SampleStepRunner.events if event[0] in ('step_start', 'run', 'step_complete')]
+        # Step start events are sent before the batch runs, the step not run after the failed step completes too
+        assert step_events == [('step_start', step.identifier) for step in steps] + [
+            ('run', step.identifier) for step in steps[:3]] + [('step_complete', step.identifier) for step in steps]
+        step_results = feature_result.scenario_results[0].step_results
+        assert [step_result.is_successful() for step_result in step_results] == [True, True, False]
+        assert [bool(step_result.measurements) for step_result in step_results] == [False, False, True]
+        assert step_results[2].measurements['call'].samples == [0.5]
+
+
+def test_run_scenarios_in_given_order():
+    first_feature = get_sample_feature('first', 'features/first.sample', [[get_data_step()], [get_data_step()]])
+    second_feature = get_sample_feature('second', 'features/second.sample', [[get_data_step()]])
+    with tempfile.TemporaryDirectory() as results_directory:
+        runtime = get_sample_runtime([first_feature, second_feature], results_directory)
+        first_scenarios = sorted(first_feature.scenarios, key=lambda scenario: scenario.line_number)
+        ordered_scenarios = [first_scenarios[1], next(iter(second_feature.scenarios)), first_scenarios[0]]
+        run_result = runtime.run_scenarios(Run(id='run', name='run'), ordered_scenarios, Context())
+        assert [event for event in SampleStepRunner.events if event[0] in ('feature_start', 'scenario_start')] == [
+            ('feature_start', 'first'), ('scenario_start', 'first scenario1'), ('feature_start', 'second'),
+            ('scenario_start', 'second scenario0'), ('feature_start', 'first'), ('scenario_start', 'first scenario0')]
+        assert [event for event in SampleStepRunner.events if event[0] == 'feature_complete'] == [
+            ('feature_complete', 'first'), ('feature_complete', 'second'), ('feature_complete', 'first')]
+        assert [[scenario_result.name for scenario_result in feature_result.scenario_results] for feature_result in
+                run_result.feature_results] == [['first scenario1', 'first scenario0'], ['second scenario0']]
+
+
+def test_scenario_history_loaded_once_per_run():
+    feature = get_sample_feature('history feature', 'features/history.sample', [[get_data_step()], [get_data_step()]])
+    scenarios = set(feature.scenarios)
+    with tempfile.TemporaryDirectory() as results_directory:
+        runtime = get_sample_runtime([feature], results_directory)
+        load_scenario_history = runtime.load_scenario_history
+        history_loads = []
+
+        def count_history_loads():
+            history_loads.append(True)
+            return load_scenario_history()
+
+        runtime.load_scenario_history = count_history_loads
+        runtime.run_selected_scenarios(scenarios, shard=(1, 1), ordering='fastest', time_budget=3600.0)
+        assert len(history_loads) == 1
+        # Orderings not using the history do not load it
+        history_loads.clear()
+        runtime.run_selected_scenarios(scenarios, ordering='location')
+        runtime.run_selected_scenarios(scenarios, ordering='random')
+        assert not history_loads
+
+
+def test_ordered_scenarios_grouped_by_feature():
+    first_feature = get_sample_feature('first grouped', 'features/first_grouped.sample',
+                                       [[get_data_step()], [get_data_step()] * 3])
+    second_feature = get_sample_feature('second grouped', 'features/second_grouped.sample', [[get_data_step()] * 2])
+    scenarios = set(first_feature.scenarios) | set(second_feature.scenarios)
+    for interleave_features, scenario_names in [
+        (False, ['first grouped scenario0', 'first grouped scenario1', 'second grouped scenario0']),
+        (True, ['first grouped scenario0', 'second grouped scenario0', 'first grouped scenario1'])]:
+        with tempfile.TemporaryDirectory() as results_directory:
+            runtime = get_sample_runtime([first_feature, second_feature], results_directory,
+                                         interleave_features=interleave_features)
+            runtime.run_selected_scenarios(scenarios, ordering='fastest')
+            assert [event[1] for event in SampleStepRunner.events if event[0] == 'scenario_start'] == scenario_names
+            feature_starts = [event for event in SampleStepRunner.events if event[0] == 'feature_start']
+            assert len(feature_starts) == (3 if interleave_features else 2)
+
+
+def test_worker_with_interleaved_features():
+    first_feature = get_sample_feature('first worker', 'features/first_worker.sample',
+                                       [[Step(identifier='fixture step')], [Step(identifier='fixture step')]])
+    second_feature = get_sample_feature('second worker', 'features/second_worker.sample',
+                                        [[Step(identifier='fixture step')]])
+    with tempfile.TemporaryDirectory() as results_directory:
+        runtime = get_sample_runtime([first_feature, second_feature], results_directory,
+                                     test_event_listeners=['SampleEventListener'])
+        feature_fixture_events.clear()
+        first_scenarios = sorted(first_feature.scenarios, key=lambda scenario: scenario.line_number)
+        second_scenario = next(iter(second_feature.scenarios))
+        scenario_features = [(first_feature, first_scenarios[0]), (second_feature, second_scenario),
+                             (first_feature, first_scenarios[1])]
+        coordinator = Coordinator({'id': 'run', 'name': 'run', 'seed': 1},
+                                  [get_work_item(item_id, feature, scenario) for item_id, (feature, scenario) in
+                                   enumerate(scenario_features)])
+        server = start_coordinator_server(coordinator)
+        runtime.initialize()
+        try:
+            run_result = run_worker(runtime, 'http://127.0.0.1:{}'.format(server.server_address[1]), prefetch=3)
+        finally:
+            runtime.stop()
+            server.shutdown()
+            server.server_close()
+
+        # Every scenario uses the fixture of its own feature, created again when the feature is started again
+        assert [step_data['index'] for _, _, _, step_data in SampleStepRunner.step_runs] == [0, 1, 2]
+        assert feature_fixture_events == [('create', 0), ('finalize', 0), ('create', 1), ('finalize', 1),
+                                          ('create', 2), ('finalize', 2)]
+        assert [len(feature_result.scenario_results) for feature_result in run_result.feature_results] == [2, 1]
+        assert all(scenario_result.is_successful() for scenario_result in coordinator.results.values())
+        # The event listeners of the worker are back after the run
+        assert [type(listener) for listener in runtime.event_processor.test_event_listeners] == [SampleEventListener]
+        assert not SampleEventListener.events
+        # The coordinator received all the events of the run
+        assert sum(1 for event in coordinator.events if event['type'] == 'scenario_complete') == 3
+        assert coordinator.events[-1]['type'] == 'run_complete'
+
+
+def test_distributed_run_on_worker_processes():
+    with tempfile.TemporaryDirectory() as run_directory:
+        features = []
+        for name, scenario_count in [('first process', 2), ('second process', 1)]:
+            feature_file = Path(run_directory, 'features', name.replace(' ', '_') + '.sample')
+            feature_file.parent.mkdir(exist_ok=True)
+            feature = get_sample_feature(name, str(feature_file), [[get_data_step()]] * scenario_count)
+            feature_file.write_text(feature.model_dump_json(), encoding='utf-8')
+            features.append(feature)
+        # The workers load this config from the run directory, with an event listener writing to a file
+        worker_config = get_sample_config(None, feature_directory=str(Path(run_directory, 'features'))).model_dump(
+            mode='json', exclude_none=True)
+        for plugin_config in worker_config['plugins'].values():
+            # Workers import the plugins of this module by its name, also when it runs as a script
+            if plugin_config['module_name'] == '__main__':
+                plugin_config['module_name'] = 'karta.tests.test_runtime'
+        worker_config['plugins']['JSONEventDumper'] = {'module_name': 'karta.plugins.listeners',
+                                                       'class_name': 'DumpToJSONEventListener',
+                                                       'kwargs': {'json_file_name': 'events.json'}}
+        worker_config['test_event_listeners'] = ['JSONEventDumper']
+        Path(run_directory, 'karta_config.yaml').write_text(yaml.safe_dump(worker_config), encoding='utf-8')
+
+        runtime = get_sample_runtime(features, str(Path(run_directory, 'results')),
+                                     test_event_listeners=['SampleEventListener'])
+        working_directory = os.getcwd()
+        python_path = os.environ.get('PYTHONPATH')
+        os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [str(Path(karta.__file__).parent.parent),
+                                                                 python_path]))
+        os.chdir(run_directory)
+        runtime.initialize()
+        try:
+            scenarios = {scenario for feature in features for scenario in feature.scenarios}
+            run_result = run_distributed(runtime, scenarios, 2, run_name='distributed')
+        finally:
+            runtime.stop()
+            os.chdir(working_directory)
+            if python_path is None:
+                del os.environ['PYTHONPATH']
+            else:
+                os.environ['PYTHONPATH'] = python_path
+
+        assert {feature_result.name: len(feature_result.scenario_results) for feature_result in
+                run_result.feature_results} == {'first process': 2, 'second process': 1}
+        assert all(feature_result.is_successful() for feature_result in run_result.feature_results)
+        # The events of the workers went to the event listeners of the coordinator instead of their own
+        assert not Path(run_directory, 'events.json').exists()
+        event_types = [event_type for event_type, _ in SampleEventListener.events]
+        assert event_types[0] == 'run_start' and event_types[-1] == 'run_complete'
+        assert event_types.count('run_start') == 1 and event_types.count('run_complete') == 1
+        scenario_completes = [context for event_type, context in SampleEventListener.events if
+                              event_type == 'scenario_complete']
+        assert len(scenario_completes) == 3
+        assert all(context.worker and context.result.is_successful() for context in scenario_completes)
+
+
+def main():
+    test_rerun_reproduces_batched_step_data()
+    test_scenario_results_of_yaml_features()
+    test_passed_scenario_results_without_step_results()
+    test_batched_step_events_and_measurements()
+    test_run_scenarios_in_given_order()
+    test_scenario_history_loaded_once_per_run()
+    test_ordered_scenarios_grouped_by_feature()
+    test_worker_with_interleaved_features()
+    test_distributed_run_on_worker_processes()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import tempfile
+from pathlib import Path
+
+from karta.core.models.test_catalog import Feature, Scenario, Step
+from karta.core.utils.importutils import import_module_from_file
+from karta.runner.selection import ScenarioUsageIndex
+
+STEP_DEFINITION_MODULES = {
+    '__init__.py': '',
+    'helpers.py': 'def helper():\n    return 1\n',
+    'steps_a.py': 'def step_a(context):\n    from stepdefs_package.helpers import helper\n    return helper()\n',
+    'steps_b.py': 'def step_b(context):\n    pass\n',
+    'hooks.py': 'def before_run(context):\n    pass\n',
+}
+
+
+def build_usage_index(package_directory: Path) -> tuple[ScenarioUsageIndex, dict[str, Scenario]]:
+    step_functions = {}
+    for module_name in ('steps_a', 'steps_b'):
+        module = import_module_from_file(module_name, str(package_directory / (module_name + '.py')))
+        step_functions[module_name.replace('steps', 'step')] = getattr(module, module_name.replace('steps', 'step'))
+
+    scenarios = {
+        'a': Scenario(name='a', steps=[Step(identifier='step_a')], line_number=2),
+        'b': Scenario(name='b', steps=[Step(identifier='step_b')], line_number=5),
+        'ab': Scenario(name='ab', steps=[Step(identifier='step_a'), Step(identifier='step_b')], line_number=8),
+    }
+    features = [Feature(name='feature1', source=str(package_directory / 'feature1.feature'),
+                        scenarios={scenarios['a'], scenarios['ab']}),
+                Feature(name='feature2', source=str(package_directory / 'feature2.feature'),
+                        scenarios={scenarios['b']})]
+
+    usage_index = ScenarioUsageIndex()
+    usage_index.add_features(features, step_functions.get)
+    usage_index.add_step_definitions(step_functions.values())
+    usage_index.add_source_directories([str(package_directory)])
+    return usage_index, scenarios
+
+
+def test_affected_scenarios():
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        package_directory = Path(temporary_directory) / 'stepdefs_package'
+        package_directory.mkdir()
+        for file_name, source in STEP_DEFINITION_MODULES.items():
+            (package_directory / file_name).write_text(source)
+        usage_index, scenarios = build_usage_index(package_directory)
+
+        def get_affected_names(*file_names):
+            return {scenario.name for scenario in
+                    usage_index.get_affected_scenarios([str(package_directory / name) for name in file_names])}
+
+        assert get_affected_names('steps_b.py') == {'b', 'ab'}
+        assert get_affected_names('helpers.py') == {'a', 'ab'}
+        assert get_affected_names('feature2.feature') == {'b'}
+        assert get_affected_names('hooks.py') == {'a', 'b', 'ab'}
+        assert get_affected_names('unrelated.txt') == set()
+
+
+def main():
+    test_affected_scenarios()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+
+from karta.core.models.test_catalog import Scenario, Step, Feature
+from karta.core.models.test_execution import RunResult, FeatureResult, ScenarioResult
+from karta.runner.results import combine_run_results, merge_run_results
+from karta.runner.scheduling import partition_scenarios, ScenarioHistory, parse_shard, order_scenarios, \
+    select_within_budget, parse_time_budget
+
+
+def get_sample_scenarios(durations: list[int]) -> list[Scenario]:
+    return [Scenario(name='scenario' + str(index), source='features/sample.feature', line_number=index,
+                     steps=[Step(identifier='step')] * duration) for index, duration in enumerate(durations)]
+
+
+def get_sample_run_result(scenarios: list[Scenario], durations: list[int]) -> RunResult:
+    start_time = datetime(2025, 1, 1)
+    feature_result = FeatureResult(name='feature', source='features/sample.feature')
+    for scenario, duration in zip(scenarios, durations):
+        scenario_result = ScenarioResult(name=scenario.name, source=scenario.source, line_number=scenario.line_number,
+                                         start_time=start_time, end_time=start_time + timedelta(seconds=duration))
+        feature_result.add_scenario_result(scenario_result)
+    run_result = RunResult(run_id='run', seed=1, start_time=start_time)
+    run_result.add_feature_result(feature_result)
+    return run_result
+
+
+def test_longest_processing_time_partition():
+    durations = [7, 5, 4, 3, 3, 2]
+    scenarios = get_sample_scenarios(durations)
+    history = ScenarioHistory()
+    history.add_run_result(get_sample_run_result(scenarios, durations))
+
+    shards = partition_scenarios(scenarios, 2, lambda scenario: history.estimate_duration(scenario, None))
+    assert sorted(sum(durations[scenario.line_number] for scenario in shard) for shard in shards) == [12, 12]
+    assert shards == partition_scenarios(reversed(scenarios), 2,
+                                         lambda scenario: history.estimate_duration(scenario, None))
+
+
+def test_step_count_fallback():
+    scenarios = get_sample_scenarios([6, 1, 2, 3])
+    shards = partition_scenarios(scenarios, 2, lambda scenario: ScenarioHistory().estimate_duration(scenario,
+                                                                                                             None))
+    assert [[scenario.name for scenario in shard] for shard in shards] == [['scenario0'],
+                                                                           ['scenario3', 'scenario2', 'scenario1']]
+
+
+def test_combine_shard_results():
+    scenarios = get_sample_scenarios([1, 1, 1])
+    first_shard_result = get_sample_run_result(scenarios[:2], [1, 2])
+    second_shard_result = get_sample_run_result(scenarios[2:], [3])
+    second_shard_result.feature_results[0].scenario_results[0].successful = False
+
+    combined_result = combine_run_results([first_shard_result, second_shard_result], 'combined')
+    assert len(combined_result.feature_results) == 1
+    assert len(combined_result.feature_results[0].scenario_results) == 3
+    assert not combined_result.feature_results[0].is_successful()
+    assert parse_shard('2/3') == (2, 3)
+
+
+def test_history_of_yaml_scenarios():
+    # Scenarios of YAML features have no source nor line number, they are told apart by feature source and name
+    features = [Feature(name=name, source='features/{}.yaml'.format(name), tags=set(),
+                        scenarios={Scenario(name='scenario', tags=set(), steps=[])}) for name in ['first', 'second']]
+    scenario_features = {next(iter(feature.scenarios)): feature for feature in features}
+    run_result = RunResult(run_id='run', seed=1)
+    start_time = datetime(2025, 1, 1)
+    for feature, duration in zip(features, [1, 5]):
+        feature_result = FeatureResult(name=feature.name, source=feature.source)
+        feature_result.add_scenario_result(ScenarioResult(name='scenario', start_time=start_time,
+                                                          end_time=start_time + timedelta(seconds=duration)))
+        run_result.add_feature_result(feature_result)
+
+    history = ScenarioHistory(scenario_features.get)
+    history.add_run_result(run_result)
+    assert [history.get_duration(scenario) for scenario in scenario_features] == [1.0, 5.0]
+
+
+def test_history_counts_combined_results_once():
+    scenarios = get_sample_scenarios([1, 1])
+    first_run_result = get_sample_run_result(scenarios, [1, 3])
+    first_run_result.feature_results[0].scenario_results[1].successful = False
+    rerun_result = get_sample_run_result(scenarios[1:], [5])
+    for scenario_result in rerun_result.feature_results[0].scenario_results:
+        scenario_result.start_time += timedelta(days=1)
+        scenario_result.end_time += timedelta(days=1)
+
+    history = ScenarioHistory()
+    for run_result in [first_run_result, rerun_result, merge_run_results(first_run_result, rerun_result),
+                       combine_run_results([first_run_result], 'combined')]:
+        history.add_run_result(run_result)
+    assert history.get_duration(scenarios[0]) == 1.0
+    assert history.get_duration(scenarios[1]) == 4.0
+    assert history.get_failure_rate(scenarios[1]) == 0.5
+    assert not history.has_failed_last(scenarios[1])
+
+
+def test_scenario_orderings():
+    scenarios = get_sample_scenarios([3, 1, 2, 4])
+    history = ScenarioHistory()
+    older_run_result = get_sample_run_result(scenarios, [3, 1, 2, 4])
+    older_run_result.feature_results[0].scenario_results[3].successful = False
+    history.add_run_result(older_run_result)
+    newer_run_result = get_sample_run_result(scenarios[:3], [3, 1, 2])
+    for scenario_result in newer_run_result.feature_results[0].scenario_results:
+        scenario_result.start_time += timedelta(days=1)
+        scenario_result.end_time += timedelta(days=1)
+    newer_run_result.feature_results[0].scenario_results[1].successful = False
+    history.add_run_result(newer_run_result)
+
+    def get_order(ordering: str, seed: int = 1) -> list[int]:
+        return [scenario.line_number for scenario in
+                order_scenarios(reversed(scenarios), ordering, history,
+                                lambda scenario: history.estimate_duration(scenario, None), seed)]
+
+    assert get_order('location') == [0, 1, 2, 3]
+    assert get_order('recently_failed') == [1, 3, 0, 2]
+    assert get_order('fastest') == [1, 2, 0, 3]
+    assert get_order('longest') == [3, 0, 2, 1]
+    assert get_order('random', 5) == get_order('random', 5)
+    assert sorted(get_order('random', 5)) == [0, 1, 2, 3]
+
+
+def test_time_budget_selection():
+    durations = [6, 5, 5, 20]
+    scenarios = get_sample_scenarios(durations)
+    values = [7, 5, 5, 100]
+    selected_scenarios, skipped_scenarios = select_within_budget(
+        scenarios, 10, lambda scenario: durations[scenario.line_number], lambda scenario: values[scenario.line_number])
+    # Value per second would take the first scenario alone for a value of 7
+    assert [scenario.line_number for scenario in selected_scenarios] == [1, 2]
+    assert [scenario.line_number for scenario in skipped_scenarios] == [0, 3]
+    assert parse_time_budget('1h30m') == 5400
+    assert parse_time_budget('45m') == 2700
+
+
+def main():
+    test_longest_processing_time_partition()
+    test_step_count_fallback()
+    test_combine_shard_results()
+    test_history_of_yaml_scenarios()
+    test_history_counts_combined_results_once()
+    test_scenario_orderings()
+    test_time_budget_selection()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+from karta.core.models.generic import Context
+from karta.plugins.kriya import TagHookMapping, check_and_run_hooks
+
+
+def test_hooks_resolved_per_tag_set():
+    hook_mapping = TagHookMapping()
+    ran_hooks = []
+
+    def any_tag_hook(context):
+        ran_hooks.append('any')
+
+    def smoke_hook(context):
+        ran_hooks.append('smoke')
+
+    def ui_hook(context):
+        ran_hooks.append('ui')
+
+    hook_mapping.register('.*', any_tag_hook)
+    hook_mapping.register('smoke', smoke_hook)
+    hook_mapping.register('ui_.*', ui_hook)
+
+    check_and_run_hooks(Context(), hook_mapping, {'ui_login', 'smoke'}, 'before scenario')
+    assert ran_hooks == ['any', 'smoke', 'ui']
+    assert hook_mapping.get_hooks(['smoke', 'ui_login']) is hook_mapping.get_hooks({'ui_login', 'smoke'})
+    # Hooks of any tag do not run for untagged scenarios
+    assert hook_mapping.get_hooks(None) == [] and hook_mapping.get_hooks(set()) == []
+    assert hook_mapping.get_hooks({'smoke_test'}) == [any_tag_hook, smoke_hook]
+
+    # Registering a hook resolves the hooks again
+    hook_mapping.register('smoke', ui_hook)
+    assert hook_mapping.get_hooks({'smoke'}) == [any_tag_hook, smoke_hook, ui_hook]
+    assert hook_mapping['smoke'] == [smoke_hook, ui_hook]
+
+
+def test_resolved_hooks_bounded():
+    hook_mapping = TagHookMapping(max_resolved_tag_sets=2)
+
+    def run_hook(context):
+        pass
+
+    hook_mapping.register('.*', run_hook)
+    smoke_hooks = hook_mapping.get_hooks({'smoke'})
+    # Every run has a unique name, the least recently used sets of tags are dropped
+    for run_number in range(10):
+        assert hook_mapping.get_hooks([f'run_{run_number}']) == [run_hook]
+        assert hook_mapping.get_hooks({'smoke'}) is smoke_hooks
+    assert len(hook_mapping.resolved_hooks) == 2
+    assert list(hook_mapping.resolved_hooks) == [frozenset({'run_9'}), frozenset({'smoke'})]
+
+
+def main():
+    test_hooks_resolved_per_tag_set()
+    test_resolved_hooks_bounded()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
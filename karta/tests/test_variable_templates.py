@@ -0,0 +1,52 @@
+from karta.core.models.generic import Context, VarClass
+from karta.core.utils.templating import compile_template, render_template
+from karta.core.utils.variableutil import replace_variables, replace_variables_from_dict, \
+    replace_variables_in_str_array
+
+
+def test_compiled_template():
+    template = compile_template('Hello ${name}, ${greeting}!')
+    assert template.parts == ('Hello ', 'name', ', ', 'greeting', '!')
+    assert template.variable_names == ('name', 'greeting')
+    # Templates are compiled once per string
+    assert compile_template('Hello ${name}, ${greeting}!') is template
+
+    assert template.render({'name': 'Karta'}, {'name': 'ignored', 'greeting': 'welcome'}) == 'Hello Karta, welcome!'
+    assert template.render({'name': 'Karta'}) == 'Hello Karta, ${greeting}!'
+    assert render_template('No variables', {'name': 'Karta'}) == 'No variables'
+    assert render_template('<<name>>', {'name': 'Karta'}, variable_prefix='<<', variable_suffix='>>') == 'Karta'
+
+
+def test_dotted_paths():
+    properties = {'browser': {'name': 'chrome', 'args': ['--headless']}, 'web.timeout': 10}
+    context = Context(properties=VarClass(properties), data={'users': [{'name': 'admin'}]})
+    assert render_template('${properties.browser.name} ${properties.browser.args.0}', context) == 'chrome --headless'
+    assert render_template('${data.users.0.name} ${data.users.1.name}', context) == 'admin ${data.users.1.name}'
+    # Keys with dots are found before paths
+    assert render_template('${web.timeout}', properties) == '10'
+    assert render_template('${properties.browser.name.upper}', context) == '${properties.browser.name.upper}'
+
+
+def test_replace_variables_priority():
+    context = Context(user='context user')
+    step_data = {'user': 'step user', 'password': 'secret'}
+    environment = {'password': 'environment password', 'home': '/home/karta'}
+    assert replace_variables('${user}:${password}@${home}', context, step_data, environment) == \
+           'context user:secret@/home/karta'
+    # Replaced values are not replaced again
+    assert replace_variables_from_dict('${a}', {'a': '${b}', 'b': 'value'}) == '${b}'
+    assert context.replace_variables_in_string('${user}') == 'context user'
+    assert replace_variables_in_str_array(['${user}', '${home}'], context, None, environment) == ['context user',
+                                                                                                 '/home/karta']
+
+
+def main():
+    test_compiled_template()
+    test_dotted_paths()
+    test_replace_variables_priority()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from karta.core.utils.waitutil import Backoff, wait_for_conditions, sleep_until_notified, wait_until
+
+
+def test_backoff():
+    backoff = Backoff(0.01, 0.05, jitter=0.0)
+    assert [round(backoff.next_interval(), 3) for _ in range(5)] == [0.01, 0.02, 0.04, 0.05, 0.05]
+    jittered_backoff = Backoff(1.0, 1.0, jitter=0.1)
+    assert all(0.9 <= jittered_backoff.next_interval() <= 1.1 for _ in range(100))
+
+
+def test_wait_for_any_and_all():
+    check_counts = [0, 0]
+
+    def never() -> bool:
+        check_counts[0] += 1
+        return False
+
+    def third_check() -> tuple[bool, str]:
+        check_counts[1] += 1
+        return check_counts[1] >= 3, 'value'
+
+    assert wait_for_conditions([never, third_check], 1.0, 0.01) == (True, [False, (True, 'value')])
+    assert check_counts == [3, 3]
+
+    # Waiting for all stops checking at the first unmet condition of a poll
+    assert wait_for_conditions([never, third_check], 0.05, 0.01, wait_for_all=True) == (False, [False, None])
+    assert wait_for_conditions([lambda: True, lambda: (True, 1)], 0.05, wait_for_all=True) == (True, [True, (True, 1)])
+
+    def failing_condition() -> bool:
+        raise KeyError('failed')
+
+    assert wait_for_conditions([failing_condition], 0.0, ignored_exceptions=(KeyError,)) == (False, [False])
+    assert wait_until(lambda value: (False, value), 0.05, 0.01, 5) == (False, 5)
+
+
+def test_wake_on_notification():
+    wake_event = threading.Event()
+    values = []
+    threading.Timer(0.1, lambda: (values.append(1), wake_event.set())).start()
+
+    start_time = time.monotonic()
+    condition_met, _ = wait_for_conditions([lambda: bool(values)], 5.0, 5.0, initial_interval=5.0,
+                                           sleep_function=sleep_until_notified(wake_event))
+    assert condition_met
+    assert time.monotonic() - start_time < 2.0
+
+
+def main():
+    test_backoff()
+    test_wait_for_any_and_all()
+    test_wake_on_notification()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
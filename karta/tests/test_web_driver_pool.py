@@ -0,0 +1,82 @@
+import time
+
+from karta.web.models import WebDriverConfig
+from karta.web.pool import WebDriverPool
+
+
+class SampleDriver:
+    def __init__(self, index: int):
+        self.index = index
+        self.healthy = True
+        self.reset_count = 0
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+def get_sample_pool() -> tuple[WebDriverPool, list[SampleDriver]]:
+    created_drivers = []
+
+    def create_driver(webdriver_config: WebDriverConfig) -> SampleDriver:
+        created_drivers.append(SampleDriver(len(created_drivers)))
+        return created_drivers[-1]
+
+    def reset_driver(driver: SampleDriver):
+        driver.reset_count += 1
+
+    return WebDriverPool(create_driver, reset_driver, lambda driver: driver.healthy), created_drivers
+
+
+def test_session_reuse_and_eviction():
+    pool, created_drivers = get_sample_pool()
+    webdriver_config = WebDriverConfig(headless=True, reuse_session=True)
+
+    driver = pool.acquire(webdriver_config)
+    pool.release(driver)
+    assert driver.reset_count == 1
+    assert pool.acquire(WebDriverConfig(headless=True, reuse_session=True)) is driver
+    assert pool.acquire(WebDriverConfig(headless=False, reuse_session=True)) is not driver
+
+    pool.release(driver)
+    driver.healthy = False
+    assert pool.acquire(webdriver_config) is not driver
+    assert driver.quit_called
+    assert len(created_drivers) == 3
+
+
+def test_max_sessions_and_prewarm():
+    pool, created_drivers = get_sample_pool()
+    webdriver_config = WebDriverConfig(reuse_session=True, max_sessions=1)
+    driver = pool.acquire(webdriver_config)
+    try:
+        pool.acquire(webdriver_config, timeout=0.1)
+        assert False, "Acquiring more than the maximum sessions must time out"
+    except TimeoutError:
+        pass
+    pool.release(driver)
+    assert pool.acquire(webdriver_config, timeout=0.1) is driver
+
+    prewarmed_config = WebDriverConfig(reuse_session=True, prewarm_sessions=3)
+    prewarmed_driver = pool.acquire(prewarmed_config)
+    deadline = time.monotonic() + 5
+    while len(created_drivers) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(created_drivers) == 4
+    # The prewarmed sessions are handed out without starting more
+    assert len({prewarmed_driver, pool.acquire(prewarmed_config), pool.acquire(prewarmed_config)}) == 3
+    assert len(created_drivers) == 4
+    pool.release(prewarmed_driver)
+    pool.close_all()
+    assert prewarmed_driver.quit_called
+
+
+def main():
+    test_session_reuse_and_eviction()
+    test_max_sessions_and_prewarm()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
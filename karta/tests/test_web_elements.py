@@ -0,0 +1,205 @@
+from selenium.common import StaleElementReferenceException, NoSuchElementException
+from selenium.webdriver import Remote
+
+from karta.web.factory import WebAUT, Page
+from karta.web.locators import parse_page_locators
+from karta.web.models import WebDriverConfig
+
+
+class SampleWebElement:
+    def __init__(self, driver: 'SampleDriver', selector: str):
+        self.driver = driver
+        self.selector = selector
+        self.document = driver.document
+        self.clicks = 0
+
+    def check_stale(self):
+        self.driver.calls.append(('use', self.selector))
+        if self.document != self.driver.document:
+            raise StaleElementReferenceException("stale element")
+
+    def is_displayed(self) -> bool:
+        self.check_stale()
+        return True
+
+    def is_enabled(self) -> bool:
+        self.check_stale()
+        return True
+
+    def click(self):
+        self.check_stale()
+        self.clicks += 1
+
+    @property
+    def text(self) -> str:
+        self.check_stale()
+        return self.selector + ' text'
+
+    @property
+    def shadow_root(self) -> 'SampleShadowRoot':
+        self.check_stale()
+        return SampleShadowRoot(self.driver, self.selector)
+
+
+class SampleShadowRoot:
+    def __init__(self, driver: 'SampleDriver', host_selector: str):
+        self.driver = driver
+        self.host_selector = host_selector
+
+    def find_element(self, by: str, value: str) -> SampleWebElement:
+        return self.driver.find_element(by, self.host_selector + ' > ' + value)
+
+
+class SampleSwitchTo:
+    def __init__(self, driver: 'SampleDriver'):
+        self.driver = driver
+
+    def default_content(self):
+        self.driver.calls.append(('switch', None))
+        self.driver.frame = None
+
+    def frame(self, frame: SampleWebElement):
+        frame.check_stale()
+        self.driver.calls.append(('switch', frame.selector))
+        self.driver.frame = frame.selector
+
+
+class SampleDriver(Remote):
+    def __init__(self):
+        self.document = 0
+        self.calls = []
+        # Selector of the frame the driver is switched to, None for the top level document
+        self.frame = None
+        self.sample_switch_to = SampleSwitchTo(self)
+
+    @property
+    def switch_to(self) -> SampleSwitchTo:
+        return self.sample_switch_to
+
+    def execute_script(self, script: str, *args):
+        self.calls.append(('script', args))
+        return {element_name: None for element_name in args[1]}
+
+    def find_element(self, by: str = None, value: str = None) -> SampleWebElement:
+        self.calls.append(('find', value))
+        if value == 'missing' or (value == 'framed button' and self.frame != 'frame'):
+            raise NoSuchElementException("no such element")
+        return SampleWebElement(self, value)
+
+
+class SamplePage(Page):
+    def validate(self) -> bool:
+        return True
+
+
+class SampleApp(WebAUT):
+    def initialize_application(self) -> SamplePage:
+        self.driver = SampleDriver()
+        return SamplePage(self)
+
+
+def get_sample_page() -> SamplePage:
+    application = SampleApp(WebDriverConfig())
+    application.page_locators = parse_page_locators({'SamplePage': {
+        'button': {'selector': 'button'},
+        'missing': {'selector': 'missing'},
+        'frame': {'selector': 'frame'},
+        'framed_button': {'selector': 'framed button', 'iframe': 'frame'},
+        'host': {'selector': 'host', 'iframe': 'frame'},
+        'shadow_button': {'selector': 'shadow button', 'shadow_root': 'host'},
+    }})
+    return application.initialize_application()
+
+
+def test_element_handle_cached():
+    page = get_sample_page()
+    driver = page.driver
+    page.button.click()
+    page.button.click()
+    assert page.button.get_text() == 'button text'
+    assert page.button.is_displayed()
+    assert [call for call in driver.calls if call[0] == 'find'] == [('find', 'button')]
+    assert not page.missing.is_displayed()
+
+
+def test_stale_element_found_again():
+    page = get_sample_page()
+    driver = page.driver
+    page.button.click()
+    # Navigation turns the cached handles stale
+    driver.document += 1
+    page.button.click()
+    assert [call for call in driver.calls if call[0] == 'find'] == [('find', 'button'), ('find', 'button')]
+    assert page.button.get_cached_element().clicks == 1
+
+
+def test_frame_and_shadow_root_context_cached():
+    page = get_sample_page()
+    driver = page.driver
+    page.framed_button.click()
+    page.shadow_button.click()
+    assert page.shadow_button.get_text() == 'host > shadow button text'
+    # A new page switches to the top level document first, as the frame the driver is in is not known
+    assert [call for call in driver.calls if call[0] != 'use'] == [
+        ('switch', None), ('find', 'frame'), ('switch', 'frame'), ('find', 'framed button'), ('find', 'host'),
+        ('find', 'host > shadow button')]
+
+    # Elements of the top level document switch back out of the frame, and into it again when needed
+    driver.calls.clear()
+    page.button.click()
+    page.framed_button.click()
+    assert [call for call in driver.calls if call[0] != 'use'] == [
+        ('switch', None), ('find', 'button'), ('switch', 'frame')]
+
+
+def test_frame_switched_again_after_navigation():
+    page = get_sample_page()
+    driver = page.driver
+    page.framed_button.click()
+    # A refresh leaves the driver in the top level document while the page still has it in the frame
+    driver.frame = None
+    page.framed_button.clear_cache()
+    driver.calls.clear()
+    page.framed_button.click()
+    assert [call for call in driver.calls if call[0] != 'use'] == [
+        ('find', 'framed button'), ('switch', None), ('switch', 'frame'), ('find', 'framed button')]
+
+    # A new page does not trust the frame the driver was in
+    driver.calls.clear()
+    SamplePage(page.application).framed_button.click()
+    assert [call for call in driver.calls if call[0] != 'use'] == [
+        ('switch', None), ('find', 'frame'), ('switch', 'frame'), ('find', 'framed button')]
+
+
+def test_query_in_one_script_call():
+    page = get_sample_page()
+    driver = page.driver
+    assert page.query(['button', 'shadow_button'], ['text', 'displayed']) == {'button': None, 'shadow_button': None}
+    script_calls = [call for call in driver.calls if call[0] == 'script']
+    assert len(script_calls) == 1
+    locators, element_names, properties = script_calls[0][1]
+    # The iframe and shadow host of an element are sent to be found by the script too
+    assert sorted(locators.keys()) == ['button', 'frame', 'host', 'shadow_button']
+    assert locators['host'] == {'by': 'css selector', 'selector': 'host', 'multiple': False, 'iframe': 'frame',
+                                'shadow_root': None}
+    assert element_names == ['button', 'shadow_button']
+    assert properties == ['text', 'displayed']
+    try:
+        page.query(['undefined'], ['text'])
+        assert False, "Undefined element was queried"
+    except ValueError:
+        pass
+
+
+def main():
+    test_element_handle_cached()
+    test_stale_element_found_again()
+    test_frame_and_shadow_root_context_cached()
+    test_frame_switched_again_after_navigation()
+    test_query_in_one_script_call()
+
+    print("All tests have passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,12 @@
 import abc
+import atexit
 import os
-from typing import Optional
+import time
+from typing import Any, Callable, Optional, TypeVar
 from typing import Union
 
-import yaml
-from selenium.common import NoSuchElementException, StaleElementReferenceException, TimeoutException
+from selenium.common import NoSuchElementException, StaleElementReferenceException, TimeoutException, \
+    WebDriverException
 from selenium.webdriver import Proxy
 from selenium.webdriver import Remote
 from selenium.webdriver.chrome.options import Options as ChromeOptions
@@ -17,14 +19,144 @@ from selenium.webdriver.edge.webdriver import WebDriver as EdgeDriver
 from selenium.webdriver.firefox.options import Options as FirefoxOptions
 from selenium.webdriver.firefox.service import Service as FirefoxService
 from selenium.webdriver.firefox.webdriver import WebDriver as FirefoxDriver
+from selenium.webdriver.remote.shadowroot import ShadowRoot
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.safari.options import Options as SafariOptions
 from selenium.webdriver.safari.service import Service as SafariService
 from selenium.webdriver.safari.webdriver import WebDriver as SafariDriver
-from selenium.webdriver.support import expected_conditions
-from selenium.webdriver.support.ui import WebDriverWait
 
+from karta.core.utils.waitutil import wait_for_conditions
+from karta.web.locators import locator_repository
 from karta.web.models import WebDriverConfig, Browser, Locator
+from karta.web.pool import WebDriverPool
+
+T = TypeVar('T')
+
+# Current frame of an application when it is not known which document the driver is switched to
+UNKNOWN_FRAME = object()
+
+# Intervals between checks of element waits, backing off from the initial to the longest interval
+ELEMENT_INITIAL_CHECK_INTERVAL = 0.05
+ELEMENT_CHECK_INTERVAL = 1.0
+
+# Asynchronous script returning when the document changes, no sooner than a minimum or else after a timeout, both in
+# milliseconds
+WAIT_FOR_DOCUMENT_CHANGE_SCRIPT = """
+const [timeout, minimumWait, done] = arguments;
+const startTime = Date.now();
+let finished = false;
+let timer = null;
+const observer = new MutationObserver(() => {
+    clearTimeout(timer);
+    timer = setTimeout(finish, Math.max(0, minimumWait - (Date.now() - startTime)));
+});
+
+function finish() {
+    if (!finished) {
+        finished = true;
+        observer.disconnect();
+        done(true);
+    }
+}
+
+observer.observe(document, {attributes: true, childList: true, characterData: true, subtree: true});
+timer = setTimeout(finish, timeout);
+"""
+
+# Reads properties of page elements in one round trip. Takes the locators of the elements and of their iframes and
+# shadow hosts by element name, the names of the elements to read and the properties to read.
+QUERY_ELEMENTS_SCRIPT = """
+const [locators, elementNames, properties] = arguments;
+const foundElements = {};
+
+function findAll(root, by, selector) {
+    switch (by) {
+        case 'id':
+            return root.querySelectorAll('[id="' + CSS.escape(selector) + '"]');
+        case 'name':
+            return root.querySelectorAll('[name="' + CSS.escape(selector) + '"]');
+        case 'class name':
+            return root.querySelectorAll('.' + CSS.escape(selector));
+        case 'tag name':
+        case 'css selector':
+            return root.querySelectorAll(selector);
+        case 'xpath': {
+            const ownerDocument = root.ownerDocument || root;
+            const result = ownerDocument.evaluate(selector, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            const nodes = [];
+            for (let i = 0; i < result.snapshotLength; i++) {
+                nodes.push(result.snapshotItem(i));
+            }
+            return nodes;
+        }
+        case 'link text':
+        case 'partial link text':
+            return Array.from(root.querySelectorAll('a')).filter(link => {
+                const text = link.innerText.trim();
+                return by === 'link text' ? text === selector : text.includes(selector);
+            });
+    }
+    return [];
+}
+
+function getRoot(locator) {
+    // Iframe takes precedence over shadow root, cross origin iframes and closed shadow roots can't be read
+    if (locator.iframe) {
+        const frame = getElements(locator.iframe)[0];
+        return frame ? frame.contentDocument : null;
+    }
+    if (locator.shadow_root) {
+        const host = getElements(locator.shadow_root)[0];
+        return host ? host.shadowRoot : null;
+    }
+    return document;
+}
+
+function getElements(name) {
+    if (!(name in foundElements)) {
+        const locator = locators[name];
+        const root = getRoot(locator);
+        foundElements[name] = root ? Array.from(findAll(root, locator.by, locator.selector)) : [];
+    }
+    return foundElements[name];
+}
+
+function readProperty(element, property) {
+    switch (property) {
+        case 'text':
+            return element.innerText;
+        case 'displayed': {
+            const style = element.ownerDocument.defaultView.getComputedStyle(element);
+            return style.visibility !== 'hidden' && style.display !== 'none' &&
+                (element.offsetWidth > 0 || element.offsetHeight > 0 || element.getClientRects().length > 0);
+        }
+        case 'enabled':
+            return !element.disabled;
+        case 'selected':
+            return !!(element.checked || element.selected);
+        case 'tag_name':
+            return element.tagName.toLowerCase();
+    }
+    const value = element[property];
+    if (value === undefined || value === null || typeof value === 'object' || typeof value === 'function') {
+        return element.getAttribute(property);
+    }
+    return value;
+}
+
+const result = {};
+for (const name of elementNames) {
+    const values = getElements(name).map(element => {
+        const elementValues = {};
+        for (const property of properties) {
+            elementValues[property] = readProperty(element, property);
+        }
+        return elementValues;
+    });
+    result[name] = locators[name].multiple ? values : (values.length ? values[0] : null);
+}
+return result;
+"""
 
 HEADLESS = "--headless"
 ALLOW_ORIGINS_ = "--remote-allow-origins=*"
@@ -127,6 +259,10 @@ def create_web_driver(webdriver_config: WebDriverConfig):
     return webdriver
 
 
+web_driver_pool = WebDriverPool(create_web_driver)
+atexit.register(web_driver_pool.close_all)
+
+
 class PageException(Exception):
     """Custom exception for page-related errors."""
 
@@ -136,27 +272,174 @@ class PageException(Exception):
 
 
 class Element:
+    """
+    Element of a page found by its locator. The web element handle, and the shadow root of a shadow host, are cached
+    and found again only when they turn stale, which is also how navigation away from the page shows.
+    Elements of a page are found within their iframe or shadow root locators of the page.
+    """
     driver: Union[ChromeDriver, FirefoxDriver, EdgeDriver, SafariDriver, Remote] = None
     locator: Locator
-    _element: WebElement
+    page: Optional['Page'] = None
+    _element: Optional[WebElement] = None
+    _shadow_root: Optional[ShadowRoot] = None
 
-    def __init__(self, locator: Locator, driver: Union[ChromeDriver, FirefoxDriver, EdgeDriver, SafariDriver]):
+    def __init__(self, locator: Locator, driver: Union[ChromeDriver, FirefoxDriver, EdgeDriver, SafariDriver],
+                 page: Optional['Page'] = None):
         if not locator or not isinstance(locator, Locator):
             raise TypeError("locator must be an instance of Locator")
         if not driver or not isinstance(driver, (ChromeDriver, FirefoxDriver, EdgeDriver, SafariDriver, Remote)):
             raise ValueError("driver must be provided of type WebDriver")
         self.locator = locator
         self.driver = driver
+        self.page = page
+
+    def get_frame(self) -> Optional['Element']:
+        """
+        Get the iframe element of the page the element is in, directly or through its shadow root host.
+        :return: The iframe element or None if the element is in the top level document
+        """
+        if not self.page:
+            return None
+        if self.locator.iframe:
+            return getattr(self.page, self.locator.iframe)
+        if self.locator.shadow_root:
+            return getattr(self.page, self.locator.shadow_root).get_frame()
+        return None
+
+    def get_search_context(self) -> Union[Remote, ShadowRoot]:
+        """
+        Switch to the iframe of the element and get the driver or shadow root to find the element in.
+        :return:
+        """
+        if self.page:
+            self.page.switch_to_frame(self.get_frame())
+            # Iframe takes precedence over shadow root
+            if self.locator.shadow_root and not self.locator.iframe:
+                return getattr(self.page, self.locator.shadow_root).get_shadow_root()
+        return self.driver
+
+    def get_cached_element(self) -> WebElement:
+        """
+        Get the cached web element, finding it if it is not found yet. An element not found after the switch to its
+        frame was skipped is looked for again after switching, as the driver may have left the frame on a refresh or
+        navigation.
+        :return:
+        """
+        frame_switch_skipped = self._element is None and self.page is not None and (
+                self.page.application.current_frame is self.get_frame())
+        search_context = self.get_search_context()
+        if self._element is None:
+            try:
+                self._element = search_context.find_element(*self.locator.get_selenium_by())
+            except NoSuchElementException:
+                if not frame_switch_skipped:
+                    raise
+                self.page.application.current_frame = UNKNOWN_FRAME
+                search_context = self.get_search_context()
+                self._element = search_context.find_element(*self.locator.get_selenium_by())
+        return self._element
+
+    def get_shadow_root(self) -> ShadowRoot:
+        """
+        Get the cached shadow root of the element as a shadow host.
+        :return:
+        """
+        if self._shadow_root is None:
+            self._shadow_root = self.get_cached_element().shadow_root
+        return self._shadow_root
+
+    def clear_cache(self):
+        self._element = None
+        self._shadow_root = None
+
+    def reset_cache(self):
+        """
+        Forget the cached web element after it turned stale. A stale element usually means the page changed or
+        navigated, so the handles of all elements of the page are forgotten.
+        :return:
+        """
+        if self.page:
+            self.page.reset_element_cache()
+        else:
+            self.clear_cache()
+
+    def wait_for_element(self, condition: Optional[Callable[[WebElement], bool]] = None,
+                         timeout: int = 10) -> WebElement:
+        """
+        Wait for the element to be found and meet a condition, finding it again if it turns stale while waiting.
+        :param condition: The condition on the web element, None to wait for the element to be present
+        :param timeout:
+        :return: The web element
+        """
+
+        def element_condition() -> Union[tuple[bool, WebElement], bool]:
+            # A stale element is found again right away
+            for _ in range(2):
+                try:
+                    element = self.get_cached_element()
+                    return (True, element) if not condition or condition(element) else False
+                except StaleElementReferenceException:
+                    self.reset_cache()
+            return False
+
+        condition_met, condition_outcomes = wait_for_conditions(
+            [element_condition], timeout, ELEMENT_CHECK_INTERVAL, initial_interval=ELEMENT_INITIAL_CHECK_INTERVAL,
+            sleep_function=self.wait_for_document_change, ignored_exceptions=(NoSuchElementException,))
+        if not condition_met:
+            raise TimeoutException(f"Element {self.locator} did not meet the wait condition in {timeout} seconds")
+        return condition_outcomes[0][1]
+
+    def wait_for_document_change(self, interval: float):
+        """
+        Sleep until the document of the element changes or the interval passes, so that waits check the element again
+        as soon as the page changes instead of at fixed intervals.
+        :param interval: Seconds to wait at most
+        :return:
+        """
+        try:
+            self.driver.execute_async_script(WAIT_FOR_DOCUMENT_CHANGE_SCRIPT, int(interval * 1000),
+                                             int(ELEMENT_INITIAL_CHECK_INTERVAL * 1000))
+        except WebDriverException:
+            # Navigation ends the script early
+            pass
+
+    def run_on_element(self, action: Callable[[WebElement], T], condition: Optional[Callable[[WebElement], bool]] = None,
+                       timeout: Optional[int] = 10) -> T:
+        """
+        Run an action on the web element once it meets a condition, retrying once with the element found again if the
+        cached web element turned stale.
+        :param action: The action on the web element
+        :param condition: The condition on the web element to wait for
+        :param timeout: Seconds to wait for the condition, None to run the action on the element without waiting
+        :return: The return value of the action
+        """
+        for retry in (False, True):
+            try:
+                if timeout is None:
+                    element = self.get_cached_element()
+                else:
+                    element = self.wait_for_element(condition, timeout)
+                return action(element)
+            except StaleElementReferenceException:
+                if retry:
+                    raise
+                self.reset_cache()
+
+    @staticmethod
+    def is_visible(element: WebElement) -> bool:
+        return element.is_displayed()
+
+    @staticmethod
+    def is_clickable(element: WebElement) -> bool:
+        return element.is_displayed() and element.is_enabled()
 
-    # TODO: All methods need to handle iframe and shadow roots
     def wait_for_visibility(self, timeout: int = 10) -> bool:
         """
         Wait for the element to be visible on the page.
         :param timeout:
         :return:
         """
-        WebDriverWait(self.driver, timeout).until(
-            expected_conditions.visibility_of_element_located((self.locator.get_selenium_by())))
+        self.wait_for_element(self.is_visible, timeout)
         return True
 
     def wait_for_clickable(self, timeout: int = 10) -> bool:
@@ -165,8 +448,7 @@ class Element:
         :param timeout:
         :return:
         """
-        WebDriverWait(self.driver, timeout).until(
-            expected_conditions.element_to_be_clickable((self.locator.get_selenium_by())))
+        self.wait_for_element(self.is_clickable, timeout)
         return True
 
     def wait_for_invisibility(self, timeout: int = 10) -> bool:
@@ -175,39 +457,55 @@ class Element:
         :param timeout:
         :return:
         """
-        WebDriverWait(self.driver, timeout).until(
-            expected_conditions.invisibility_of_element_located((self.locator.get_selenium_by())))
+
+        def is_invisible() -> bool:
+            try:
+                return not self.get_cached_element().is_displayed()
+            except NoSuchElementException:
+                return True
+            except StaleElementReferenceException:
+                self.reset_cache()
+                return False
+
+        condition_met, _ = wait_for_conditions([is_invisible], timeout, ELEMENT_CHECK_INTERVAL,
+                                               initial_interval=ELEMENT_INITIAL_CHECK_INTERVAL,
+                                               sleep_function=self.wait_for_document_change)
+        if not condition_met:
+            raise TimeoutException(f"Element {self.locator} did not become invisible in {timeout} seconds")
         return True
 
-    def click(self):
+    @staticmethod
+    def run_timed(action: Callable[[], Any]) -> float:
+        """
+        Run an action, taking the time it was triggered at
+        :param action: The action
+        :return: time.perf_counter() just before the action, such as the trigger time of a response time measurement
+        """
+        trigger_time = time.perf_counter()
+        action()
+        return trigger_time
+
+    def click(self) -> float:
         """
         Click the element.
-        :return:
+        :return: time.perf_counter() just before the click, after waiting for the element
         """
-        self.wait_for_visibility()
-        self.wait_for_clickable()
-        self._element = self.driver.find_element(*self.locator.get_selenium_by())
-        self._element.click()
+        return self.run_on_element(lambda element: self.run_timed(element.click), self.is_clickable)
 
-    def send_keys(self, keys: str):
+    def send_keys(self, keys: str) -> float:
         """
         Send keys to the element.
         :param keys:
-        :return:
+        :return: time.perf_counter() just before sending the keys, after waiting for the element
         """
-        self.wait_for_visibility()
-        self.wait_for_clickable()
-        self._element = self.driver.find_element(*self.locator.get_selenium_by())
-        self._element.send_keys(keys)
+        return self.run_on_element(lambda element: self.run_timed(lambda: element.send_keys(keys)), self.is_clickable)
 
     def get_text(self) -> str:
         """
         Get the text of the element.
         :return:
         """
-        self.wait_for_visibility()
-        self._element = self.driver.find_element(*self.locator.get_selenium_by())
-        return self._element.text
+        return self.run_on_element(lambda element: element.text, self.is_visible)
 
     def get_attribute(self, attribute: str) -> str:
         """
@@ -215,9 +513,7 @@ class Element:
         :param attribute:
         :return:
         """
-        self.wait_for_visibility()
-        self._element = self.driver.find_element(*self.locator.get_selenium_by())
-        return self._element.get_attribute(attribute)
+        return self.run_on_element(lambda element: element.get_attribute(attribute), self.is_visible)
 
     def is_displayed(self) -> bool:
         """
@@ -225,8 +521,7 @@ class Element:
         :return:
         """
         try:
-            self._element = self.driver.find_element(*self.locator.get_selenium_by())
-            return self._element.is_displayed()
+            return self.run_on_element(lambda element: element.is_displayed(), timeout=None)
         except (StaleElementReferenceException, NoSuchElementException, TimeoutException) as _:
             return False
 
@@ -236,8 +531,7 @@ class Element:
         :return:
         """
         try:
-            self._element = self.driver.find_element(*self.locator.get_selenium_by())
-            return self._element.is_enabled()
+            return self.run_on_element(lambda element: element.is_enabled(), timeout=None)
         except (StaleElementReferenceException, NoSuchElementException, TimeoutException) as _:
             return False
 
@@ -247,8 +541,7 @@ class Element:
         :return:
         """
         try:
-            self._element = self.driver.find_element(*self.locator.get_selenium_by())
-            return self._element.is_selected()
+            return self.run_on_element(lambda element: element.is_selected(), timeout=None)
         except (StaleElementReferenceException, NoSuchElementException, TimeoutException) as _:
             return False
 
@@ -257,9 +550,7 @@ class Element:
         Get the web element.
         :return:
         """
-        self.wait_for_visibility()
-        self._element = self.driver.find_element(*self.locator.get_selenium_by())
-        return self._element
+        return self.wait_for_element(self.is_visible)
 
     def get_elements(self) -> list[WebElement]:
         """
@@ -267,7 +558,7 @@ class Element:
         :return:
         """
         self.wait_for_visibility()
-        elements = self.driver.find_elements(*self.locator.get_selenium_by())
+        elements = self.get_search_context().find_elements(*self.locator.get_selenium_by())
         return elements if elements else []
 
     def get_screenshot(self, filename: str):
@@ -276,27 +567,21 @@ class Element:
         :param filename:
         :return:
         """
-        self.wait_for_visibility()
-        self._element = self.driver.find_element(*self.locator.get_selenium_by())
-        self._element.screenshot(filename)
+        self.run_on_element(lambda element: element.screenshot(filename), self.is_visible)
 
     def get_screenshot_as_base64(self) -> str:
         """
         Get the screenshot of the element as base64.
         :return:
         """
-        self.wait_for_visibility()
-        self._element = self.driver.find_element(*self.locator.get_selenium_by())
-        return self._element.screenshot_as_base64
+        return self.run_on_element(lambda element: element.screenshot_as_base64, self.is_visible)
 
     def get_screenshot_as_png(self) -> bytes:
         """
         Get the screenshot of the element as png.
         :return:
         """
-        self.wait_for_visibility()
-        self._element = self.driver.find_element(*self.locator.get_selenium_by())
-        return self._element.screenshot_as_png
+        return self.run_on_element(lambda element: element.screenshot_as_png, self.is_visible)
 
     def save_screenshot_to_file(self, filename: str) -> bool:
         """
@@ -304,9 +589,7 @@ class Element:
         :param filename:
         :return:
         """
-        self.wait_for_visibility()
-        self._element = self.driver.find_element(*self.locator.get_selenium_by())
-        return self._element.screenshot(filename)
+        return self.run_on_element(lambda element: element.screenshot(filename), self.is_visible)
 
     def __str__(self):
         return f"Element(locator={self.locator}, driver={self.driver})"
@@ -324,7 +607,7 @@ class Element:
 
 
 class Page(metaclass=abc.ABCMeta):
-    elements: Optional[dict[str, Element]] = {}
+    elements: Optional[dict[str, Element]] = None
     driver: Union[ChromeDriver, FirefoxDriver, EdgeDriver, SafariDriver, Remote] = None
     application: Optional['WebAUT'] = None
 
@@ -336,12 +619,12 @@ class Page(metaclass=abc.ABCMeta):
         self.driver = application.driver
         self.application = application
         self.application.current_page = self
+        # A new page usually follows a navigation, which leaves the driver in an unknown frame
+        self.application.current_frame = UNKNOWN_FRAME
 
-        # For each locator from WebAUT page_locators, create an Element instance
-        for element_name, locator in self.application.page_locators[self.__class__.__name__].items():
-            if not isinstance(locator, Locator):
-                raise TypeError(f"Locator for {element_name} must be an instance of Locator")
-            self.elements[element_name] = Element(locator, self.driver)
+        # Elements are created from the WebAUT page_locators on first access
+        self.locators = self.application.page_locators[self.__class__.__name__]
+        self.elements = {}
 
         if not self.validate():
             raise PageException(f"Page validation failed for {self.__class__.__name__}")
@@ -349,17 +632,74 @@ class Page(metaclass=abc.ABCMeta):
     def __getattr__(self, attr):
         """
         This method is called when an attribute is not found in the instance.
-        It allows accessing elements by their names.
+        It allows accessing elements by their names, creating the element on first access.
         :param attr:
         :return:
         """
-        if attr in self.__dict__:
-            return self.__dict__[attr]
+        if attr in ('locators', 'elements'):
+            raise AttributeError(f"Attribute '{attr}' not found in page class {self.__class__.__name__}")
         elif attr in self.elements:
             return self.elements[attr]
+        elif attr in self.locators:
+            element = Element(self.locators[attr], self.driver, self)
+            self.elements[attr] = element
+            return element
         else:
             raise AttributeError(f"Attribute or element '{attr}' not found in page class {self.__class__.__name__}")
 
+    def switch_to_frame(self, frame: Optional[Element]):
+        """
+        Switch the driver to the document of an iframe element of the page, unless the driver is already in it.
+        :param frame: The iframe element, None for the top level document
+        :return:
+        """
+        if self.application.current_frame is frame:
+            return
+        if frame is None:
+            self.driver.switch_to.default_content()
+        else:
+            self.driver.switch_to.frame(frame.get_cached_element())
+        self.application.current_frame = frame
+
+    def reset_element_cache(self):
+        """
+        Forget the cached web elements and iframe of the page, after the page changed or navigated.
+        :return:
+        """
+        for element in self.elements.values():
+            element.clear_cache()
+        self.application.current_frame = UNKNOWN_FRAME
+
+    def query(self, element_names: list[str], properties: list[str]) -> dict[
+        str, Union[dict[str, object], list[dict[str, object]], None]]:
+        """
+        Read properties of many elements of the page in one script call, instead of a WebDriver call for each element
+        and property.
+        Properties are 'text', 'displayed', 'enabled', 'selected', 'tag_name', or else the name of a DOM property or
+        attribute. Elements in cross origin iframes or closed shadow roots can't be read and are not found.
+        :param element_names: The names of the elements of the page
+        :param properties: The properties to read of each element
+        :return: The properties of each element by element name, a list of them for locators of multiple elements and
+                 None for elements not found
+        """
+        locators = {}
+        pending_element_names = list(element_names)
+        while pending_element_names:
+            element_name = pending_element_names.pop()
+            if element_name in locators:
+                continue
+            if element_name not in self.locators:
+                raise ValueError(f"Element '{element_name}' not found in page class {self.__class__.__name__}")
+            locator = self.locators[element_name]
+            by, selector = locator.get_selenium_by()
+            locators[element_name] = {'by': by, 'selector': selector, 'multiple': locator.multiple,
+                                      'iframe': locator.iframe, 'shadow_root': locator.shadow_root}
+            # The iframes and shadow hosts of the elements are found by the script too
+            pending_element_names.extend(reference for reference in (locator.iframe, locator.shadow_root) if reference)
+
+        self.switch_to_frame(None)
+        return self.driver.execute_script(QUERY_ELEMENTS_SCRIPT, locators, list(element_names), list(properties))
+
     @abc.abstractmethod
     def validate(self) -> bool:
         raise NotImplementedError
@@ -374,6 +714,8 @@ class WebAUT(metaclass=abc.ABCMeta):
 
     driver: Union[ChromeDriver, FirefoxDriver, EdgeDriver, SafariDriver, None] = None
     current_page: Optional[Page] = None
+    # Iframe element of a page the driver is switched to, None for the top level document
+    current_frame: Union[Element, object, None] = None
 
     def __init__(self, webdriver_config: WebDriverConfig):
         if not webdriver_config or not isinstance(webdriver_config, WebDriverConfig):
@@ -382,59 +724,25 @@ class WebAUT(metaclass=abc.ABCMeta):
 
     def init_web_driver(self):
         """
-        Create a web driver instance based on the provided options.
+        Create a web driver instance based on the provided options, or take a reset one from the pool if sessions are
+        reused.
         """
-        self.driver = create_web_driver(self.webdriver_config)
+        if self.webdriver_config.reuse_session:
+            self.driver = web_driver_pool.acquire(self.webdriver_config)
+        else:
+            self.driver = create_web_driver(self.webdriver_config)
         if not self.driver:
             raise ValueError("Failed to create web driver instance")
+        self.current_frame = None
 
     def load_locators_from_file(self, locators_file: str):
         """
-        Load locators from a file.
+        Load locators from a file. The file is parsed and validated once and shared by all application instances until
+        it changes.
         :param locators_file:
         :return:
         """
-        if not os.path.exists(locators_file):
-            raise FileNotFoundError(f"File not found: {locators_file}")
-
-        # Read the locators YAML file and parse it
-        with open(locators_file, 'r') as file:
-            locators_data = yaml.safe_load(file)
-
-        # Validate the structure of the locators data
-        if not isinstance(locators_data, dict):
-            raise ValueError("Invalid locators file format. Expected a dictionary.")
-
-        page_locators = {}
-        for page_name, page_locator_data in locators_data.items():
-            if not isinstance(page_locator_data, dict):
-                raise ValueError(f"Invalid locators format for page '{page_name}'. Expected a dictionary.")
-
-            page_locators[page_name] = {}
-            for element_name, locator_data in page_locator_data.items():
-                locator = Locator.convert_from_dict(locator_data)
-                if not locator or not isinstance(locator, Locator):
-                    raise ValueError(f"Invalid locator format for element '{element_name}' on page '{page_name}'. "
-                                     f"Check syntax.")
-                page_locators[page_name][element_name] = locator
-
-            # Check if iframe and shadow root locators are present in the page's locators and is not recursive
-            for element_name, locator in page_locators[page_name].items():
-                if locator.iframe:
-                    if locator.iframe == element_name:
-                        raise ValueError(
-                            f"Element '{element_name}' cannot be its own iframe in page '{page_name}' locators.")
-                    if locator.iframe not in page_locators[page_name]:
-                        raise ValueError(f"Iframe locator '{locator.iframe}' for element '{element_name}' "
-                                         f"is not defined in page '{page_name}' locators.")
-                if locator.shadow_root:
-                    if locator.shadow_root == element_name:
-                        raise ValueError(
-                            f"Element '{element_name}' cannot be its own shadow root in page '{page_name}' locators.")
-                    if locator.shadow_root not in page_locators[page_name]:
-                        raise ValueError(f"Shadow root locator '{locator.shadow_root}' for element '{element_name}' "
-                                         f"is not defined in page '{page_name}' locators.")
-        self.page_locators = page_locators
+        self.page_locators = locator_repository.get_page_locators(locators_file)
 
     @abc.abstractmethod
     def initialize_application(self) -> Optional[Page]:
@@ -446,10 +754,13 @@ class WebAUT(metaclass=abc.ABCMeta):
 
     def close(self):
         """
-        Close the web driver instance.
+        Close the web driver instance, or return it to the pool if sessions are reused.
         """
         if self.driver:
-            self.driver.quit()
+            if self.webdriver_config.reuse_session:
+                web_driver_pool.release(self.driver)
+            else:
+                self.driver.quit()
             self.driver = None
 
     def __enter__(self):
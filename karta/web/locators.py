@@ -0,0 +1,112 @@
+import os
+import threading
+
+import yaml
+
+from karta.web.models import Locator
+
+
+def parse_page_locators(locators_data: dict) -> dict[str, dict[str, Locator]]:
+    """
+    Convert the locators data of a locators file to the locators of each page, validating their iframe and shadow root
+    references.
+    :param locators_data: The parsed locators file, page names mapped to element names mapped to locator dictionaries
+    :return: The locators of each page
+    """
+    # Validate the structure of the locators data
+    if not isinstance(locators_data, dict):
+        raise ValueError("Invalid locators file format. Expected a dictionary.")
+
+    page_locators = {}
+    for page_name, page_locator_data in locators_data.items():
+        if not isinstance(page_locator_data, dict):
+            raise ValueError(f"Invalid locators format for page '{page_name}'. Expected a dictionary.")
+
+        page_locators[page_name] = {}
+        for element_name, locator_data in page_locator_data.items():
+            locator = Locator.convert_from_dict(locator_data)
+            if not locator or not isinstance(locator, Locator):
+                raise ValueError(f"Invalid locator format for element '{element_name}' on page '{page_name}'. "
+                                 f"Check syntax.")
+            page_locators[page_name][element_name] = locator
+        validate_locator_references(page_name, page_locators[page_name])
+    return page_locators
+
+
+def validate_locator_references(page_name: str, locators: dict[str, Locator]):
+    """
+    Check that the iframe and shadow root locators of the elements of a page are defined in the page and do not form
+    a cycle.
+    :param page_name: The name of the page
+    :param locators: The locators of the page by element name
+    """
+    for element_name, locator in locators.items():
+        for reference_type, reference in (('iframe', locator.iframe), ('shadow root', locator.shadow_root)):
+            if not reference:
+                continue
+            if reference == element_name:
+                raise ValueError(
+                    f"Element '{element_name}' cannot be its own {reference_type} in page '{page_name}' locators.")
+            if reference not in locators:
+                raise ValueError(f"{reference_type.capitalize()} locator '{reference}' for element '{element_name}' "
+                                 f"is not defined in page '{page_name}' locators.")
+
+    # Depth first search of the reference graph, an element reached again while on the current path is a cycle
+    checked_element_names = set()
+
+    def check_references(element_name: str, path: list[str]):
+        if element_name in path:
+            cycle = path[path.index(element_name):] + [element_name]
+            raise ValueError(f"Iframe and shadow root references of page '{page_name}' locators form a cycle: "
+                             f"{' -> '.join(cycle)}")
+        if element_name in checked_element_names:
+            return
+        locator = locators[element_name]
+        for reference in (locator.iframe, locator.shadow_root):
+            if reference:
+                check_references(reference, path + [element_name])
+        checked_element_names.add(element_name)
+
+    for element_name in locators.keys():
+        check_references(element_name, [])
+
+
+class LocatorRepository:
+    """
+    Process wide cache of the page locators of locator files, parsed and validated once and reloaded when a file
+    changes. The cached locators are shared by all application instances and must not be modified.
+    """
+
+    def __init__(self):
+        self.page_locators: dict[str, tuple[tuple[int, int], dict[str, dict[str, Locator]]]] = {}
+        self.lock = threading.Lock()
+
+    def get_page_locators(self, locators_file: str) -> dict[str, dict[str, Locator]]:
+        """
+        Get the locators of each page in a locators file
+        :param locators_file: The YAML locators file
+        :return: The locators of each page by element name
+        """
+        if not os.path.exists(locators_file):
+            raise FileNotFoundError(f"File not found: {locators_file}")
+        locators_path = os.path.abspath(locators_file)
+        file_stat = os.stat(locators_path)
+        file_version = (file_stat.st_mtime_ns, file_stat.st_size)
+
+        with self.lock:
+            cached_version, page_locators = self.page_locators.get(locators_path, (None, None))
+            if cached_version == file_version:
+                return page_locators
+            # Read the locators YAML file and parse it
+            with open(locators_path, 'r') as file:
+                locators_data = yaml.safe_load(file)
+            page_locators = parse_page_locators(locators_data)
+            self.page_locators[locators_path] = (file_version, page_locators)
+            return page_locators
+
+    def clear(self):
+        with self.lock:
+            self.page_locators = {}
+
+
+locator_repository = LocatorRepository()
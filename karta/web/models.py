@@ -42,6 +42,12 @@ class WebDriverConfig(BaseModel):
     explicit_wait: Optional[int] = 0
     additionalArguments: Optional[list[str]] = []
     capabilities: Optional[dict] = {}
+    # Reuse browser sessions from the web driver pool, reset between uses, instead of starting a browser every time
+    reuse_session: Optional[bool] = False
+    # Maximum sessions of this config open at a time in a process when reusing sessions, unlimited if None
+    max_sessions: Optional[int] = None
+    # Sessions started in the background on the first use of this config when reusing sessions
+    prewarm_sessions: Optional[int] = 0
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -114,6 +120,8 @@ class Locator(BaseModel):
             type=locator_dict.get('type', 'CSS'),
             selector=locator_dict['selector'],
             multiple=locator_dict.get('multiple', False),
+            iframe=locator_dict.get('iframe', None),
+            shadow_root=locator_dict.get('shadow_root', None),
         )
 
         return locator
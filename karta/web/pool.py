@@ -0,0 +1,183 @@
+import threading
+from typing import Callable, Optional
+
+from selenium.common import WebDriverException
+from selenium.webdriver import Remote
+
+from karta.core.utils.logger import logger
+from karta.web.models import WebDriverConfig
+
+CLEAR_STORAGE_SCRIPT = "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+
+
+def get_web_driver_config_key(webdriver_config: WebDriverConfig) -> str:
+    return webdriver_config.json(sort_keys=True)
+
+
+def is_web_driver_healthy(driver: Remote) -> bool:
+    """
+    Check if the browser session of a web driver still responds
+    """
+    try:
+        return bool(driver.window_handles)
+    except WebDriverException:
+        return False
+
+
+def reset_web_driver(driver: Remote):
+    """
+    Reset the state of a browser session for reuse, closing extra windows and clearing cookies and storage
+    """
+    window_handles = driver.window_handles
+    for window_handle in window_handles[1:]:
+        driver.switch_to.window(window_handle)
+        driver.close()
+    driver.switch_to.window(window_handles[0])
+    driver.switch_to.default_content()
+    driver.execute_script(CLEAR_STORAGE_SCRIPT)
+    if hasattr(driver, 'execute_cdp_cmd'):
+        # Chromium browsers can clear the cookies of all domains, not only the current one
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+    else:
+        driver.delete_all_cookies()
+    driver.get('about:blank')
+
+
+class WebDriverPool:
+    """
+    Pool of browser sessions per web driver config, reset and reused across application instances instead of starting
+    a new browser every time. Every worker process of a run has its own pool, so sessions scale with the workers.
+    """
+
+    def __init__(self, create_driver: Callable[[WebDriverConfig], Remote],
+                 reset_driver: Callable[[Remote], None] = reset_web_driver,
+                 is_driver_healthy: Callable[[Remote], bool] = is_web_driver_healthy):
+        """
+        :param create_driver: Creates a web driver for a config
+        :param reset_driver: Resets the state of a web driver released to the pool
+        :param is_driver_healthy: Checks if an idle web driver can be handed out again
+        """
+        self.create_driver = create_driver
+        self.reset_driver = reset_driver
+        self.is_driver_healthy = is_driver_healthy
+        self.idle_drivers: dict[str, list[Remote]] = {}
+        self.driver_keys: dict[Remote, str] = {}
+        # Open sessions per config, idle, in use or being started
+        self.session_counts: dict[str, int] = {}
+        self.prewarmed_keys: set[str] = set()
+        self.condition = threading.Condition()
+
+    def start_session(self, key: str, webdriver_config: WebDriverConfig) -> Remote:
+        try:
+            driver = self.create_driver(webdriver_config)
+        except Exception:
+            with self.condition:
+                self.session_counts[key] -= 1
+                self.condition.notify_all()
+            raise
+        with self.condition:
+            self.driver_keys[driver] = key
+        return driver
+
+    def prewarm(self, webdriver_config: WebDriverConfig, count: int):
+        """
+        Start sessions in the background up to count idle sessions, within the maximum sessions of the config
+        """
+        key = get_web_driver_config_key(webdriver_config)
+
+        def start_idle_session():
+            try:
+                driver = self.start_session(key, webdriver_config)
+            except Exception as e:
+                logger.warning("Prewarming a web driver session failed: %s", str(e))
+                return
+            with self.condition:
+                self.idle_drivers.setdefault(key, []).append(driver)
+                self.condition.notify_all()
+
+        with self.condition:
+            self.prewarmed_keys.add(key)
+            start_count = count - len(self.idle_drivers.get(key, []))
+            if webdriver_config.max_sessions:
+                start_count = min(start_count, webdriver_config.max_sessions - self.session_counts.get(key, 0))
+            self.session_counts[key] = self.session_counts.get(key, 0) + max(start_count, 0)
+        for _ in range(start_count):
+            threading.Thread(target=start_idle_session, name='karta-webdriver-prewarm', daemon=True).start()
+
+    def acquire(self, webdriver_config: WebDriverConfig, timeout: Optional[float] = None) -> Remote:
+        """
+        Hand out an idle healthy session of the config, starting a new one if none is idle
+        :param webdriver_config: The web driver config of the session
+        :param timeout: Seconds to wait for a session when the maximum sessions of the config are in use
+        :return: The web driver
+        """
+        key = get_web_driver_config_key(webdriver_config)
+        if webdriver_config.prewarm_sessions and key not in self.prewarmed_keys:
+            # Start the other prewarmed sessions in the background while starting the one handed out now
+            with self.condition:
+                self.session_counts[key] = self.session_counts.get(key, 0) + 1
+            self.prewarm(webdriver_config, webdriver_config.prewarm_sessions - 1)
+            return self.start_session(key, webdriver_config)
+
+        while True:
+            with self.condition:
+                idle_drivers = self.idle_drivers.setdefault(key, [])
+                can_start = not webdriver_config.max_sessions or self.session_counts.get(
+                    key, 0) < webdriver_config.max_sessions
+                if not idle_drivers and not can_start:
+                    if not self.condition.wait_for(lambda: self.idle_drivers.get(key, None) or self.session_counts.get(
+                            key, 0) < webdriver_config.max_sessions, timeout):
+                        raise TimeoutError("No web driver session became available in {} seconds".format(timeout))
+                    continue
+                if idle_drivers:
+                    driver = idle_drivers.pop()
+                else:
+                    driver = None
+                    self.session_counts[key] = self.session_counts.get(key, 0) + 1
+
+            if driver is None:
+                return self.start_session(key, webdriver_config)
+            if self.is_driver_healthy(driver):
+                return driver
+            logger.warning("Evicting unhealthy web driver session of the pool")
+            self.discard(driver)
+
+    def release(self, driver: Remote):
+        """
+        Reset a session and return it to the pool, sessions failing to reset are evicted
+        """
+        with self.condition:
+            key = self.driver_keys.get(driver, None)
+        if key is None:
+            driver.quit()
+            return
+        try:
+            self.reset_driver(driver)
+        except Exception as e:
+            logger.warning("Evicting web driver session failing to reset: %s", str(e))
+            self.discard(driver)
+            return
+        with self.condition:
+            self.idle_drivers.setdefault(key, []).append(driver)
+            self.condition.notify_all()
+
+    def discard(self, driver: Remote):
+        with self.condition:
+            key = self.driver_keys.pop(driver, None)
+            if key is not None:
+                self.session_counts[key] -= 1
+                self.condition.notify_all()
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.debug("Quitting evicted web driver failed: %s", str(e))
+
+    def close_all(self):
+        """
+        Quit all the idle sessions
+        """
+        with self.condition:
+            idle_drivers = [driver for drivers in self.idle_drivers.values() for driver in drivers]
+            self.idle_drivers = {}
+        for driver in idle_drivers:
+            self.discard(driver)
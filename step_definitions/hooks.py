@@ -1,9 +1,13 @@
+from selenium.common import WebDriverException
+
 from karta.core.utils.logger import logger
 from karta.plugins.dependency_injector import Inject
+from karta.plugins.fixtures import fixture
 from karta.plugins.kriya import before_run, before_feature, before_scenario, after_scenario, after_feature, \
     after_run
 from karta.web.models import WebDriverConfig
-from step_definitions._w3schools import W3SchoolsApp
+from karta.web.pool import reset_web_driver
+from step_definitions._w3schools import W3SchoolsApp, HomePage
 
 test_properties = Inject("properties").get()
 
@@ -23,26 +27,63 @@ def before_scenario_hook(context=None):
     logger.info("Before scenario hook")
 
 
+@fixture(scope='worker')
+def w3schools_chrome_app():
+    # The browser is opened once per worker and closed at the end of the run
+    web_driver_config = WebDriverConfig.validate(test_properties["w3schools_webdriver_config_chrome"])
+    w3schools_app = W3SchoolsApp(web_driver_config, 'locators/W3SchoolsApp.yaml')
+    yield w3schools_app
+    w3schools_app.close()
+
+
+@fixture(scope='worker')
+def w3schools_firefox_app():
+    web_driver_config = WebDriverConfig.validate(test_properties["w3schools_webdriver_config_firefox"])
+    w3schools_app = W3SchoolsApp(web_driver_config, 'locators/W3SchoolsApp.yaml')
+    yield w3schools_app
+    w3schools_app.close()
+
+
+chrome_app = Inject("w3schools_chrome_app").get()
+firefox_app = Inject("w3schools_firefox_app").get()
+
+
+def open_w3schools_home_page(w3schools_app: W3SchoolsApp):
+    # The browser is shared by the scenarios of a worker, so its windows, cookies, storage and frame left by the
+    # scenario before are reset. A scenario may have closed or broken the browser, it is opened again then.
+    if w3schools_app.driver is not None:
+        try:
+            reset_web_driver(w3schools_app.driver)
+        except WebDriverException as e:
+            logger.warning("Reopening the browser failing to reset: %s", str(e))
+            try:
+                w3schools_app.close()
+            except WebDriverException:
+                w3schools_app.driver = None
+    if w3schools_app.driver is None:
+        w3schools_app.initialize_application()
+    else:
+        w3schools_app.driver.get(w3schools_app.url)
+        HomePage(w3schools_app)
+
+
 @before_scenario("^chrome$")
 def before_chrome_scenario_hook(context=None):
     logger.info("Before chrome scenario hook")
-    web_driver_config = WebDriverConfig.validate(test_properties["w3schools_webdriver_config_chrome"])
-    context.w3schools_app = W3SchoolsApp(web_driver_config, 'locators/W3SchoolsApp.yaml')
-    context.w3schools_app.initialize_application()
+    context.w3schools_app = chrome_app.get()
+    open_w3schools_home_page(context.w3schools_app)
 
 
 @before_scenario("^firefox$")
 def before_firefox_scenario_hook(context=None):
     logger.info("Before firefox scenario hook")
-    web_driver_config = WebDriverConfig.validate(test_properties["w3schools_webdriver_config_firefox"])
-    context.w3schools_app = W3SchoolsApp(web_driver_config, 'locators/W3SchoolsApp.yaml')
-    context.w3schools_app.initialize_application()
+    context.w3schools_app = firefox_app.get()
+    open_w3schools_home_page(context.w3schools_app)
 
 
 @after_scenario("^(w3schools|firefox|chrome)$")
 def after_web_test_scenario_hook(context=None):
     logger.info("After web test scenario hook")
-    context.w3schools_app.close()
     context.w3schools_app = None
 
 